@@ -3,149 +3,80 @@
 Flask REST backend for Rule-based chatbot with per-user session contexts.
 
 Features added:
-- per-session contexts (in-memory dict `contexts`) keyed by session_id (UUID)
+- per-session contexts keyed by session_id (UUID) in a bounded TTL/LRU store
+  (in-memory or SQLite file, see sessions.py); RuleBot itself is stateless
 - /api/chat accepts "session_id" in JSON body or X-Session-Id header; if missing, server issues one
 - response includes session_id so client can persist it
+- /api/chat/batch answers a list of {session_id, message} items in one call
+- /api/metrics: reply counters and per-stage latency histograms (JSON, or
+  ?format=prometheus); counters are flushed to stats.json periodically (see metrics.py)
+- /api/session_stats to inspect session store occupancy and evictions
 - /api/reload_rules to reload rules.json without restart
 - /api/get_rules to fetch current rules
 - /api/add_intent to append a new intent safely to rules.json (demo helper)
-- conversation transcript saved to chat_transcript.log
+- rules are immutable snapshots swapped atomically on reload / add_intent;
+  rules.json writes are atomic and optional mtime polling hot-reloads edits (see ruleset.py)
+- conversation transcript saved to chat_transcript.log by a background writer
+  (text or JSONL, optional size/time rotation; see transcript.py)
+- intent patterns compiled once per rules load (see matcher.py); the bot itself
+  lives in rulebot.py
 """
-from flask import Flask, request, jsonify, render_template
-import json, re, random, datetime, difflib, os, uuid
+from flask import Flask, Response, request, jsonify, render_template
+import os, uuid, time, atexit
+from rulebot import RuleBot
+from ruleset import RulesWatcher
+from transcript import TranscriptWriter
+from sessions import SessionStore, MemoryBackend, SQLiteBackend
+from metrics import Metrics, StatsFlusher, load_stats
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 RULES_FILE = os.path.join(BASE_DIR, "rules.json")
 LOG_FILE = os.path.join(BASE_DIR, "chat_transcript.log")
-
-def load_rules(path=RULES_FILE):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def save_transcript(line):
-    ts = datetime.datetime.now().isoformat()
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(f"{ts} {line}\n")
-
-class RuleBot:
-    def __init__(self, rules_path=RULES_FILE):
-        self.rules_path = rules_path
-        self.reload()
-        # context will be set per-session before calling respond()
-        self.context = {"user_name": None, "last_intent": None}
-
-    def reload(self):
-        self.rules = load_rules(self.rules_path)
-        self.intents = self.rules.get("intents", [])
-        self.settings = self.rules.get("settings", {})
-        self.fuzzy_threshold = float(self.settings.get("fuzzy_threshold", 0.6))
-
-    def normalize(self, t):
-        t = t.lower().strip()
-        t = re.sub(r"[^\w\s']", " ", t)
-        t = re.sub(r"\s+", " ", t)
-        return t
-
-    def match_intent(self, text):
-        ntext = self.normalize(text)
-        # 1) regex-focused patterns
-        for intent in self.intents:
-            for patt in intent.get("patterns", []):
-                if any(ch in patt for ch in "()[]\\.*+?"):
-                    try:
-                        m = re.search(patt, text, flags=re.I)
-                        if m:
-                            return intent, m
-                    except re.error:
-                        continue
-        # 2) substring/keyword match
-        tokens = ntext.split()
-        for intent in self.intents:
-            for patt in intent.get("patterns", []):
-                npatt = self.normalize(patt)
-                if not npatt:
-                    continue
-                if npatt in ntext:
-                    return intent, None
-                pw = npatt.split()
-                if all(w in tokens for w in pw):
-                    return intent, None
-        # 3) fuzzy fallback
-        allp = []
-        p2i = {}
-        for intent in self.intents:
-            for patt in intent.get("patterns", []):
-                npatt = self.normalize(patt)
-                if npatt:
-                    allp.append(npatt)
-                    p2i[npatt] = intent
-        if allp:
-            matches = difflib.get_close_matches(ntext, allp, n=1, cutoff=self.fuzzy_threshold)
-            if matches:
-                return p2i[matches[0]], None
-        return None, None
-
-    def respond(self, user_input):
-        txt = user_input.strip()
-        if txt.lower() in ("help", "commands"):
-            return {"reply": "Commands: 'quit' to exit. Try: 'hi', 'my name is ...', 'i need project help'.", "intent":"help", "context": self.context}
-        intent, m = self.match_intent(txt)
-        if intent is None:
-            fallback = next((it for it in self.intents if it.get("name")=="fallback"), None)
-            reply = random.choice(fallback.get("responses")) if fallback else "Sorry, I didn't understand. Try rephrasing."
-            self.context["last_intent"] = "fallback"
-            save_transcript(f"You: {txt}")
-            save_transcript(f"Bot: {reply}")
-            return {"reply": reply, "intent": "fallback", "context": self.context}
-        self.context["last_intent"] = intent.get("name")
-        # set_name special handling
-        if intent.get("name") == "set_name":
-            name = None
-            if m and m.groups():
-                name = m.groups()[0].strip()
-            else:
-                mm = re.search(r"my name is\s+([\w\s]+)", txt, flags=re.I)
-                if mm:
-                    name = mm.group(1).strip()
-                else:
-                    mm2 = re.search(r"i am\s+([\w\s]+)", txt, flags=re.I)
-                    if mm2:
-                        name = mm2.group(1).strip()
-            if name:
-                name = " ".join(name.split()[:2]).title()
-                self.context["user_name"] = name
-                reply = random.choice(intent.get("responses", [])).format(name=name)
-                save_transcript(f"You: {txt}")
-                save_transcript(f"Bot: {reply}")
-                return {"reply": reply, "intent": "set_name", "context": self.context}
-            else:
-                reply = "I didn't catch your name — what should I call you?"
-                save_transcript(f"You: {txt}")
-                save_transcript(f"Bot: {reply}")
-                return {"reply": reply, "intent": "set_name.ask", "context": self.context}
-        # ask user name
-        if "what is my name" in txt.lower() or "do you remember my name" in txt.lower():
-            if self.context.get("user_name"):
-                reply = f"Yes — you're {self.context['user_name']}."
-            else:
-                reply = "I don't know your name yet. You can say 'my name is ...'."
-            save_transcript(f"You: {txt}")
-            save_transcript(f"Bot: {reply}")
-            return {"reply": reply, "intent": "ask_user_name", "context": self.context}
-        # default
-        resp_template = random.choice(intent.get("responses", ["Okay."]))
-        reply = resp_template.format(name=self.context.get("user_name") or "")
-        save_transcript(f"You: {txt}")
-        save_transcript(f"Bot: {reply}")
-        return {"reply": reply, "intent": intent.get("name"), "context": self.context}
+STATS_FILE = os.path.join(BASE_DIR, "stats.json")
+
+def make_transcript(settings, path=LOG_FILE, observe=None):
+    """Build the background transcript writer from the rules.json settings."""
+    return TranscriptWriter(
+        path,
+        fmt=settings.get("transcript_format", "text"),
+        max_queue=int(settings.get("transcript_queue_size", 10000)),
+        batch_size=int(settings.get("transcript_batch_size", 256)),
+        max_bytes=int(settings.get("transcript_max_bytes", 0)),
+        rotate_seconds=float(settings.get("transcript_rotate_seconds", 0)),
+        backups=int(settings.get("transcript_backups", 5)),
+        observe=observe,
+    )
 
 # Flask app + bot instance
 app = Flask(__name__, template_folder="templates", static_folder="static")
-bot = RuleBot()
-
-# In-memory per-session contexts: session_id (str) -> context dict
-# NOTE: this is in-memory and will be lost on server restart. Use Redis/DB for persistence.
-contexts = {}
+# counters continue from the last flushed stats.json
+metrics = Metrics(load_stats(STATS_FILE))
+bot = RuleBot(RULES_FILE, metrics=metrics)
+bot.transcript = make_transcript(bot.settings, observe=metrics.observe)
+
+# counters go to stats.json every few seconds (and at exit), not per request
+stats_flusher = StatsFlusher(metrics, STATS_FILE, float(bot.settings.get("stats_flush_seconds", 30))).start()
+atexit.register(stats_flusher.stop)
+
+def make_sessions(settings):
+    """Build the session store from the rules.json settings."""
+    if settings.get("session_backend", "memory") == "sqlite":
+        backend = SQLiteBackend(os.path.join(BASE_DIR, settings.get("session_db", "sessions.db")))
+    else:
+        backend = MemoryBackend()
+    return SessionStore(
+        backend,
+        ttl=float(settings.get("session_ttl_seconds", 1800)),
+        max_size=int(settings.get("session_max", 10000)),
+    )
+
+# optional hot reload of external rules.json edits (0 disables)
+if float(bot.settings.get("rules_watch_seconds", 0)) > 0:
+    RulesWatcher(bot, float(bot.settings["rules_watch_seconds"])).start()
+
+# Per-session contexts: session_id (str) -> context dict, idle-TTL + LRU bounded.
+# The default memory backend is lost on restart; set session_backend to "sqlite" to persist.
+sessions = make_sessions(bot.settings)
 
 @app.route("/")
 def index():
@@ -159,6 +90,7 @@ def login_page():
 
 @app.route("/api/chat", methods=["POST"])
 def chat():
+    started = time.perf_counter()
     data = request.json or {}
     msg = data.get("message", "")
     if not msg:
@@ -171,13 +103,10 @@ def chat():
         session_id = str(uuid.uuid4())
         created_new = True
 
-    # initialize context for this session if not present
-    contexts.setdefault(session_id, {"user_name": None, "last_intent": None})
-
-    # set bot.context to this session's context, call respond, then save updated context
-    bot.context = contexts[session_id]
-    result = bot.respond(msg)
-    contexts[session_id] = bot.context
+    # load (or create) this session's context, respond with it, then store it back
+    context = sessions.get(session_id)
+    result = bot.respond(msg, context, session_id)
+    sessions.put(session_id, context)
 
     resp = {
         "success": True,
@@ -190,8 +119,69 @@ def chat():
     if created_new:
         resp["notice"] = "new_session_id_created"
 
+    metrics.observe("request", time.perf_counter() - started)
     return jsonify(resp)
 
+@app.route("/api/chat/batch", methods=["POST"])
+def chat_batch():
+    """
+    Answer many messages in one call.
+    Expects JSON: { "items": [ {"session_id": "...", "message": "..."}, ... ] }
+    Items are answered in order, so items sharing a session_id see each other's
+    context; each session is loaded from and written back to the store once.
+    """
+    started = time.perf_counter()
+    data = request.json or {}
+    items = data.get("items")
+    if not isinstance(items, list):
+        return jsonify({"success": False, "error": "Provide 'items' list of {session_id, message}."}), 400
+    max_items = int(bot.settings.get("batch_max_items", 1000))
+    if len(items) > max_items:
+        return jsonify({"success": False, "error": f"At most {max_items} items per batch."}), 413
+
+    batch_contexts = {}
+    results = []
+    for item in items:
+        msg = item.get("message", "") if isinstance(item, dict) else ""
+        if not msg:
+            results.append({"success": False, "error": "Missing 'message' field."})
+            continue
+        session_id = item.get("session_id") or item.get("session")
+        created_new = not session_id
+        if created_new:
+            session_id = str(uuid.uuid4())
+        context = batch_contexts.get(session_id)
+        if context is None:
+            context = batch_contexts[session_id] = sessions.get(session_id)
+        result = bot.respond(msg, context, session_id)
+        res = {
+            "success": True,
+            "reply": result["reply"],
+            "intent": result["intent"],
+            # copy: later items of the same session keep mutating the context
+            "context": dict(result["context"]),
+            "session_id": session_id
+        }
+        if created_new:
+            res["notice"] = "new_session_id_created"
+        results.append(res)
+    for session_id, context in batch_contexts.items():
+        sessions.put(session_id, context)
+
+    metrics.observe("batch_request", time.perf_counter() - started)
+    return jsonify({"success": True, "count": len(results), "results": results})
+
+@app.route("/api/metrics", methods=["GET"])
+def get_metrics():
+    # ?format=prometheus for the Prometheus text exposition format
+    if request.args.get("format") == "prometheus":
+        return Response(metrics.prometheus(), mimetype="text/plain; version=0.0.4")
+    return jsonify(metrics.snapshot())
+
+@app.route("/api/session_stats", methods=["GET"])
+def session_stats():
+    return jsonify(sessions.stats())
+
 @app.route("/api/reload_rules", methods=["POST"])
 def reload_rules():
     try:
@@ -215,15 +205,9 @@ def add_intent():
     if not isinstance(new_intent, dict) or "name" not in new_intent:
         return jsonify({"success": False, "error": "Provide 'intent' dict with at least 'name'."}), 400
 
-    # load current rules, append, write back
+    # extend the live rules incrementally; rules.json is replaced atomically
     try:
-        rules = load_rules(RULES_FILE)
-        rules.setdefault("intents", []).append(new_intent)
-        # write back
-        with open(RULES_FILE, "w", encoding="utf-8") as f:
-            json.dump(rules, f, indent=2, ensure_ascii=False)
-        # reload into bot
-        bot.reload()
+        bot.add_intent(new_intent)
         return jsonify({"success": True, "message": "Intent added and rules reloaded."})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
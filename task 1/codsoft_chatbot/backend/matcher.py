@@ -0,0 +1,332 @@
+# backend/matcher.py
+"""
+Compiled intent matcher used by RuleBot.
+
+Everything that used to be recomputed on every message (regex detection,
+pattern normalization, the fuzzy candidate list) is built once when the rules
+are loaded. Matching keeps the original priority order:
+
+1) regex-focused patterns, tried in rules order against the raw text
+2) substring / keyword patterns, the first pattern in rules order wins
+3) fuzzy fallback, scored only against a character bigram shortlist
+"""
+import re
+import copy
+import time
+import difflib
+import logging
+
+log = logging.getLogger(__name__)
+
+REGEX_CHARS = "()[]\\.*+?"
+
+# patterns added incrementally are scanned directly until there are this many
+REBUILD_AFTER = 64
+
+_PUNCT_RE = re.compile(r"[^\w\s']")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def _ignore(stage, seconds):
+    pass
+
+
+def normalize(t):
+    t = t.lower().strip()
+    t = _PUNCT_RE.sub(" ", t)
+    t = _SPACE_RE.sub(" ", t)
+    return t
+
+
+class SubstringIndex:
+    """
+    Aho-Corasick automaton over the normalized patterns.
+    find() returns the ids of every pattern that occurs anywhere in the text,
+    in a single pass over the text.
+    """
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+
+    def add(self, word, pid):
+        node = 0
+        for ch in word:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = nxt
+        self.out[node].append(pid)
+
+    def build(self):
+        # breadth-first pass to set failure links and merge outputs
+        queue = list(self.goto[0].values())
+        for child in queue:
+            self.fail[child] = 0
+        i = 0
+        while i < len(queue):
+            node = queue[i]
+            i += 1
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[child] = target if target != child else 0
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def find(self, text):
+        found = set()
+        node = 0
+        goto, fail, out = self.goto, self.fail, self.out
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+class FuzzyIndex:
+    """
+    Character bigram index over the normalized patterns.
+
+    Instead of scoring every pattern with difflib, lookup() keeps only the
+    patterns whose length can still reach the cutoff, ranks them by bigram
+    overlap (Dice) and scores the best `shortlist` of them with SequenceMatcher,
+    using the same quick-reject order and tie-break as get_close_matches.
+    Further windows of `shortlist` candidates are scored while they keep
+    improving the answer, up to `widen` windows.
+    """
+
+    def __init__(self, cutoff=0.6, shortlist=32, widen=8):
+        self.cutoff = cutoff
+        self.shortlist = shortlist
+        self.widen = widen      # at most shortlist * widen candidates are scored
+        self.words = []         # word id -> normalized pattern
+        self.sizes = []         # word id -> number of distinct bigrams
+        self.ids = {}           # normalized pattern -> word id
+        self.grams = {}         # bigram -> [word ids]
+
+    @staticmethod
+    def ngrams(s):
+        # padded so single characters at either end still produce a gram
+        s = f" {s} "
+        return {s[i:i + 2] for i in range(len(s) - 1)}
+
+    def add(self, word):
+        if word in self.ids:
+            return
+        wid = len(self.words)
+        self.words.append(word)
+        self.ids[word] = wid
+        grams = self.ngrams(word)
+        self.sizes.append(len(grams))
+        for g in grams:
+            self.grams.setdefault(g, []).append(wid)
+
+    def best_match(self, text):
+        n = len(text)
+        if not n or not self.words:
+            return None
+        # real_quick_ratio bound: 2*min(a, b) / (a + b) >= cutoff
+        c = self.cutoff
+        lo = n * c / (2 - c) if c < 2 else n
+        hi = n * (2 - c) / c if c > 0 else float("inf")
+        shared = {}
+        words = self.words
+        grams = self.ngrams(text)
+        for g in grams:
+            for wid in self.grams.get(g, ()):
+                shared[wid] = shared.get(wid, 0) + 1
+        cands = [wid for wid in shared if lo <= len(words[wid]) <= hi]
+        size = self.shortlist
+        if len(cands) <= size:
+            return best_close_match(text, [words[wid] for wid in cands], c)
+        # rank by the Dice coefficient of the bigram sets (a raw shared count
+        # favours long patterns), then score in windows of `shortlist`; the
+        # next window is only tried while nothing reached the cutoff yet or the
+        # last window still improved the best match
+        n_grams, sizes = len(grams), self.sizes
+        cands.sort(key=lambda wid: -shared[wid] / (n_grams + sizes[wid]))
+        limit = min(len(cands), size * self.widen)
+        best = best_close_match(text, [words[wid] for wid in cands[:size]], c)
+        start = size
+        while start < limit:
+            found = best_close_match(text, [words[wid] for wid in cands[start:start + size]], c, best)
+            if found is not None and found == best:
+                break
+            best = found
+            start += size
+        return best
+
+    def lookup(self, text):
+        best = self.best_match(text)
+        return best[1] if best else None
+
+
+def best_close_match(text, words, cutoff, best=None):
+    """
+    Score `words` against `text` like difflib.get_close_matches(n=1) and
+    return the best (score, word), starting from an already known `best`.
+    """
+    sm = difflib.SequenceMatcher()
+    sm.set_seq2(text)
+    for word in words:
+        sm.set_seq1(word)
+        if sm.real_quick_ratio() >= cutoff and sm.quick_ratio() >= cutoff:
+            score = sm.ratio()
+            if score >= cutoff and (best is None or (score, word) > best):
+                best = (score, word)
+    return best
+
+
+class IntentMatcher:
+    """
+    Precompiled view of the intents list, built once per rules load.
+    A matcher is never modified once built; with_intent() returns a new one.
+    """
+
+    def __init__(self, intents, fuzzy_threshold=0.6, fuzzy_shortlist=32, fuzzy_parity=False):
+        self.intents = list(intents)
+        self.fuzzy_threshold = fuzzy_threshold
+        self.fuzzy_shortlist = fuzzy_shortlist
+        # parity mode also runs the old difflib scan and logs disagreements
+        self.fuzzy_parity = fuzzy_parity
+        self.parity_checks = 0
+        self.parity_mismatches = 0
+        self.regexes = []          # [(compiled, intent)] in rules order
+        self.patterns = []         # pattern id -> (normalized pattern, intent)
+        self.required = []         # pattern id -> number of distinct words
+        self.token_index = {}      # word -> [pattern ids containing it]
+        self.substrings = SubstringIndex()
+        self.fuzzy = FuzzyIndex(fuzzy_threshold, fuzzy_shortlist)
+        # pattern -> intent for the fuzzy stage (last intent wins, as before)
+        self.allp = []
+        self.p2i = {}
+        # pattern ids added by with_intent() that are not in the indexes yet
+        self.extra = []
+        for intent in self.intents:
+            self._add_intent(intent)
+        self.substrings.build()
+
+    def with_intent(self, intent):
+        """
+        Copy-on-write: return a new matcher that also knows `intent`, sharing
+        the built indexes with this one. The new patterns go to a small
+        overflow list that is scanned directly; once it grows past
+        REBUILD_AFTER the indexes are rebuilt from scratch instead.
+        """
+        intents = self.intents + [intent]
+        if len(self.extra) + len(intent.get("patterns", [])) > REBUILD_AFTER:
+            return IntentMatcher(intents, self.fuzzy_threshold, self.fuzzy_shortlist, self.fuzzy_parity)
+        m = copy.copy(self)
+        m.intents = intents
+        m.regexes = list(self.regexes)
+        m.patterns = list(self.patterns)
+        m.required = list(self.required)
+        m.allp = list(self.allp)
+        m.p2i = dict(self.p2i)
+        m.extra = list(self.extra)
+        m._add_intent(intent, indexed=False)
+        return m
+
+    def _add_intent(self, intent, indexed=True):
+        for patt in intent.get("patterns", []):
+            if any(ch in patt for ch in REGEX_CHARS):
+                try:
+                    self.regexes.append((re.compile(patt, flags=re.I), intent))
+                except re.error:
+                    pass
+            npatt = normalize(patt)
+            if not npatt:
+                continue
+            pid = len(self.patterns)
+            self.patterns.append((npatt, intent))
+            words = set(npatt.split())
+            self.required.append(len(words))
+            self.allp.append(npatt)
+            self.p2i[npatt] = intent
+            if not indexed:
+                self.extra.append(pid)
+                continue
+            for w in words:
+                self.token_index.setdefault(w, []).append(pid)
+            self.substrings.add(npatt, pid)
+            self.fuzzy.add(npatt)
+
+    def match_regex(self, text):
+        for rx, intent in self.regexes:
+            m = rx.search(text)
+            if m:
+                return intent, m
+        return None, None
+
+    def match_keyword(self, ntext):
+        candidates = self.substrings.find(ntext)
+        hits = {}
+        for tok in set(ntext.split()):
+            for pid in self.token_index.get(tok, ()):
+                hits[pid] = hits.get(pid, 0) + 1
+        for pid, n in hits.items():
+            if n == self.required[pid]:
+                candidates.add(pid)
+        if candidates:
+            return self.patterns[min(candidates)][1]
+        # incrementally added patterns all rank after the indexed ones
+        tokens = ntext.split()
+        for pid in self.extra:
+            npatt, intent = self.patterns[pid]
+            if npatt in ntext or all(w in tokens for w in npatt.split()):
+                return intent
+        return None
+
+    def match_fuzzy(self, ntext):
+        best = self.fuzzy.best_match(ntext)
+        if self.extra:
+            extra = {self.patterns[pid][0] for pid in self.extra}
+            best = best_close_match(ntext, extra, self.fuzzy_threshold, best)
+        best = best[1] if best else None
+        if self.fuzzy_parity:
+            best = self._check_parity(ntext, best)
+        return self.p2i[best] if best else None
+
+    def _check_parity(self, ntext, best):
+        matches = difflib.get_close_matches(ntext, self.allp, n=1, cutoff=self.fuzzy_threshold)
+        expected = matches[0] if matches else None
+        self.parity_checks += 1
+        if expected != best:
+            self.parity_mismatches += 1
+            log.warning("fuzzy parity mismatch for %r: index=%r difflib=%r", ntext, best, expected)
+        # parity mode answers with difflib so it is safe to run in production
+        return expected
+
+    def match(self, text, observe=None):
+        """
+        Return (intent, regex match or None). If given, observe(stage, seconds)
+        is called with the time spent in each stage that ran.
+        """
+        if observe is None:
+            observe = _ignore
+        t0 = time.perf_counter()
+        intent, m = self.match_regex(text)
+        t1 = time.perf_counter()
+        observe("match_regex", t1 - t0)
+        if intent is not None:
+            return intent, m
+        ntext = normalize(text)
+        intent = self.match_keyword(ntext)
+        t2 = time.perf_counter()
+        observe("match_keyword", t2 - t1)
+        if intent is not None:
+            return intent, None
+        intent = self.match_fuzzy(ntext)
+        observe("match_fuzzy", time.perf_counter() - t2)
+        return intent, None
@@ -0,0 +1,195 @@
+# backend/metrics.py
+"""
+In-process metrics for the chatbot.
+
+- counters: queries, fallbacks, per-intent hits (the fields of stats.json)
+- latency histograms with fixed buckets, one per stage:
+  match_regex, match_keyword, match_fuzzy, transcript_write, request, batch_request
+
+Recording is a bisect plus a few integer updates under one lock, cheap enough
+for every request. snapshot() feeds /api/metrics, prometheus() renders the
+Prometheus text format, and StatsFlusher writes the counters to stats.json
+every few seconds instead of on every request.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+
+from ruleset import write_json_atomic
+
+log = logging.getLogger(__name__)
+
+# upper bounds in seconds; the last bucket (+Inf) is implicit
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+           0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+STAGES = ("match_regex", "match_keyword", "match_fuzzy", "transcript_write", "request", "batch_request")
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += 1
+        self.sum += seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (None if empty)."""
+        if not self.total:
+            return None
+        rank = q * self.total
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+        return float("inf")
+
+
+class Metrics:
+    def __init__(self, base=None):
+        base = base or {}
+        self.queries = int(base.get("queries", 0))
+        self.fallbacks = int(base.get("fallbacks", 0))
+        self.intent_hits = dict(base.get("intent_hits", {}))
+        self.histograms = {stage: Histogram() for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            hist = self.histograms.get(stage)
+            if hist is None:
+                hist = self.histograms[stage] = Histogram()
+            hist.observe(seconds)
+
+    def record_reply(self, intent):
+        with self._lock:
+            self.queries += 1
+            if intent == "fallback":
+                self.fallbacks += 1
+            else:
+                self.intent_hits[intent] = self.intent_hits.get(intent, 0) + 1
+
+    def merge(self, snap):
+        """Add in another Metrics.snapshot(), e.g. one returned by a worker process."""
+        with self._lock:
+            self.queries += snap.get("queries", 0)
+            self.fallbacks += snap.get("fallbacks", 0)
+            for name, n in snap.get("intent_hits", {}).items():
+                self.intent_hits[name] = self.intent_hits.get(name, 0) + n
+            for stage, lat in snap.get("latency", {}).items():
+                hist = self.histograms.get(stage)
+                if hist is None:
+                    hist = self.histograms[stage] = Histogram()
+                for i, c in enumerate(lat["buckets"].values()):
+                    hist.counts[i] += c
+                hist.total += lat["count"]
+                hist.sum += lat["sum_seconds"]
+
+    def stats(self):
+        """The stats.json view: plain counters."""
+        with self._lock:
+            return {
+                "intent_hits": dict(self.intent_hits),
+                "fallbacks": self.fallbacks,
+                "queries": self.queries,
+            }
+
+    def snapshot(self):
+        out = self.stats()
+        latency = {}
+        with self._lock:
+            for stage, h in self.histograms.items():
+                latency[stage] = {
+                    "count": h.total,
+                    "sum_seconds": h.sum,
+                    "mean_seconds": h.sum / h.total if h.total else None,
+                    "p50_seconds": h.quantile(0.50),
+                    "p90_seconds": h.quantile(0.90),
+                    "p99_seconds": h.quantile(0.99),
+                    "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], h.counts)),
+                }
+        out["latency"] = latency
+        return out
+
+    def prometheus(self):
+        lines = [
+            "# HELP chatbot_queries_total Messages answered.",
+            "# TYPE chatbot_queries_total counter",
+        ]
+        with self._lock:
+            lines.append(f"chatbot_queries_total {self.queries}")
+            lines += [
+                "# HELP chatbot_fallbacks_total Messages answered with the fallback intent.",
+                "# TYPE chatbot_fallbacks_total counter",
+                f"chatbot_fallbacks_total {self.fallbacks}",
+                "# HELP chatbot_intent_hits_total Messages answered per intent.",
+                "# TYPE chatbot_intent_hits_total counter",
+            ]
+            for name, n in sorted(self.intent_hits.items()):
+                lines.append(f'chatbot_intent_hits_total{{intent="{_label(name)}"}} {n}')
+            lines += [
+                "# HELP chatbot_latency_seconds Latency per processing stage.",
+                "# TYPE chatbot_latency_seconds histogram",
+            ]
+            for stage, h in self.histograms.items():
+                cumulative = 0
+                for bound, c in zip(BUCKETS, h.counts):
+                    cumulative += c
+                    lines.append(f'chatbot_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'chatbot_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {h.total}')
+                lines.append(f'chatbot_latency_seconds_sum{{stage="{stage}"}} {h.sum}')
+                lines.append(f'chatbot_latency_seconds_count{{stage="{stage}"}} {h.total}')
+        return "\n".join(lines) + "\n"
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def load_stats(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class StatsFlusher:
+    """Background thread that writes the counters to stats.json every `interval` seconds."""
+
+    def __init__(self, metrics, path, interval=30.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._last = metrics.stats()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stats-flusher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+    def flush(self):
+        stats = self.metrics.stats()
+        if stats == self._last:
+            return
+        try:
+            write_json_atomic(self.path, stats)
+            self._last = stats
+        except OSError as e:
+            log.warning("could not write %s: %s", os.path.basename(self.path), e)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
@@ -0,0 +1,158 @@
+# backend/replay.py
+"""
+Replay a chat transcript through RuleBot offline (no HTTP, no transcript
+writes) and report throughput, per-stage match timing and the intent
+distribution. Useful for regression-testing rule changes against real traffic.
+
+Usage:
+    python replay.py chat_transcript.log
+    python replay.py big.log --workers 8          # fan out over a process pool
+    python replay.py chat_transcript.log --repeat 100 --json
+
+Both transcript formats written by transcript.py are understood. Messages of
+one session stay on one worker so its context (e.g. the user's name) carries
+over; a text transcript has no session ids, so with --workers it is split into
+contiguous chunks instead.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from metrics import Metrics
+from rulebot import RuleBot, RULES_FILE
+from sessions import new_context
+
+DEFAULT_SESSION = "replay"
+
+
+def read_messages(path):
+    """Return [(session_id, message)] for every user line of a text or JSONL transcript."""
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("{"):
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if rec.get("speaker") == "You" and rec.get("text"):
+                    out.append((rec.get("session_id") or DEFAULT_SESSION, rec["text"]))
+                continue
+            # "<iso timestamp> You: <message>"
+            parts = line.split(" ", 1)
+            if len(parts) == 2 and parts[1].startswith("You: ") and parts[1][5:].strip():
+                out.append((DEFAULT_SESSION, parts[1][5:]))
+    return out
+
+
+def replay(messages, rules_path=RULES_FILE):
+    """Answer `messages` in order with a fresh bot; return (metrics snapshot, seconds)."""
+    metrics = Metrics()
+    bot = RuleBot(rules_path, metrics=metrics)
+    contexts = {}
+    started = time.perf_counter()
+    for session_id, msg in messages:
+        context = contexts.get(session_id)
+        if context is None:
+            context = contexts[session_id] = new_context()
+        bot.respond(msg, context, session_id)
+    return metrics.snapshot(), time.perf_counter() - started
+
+
+def split(messages, n):
+    """Split into at most n chunks, keeping each session's messages together and in order."""
+    by_session = {}
+    for item in messages:
+        by_session.setdefault(item[0], []).append(item)
+    if len(by_session) < n:
+        size = -(-len(messages) // n)
+        return [messages[i:i + size] for i in range(0, len(messages), size)]
+    chunks = [[] for _ in range(n)]
+    # largest sessions first, each onto the currently smallest chunk
+    for group in sorted(by_session.values(), key=len, reverse=True):
+        min(chunks, key=len).extend(group)
+    return [c for c in chunks if c]
+
+
+def run(messages, rules_path=RULES_FILE, workers=1):
+    """Replay all messages, optionally over a process pool; return (Metrics, wall seconds)."""
+    started = time.perf_counter()
+    total = Metrics()
+    if workers <= 1 or len(messages) < 2:
+        snap, _ = replay(messages, rules_path)
+        total.merge(snap)
+    else:
+        chunks = split(messages, workers)
+        with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+            for snap, _ in pool.map(replay, chunks, [rules_path] * len(chunks)):
+                total.merge(snap)
+    return total, time.perf_counter() - started
+
+
+def report(metrics, elapsed, workers):
+    snap = metrics.snapshot()
+    n = snap["queries"]
+    out = {
+        "messages": n,
+        "workers": workers,
+        "elapsed_seconds": round(elapsed, 4),
+        "messages_per_second": round(n / elapsed, 1) if elapsed else None,
+        "fallbacks": snap["fallbacks"],
+        "stages": {},
+        "intents": dict(sorted(snap["intent_hits"].items(), key=lambda kv: -kv[1])),
+    }
+    for stage in ("match_regex", "match_keyword", "match_fuzzy"):
+        lat = snap["latency"][stage]
+        out["stages"][stage] = {
+            "count": lat["count"],
+            "total_seconds": round(lat["sum_seconds"], 4),
+            "mean_us": round(lat["mean_seconds"] * 1e6, 1) if lat["count"] else None,
+            "p50_le_us": lat["p50_seconds"] and lat["p50_seconds"] * 1e6,
+            "p99_le_us": lat["p99_seconds"] and lat["p99_seconds"] * 1e6,
+        }
+    return out
+
+
+def print_report(out):
+    print(f"messages:   {out['messages']}  (workers: {out['workers']})")
+    print(f"elapsed:    {out['elapsed_seconds']:.3f}s  ->  {out['messages_per_second']} msg/s")
+    print("stages:")
+    for stage, st in out["stages"].items():
+        print(f"  {stage:<14} count={st['count']:<8} total={st['total_seconds']:.4f}s "
+              f"mean={st['mean_us']}us p50<={st['p50_le_us']}us p99<={st['p99_le_us']}us")
+    n = out["messages"] or 1
+    print("intents:")
+    print(f"  {'fallback':<32} {out['fallbacks']:>8}  {100.0 * out['fallbacks'] / n:5.1f}%")
+    for name, c in out["intents"].items():
+        print(f"  {name:<32} {c:>8}  {100.0 * c / n:5.1f}%")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Replay a chat transcript through RuleBot.")
+    ap.add_argument("transcript", help="chat_transcript.log (text or JSONL)")
+    ap.add_argument("--rules", default=RULES_FILE, help="rules.json to replay against")
+    ap.add_argument("--workers", type=int, default=1, help="process pool size (default: 1)")
+    ap.add_argument("--repeat", type=int, default=1, help="replay the log this many times")
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = ap.parse_args(argv)
+
+    messages = read_messages(args.transcript) * max(1, args.repeat)
+    if not messages:
+        print(f"no user messages found in {args.transcript}", file=sys.stderr)
+        return 1
+    workers = max(1, min(args.workers, os.cpu_count() or 1))
+    metrics, elapsed = run(messages, os.path.abspath(args.rules), workers)
+    out = report(metrics, elapsed, workers)
+    if args.json:
+        print(json.dumps(out, indent=2))
+    else:
+        print_report(out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# backend/rulebot.py
+"""
+RuleBot: rule-based intent matching and reply generation.
+
+Kept free of Flask and of module-level side effects so the same bot can be
+used by the web app (app.py) and by offline tools such as replay.py.
+"""
+import os, re, random, threading
+from matcher import normalize
+from ruleset import RuleSet
+from sessions import new_context
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RULES_FILE = os.path.join(BASE_DIR, "rules.json")
+
+class RuleBot:
+    def __init__(self, rules_path=RULES_FILE, metrics=None, transcript=None):
+        self.rules_path = rules_path
+        # optional Metrics: reply counters + per-stage match latency
+        self.metrics = metrics
+        # optional TranscriptWriter; None disables transcript logging
+        self.transcript = transcript
+        # serializes writers (reload / add_intent); readers never take it
+        self._write_lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        # build the new snapshot off to the side, then publish it with one assignment
+        with self._write_lock:
+            self.snapshot = RuleSet.load(self.rules_path)
+
+    def add_intent(self, intent):
+        """Append an intent: extend the live snapshot, write rules.json atomically, swap."""
+        with self._write_lock:
+            snap = self.snapshot
+            if snap.changed_on_disk(self.rules_path):
+                # someone edited the file since our last load; don't overwrite their change
+                snap = RuleSet.load(self.rules_path)
+            snap = snap.with_intent(intent)
+            snap.save(self.rules_path)
+            self.snapshot = snap
+
+    # read-only views of the current snapshot
+    @property
+    def rules(self):
+        return self.snapshot.rules
+
+    @property
+    def intents(self):
+        return self.snapshot.intents
+
+    @property
+    def settings(self):
+        return self.snapshot.settings
+
+    def normalize(self, t):
+        return normalize(t)
+
+    def match_intent(self, text):
+        return self.snapshot.matcher.match(text)
+
+    def save_transcript(self, txt, reply, intent=None, session_id=None):
+        # enqueue only: the writer thread does the disk I/O off the request path
+        if self.transcript is not None:
+            self.transcript.log("You", txt, session_id=session_id, intent=intent)
+            self.transcript.log("Bot", reply, session_id=session_id, intent=intent)
+
+    def respond(self, user_input, context=None, session_id=None):
+        # the bot holds no per-user state: the caller passes the session context
+        # in and gets it back (mutated) in the result, so threads can share one bot
+        if context is None:
+            context = new_context()
+        result = self._respond(user_input, context, session_id)
+        if self.metrics is not None:
+            self.metrics.record_reply(result["intent"])
+        return result
+
+    def _respond(self, user_input, context, session_id):
+        # one snapshot for the whole request, even if rules are swapped meanwhile
+        snap = self.snapshot
+        observe = self.metrics.observe if self.metrics is not None else None
+        txt = user_input.strip()
+        if txt.lower() in ("help", "commands"):
+            return {"reply": "Commands: 'quit' to exit. Try: 'hi', 'my name is ...', 'i need project help'.", "intent":"help", "context": context}
+        intent, m = snap.matcher.match(txt, observe)
+        if intent is None:
+            fallback = snap.fallback
+            reply = random.choice(fallback.get("responses")) if fallback else "Sorry, I didn't understand. Try rephrasing."
+            context["last_intent"] = "fallback"
+            self.save_transcript(txt, reply, "fallback", session_id)
+            return {"reply": reply, "intent": "fallback", "context": context}
+        context["last_intent"] = intent.get("name")
+        # set_name special handling
+        if intent.get("name") == "set_name":
+            name = None
+            if m and m.groups():
+                name = m.groups()[0].strip()
+            else:
+                mm = re.search(r"my name is\s+([\w\s]+)", txt, flags=re.I)
+                if mm:
+                    name = mm.group(1).strip()
+                else:
+                    mm2 = re.search(r"i am\s+([\w\s]+)", txt, flags=re.I)
+                    if mm2:
+                        name = mm2.group(1).strip()
+            if name:
+                name = " ".join(name.split()[:2]).title()
+                context["user_name"] = name
+                reply = random.choice(intent.get("responses", [])).format(name=name)
+                self.save_transcript(txt, reply, "set_name", session_id)
+                return {"reply": reply, "intent": "set_name", "context": context}
+            else:
+                reply = "I didn't catch your name — what should I call you?"
+                self.save_transcript(txt, reply, "set_name.ask", session_id)
+                return {"reply": reply, "intent": "set_name.ask", "context": context}
+        # ask user name
+        if "what is my name" in txt.lower() or "do you remember my name" in txt.lower():
+            if context.get("user_name"):
+                reply = f"Yes — you're {context['user_name']}."
+            else:
+                reply = "I don't know your name yet. You can say 'my name is ...'."
+            self.save_transcript(txt, reply, "ask_user_name", session_id)
+            return {"reply": reply, "intent": "ask_user_name", "context": context}
+        # default
+        resp_template = random.choice(intent.get("responses", ["Okay."]))
+        reply = resp_template.format(name=context.get("user_name") or "")
+        self.save_transcript(txt, reply, intent.get("name"), session_id)
+        return {"reply": reply, "intent": intent.get("name"), "context": context}
@@ -0,0 +1,118 @@
+# backend/ruleset.py
+"""
+Immutable rules snapshots for RuleBot.
+
+A RuleSet bundles everything derived from one version of rules.json (raw
+rules, intents, settings, compiled matcher, fallback intent). It is built off
+to the side and published by replacing a single reference, so a request that
+grabbed a snapshot keeps a consistent view while a reload or add_intent runs.
+
+- write_json_atomic() replaces rules.json / stats.json atomically (temp file + rename)
+- RulesWatcher polls the file's mtime and hot-reloads external edits
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from matcher import IntentMatcher
+
+log = logging.getLogger(__name__)
+
+
+def load_rules(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def file_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def write_json_atomic(path, data):
+    """Write JSON to `path` atomically; readers see the old or the new file, never half of one."""
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates 0600 files; keep the permissions of the file we replace
+        try:
+            os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class RuleSet:
+    def __init__(self, rules, matcher=None, mtime=None):
+        self.rules = rules
+        self.intents = rules.get("intents", [])
+        self.settings = rules.get("settings", {})
+        self.fuzzy_threshold = float(self.settings.get("fuzzy_threshold", 0.6))
+        # compile patterns once per load instead of on every message
+        self.matcher = matcher or IntentMatcher(
+            self.intents, self.fuzzy_threshold,
+            fuzzy_shortlist=int(self.settings.get("fuzzy_shortlist", 32)),
+            fuzzy_parity=bool(self.settings.get("fuzzy_parity", False)),
+        )
+        self.fallback = next((it for it in self.intents if it.get("name") == "fallback"), None)
+        self.mtime = mtime
+
+    @classmethod
+    def load(cls, path):
+        # stat before reading so an edit that lands mid-read is picked up next time
+        mtime = file_mtime(path)
+        return cls(load_rules(path), mtime=mtime)
+
+    def with_intent(self, intent):
+        """New snapshot with `intent` appended; the matcher is extended incrementally."""
+        rules = dict(self.rules)
+        rules["intents"] = list(self.intents) + [intent]
+        return RuleSet(rules, matcher=self.matcher.with_intent(intent), mtime=self.mtime)
+
+    def save(self, path):
+        write_json_atomic(path, self.rules)
+        self.mtime = file_mtime(path)
+
+    def changed_on_disk(self, path):
+        return file_mtime(path) != self.mtime
+
+
+class RulesWatcher:
+    """Background thread that reloads the bot when rules.json changes on disk."""
+
+    def __init__(self, bot, interval=2.0):
+        self.bot = bot
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rules-watcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self.bot.snapshot.changed_on_disk(self.bot.rules_path):
+                continue
+            try:
+                self.bot.reload()
+                log.info("rules reloaded from %s", self.bot.rules_path)
+            except (OSError, ValueError) as e:
+                # half-written or invalid file: keep serving the current snapshot
+                log.warning("rules reload failed: %s", e)
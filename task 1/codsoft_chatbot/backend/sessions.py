@@ -0,0 +1,201 @@
+# backend/sessions.py
+"""
+Bounded per-session context store.
+
+SessionStore applies the policy (idle-TTL expiry, max size with LRU eviction,
+counters); a backend only has to keep (context, last_seen) per session id and
+be able to list ids oldest-first. Two backends ship here:
+
+- MemoryBackend: in-process OrderedDict (default, lost on restart)
+- SQLiteBackend: a single SQLite file, survives restarts and can be shared
+  by several worker processes on the same host
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def new_context():
+    return {"user_name": None, "last_intent": None}
+
+
+class SessionBackend:
+    """Interface for session storage backends."""
+
+    name = "base"
+
+    def load(self, sid):
+        """Return (context, last_seen) or None."""
+        raise NotImplementedError
+
+    def save(self, sid, context, last_seen):
+        raise NotImplementedError
+
+    def delete(self, sid):
+        raise NotImplementedError
+
+    def oldest(self, limit):
+        """Return up to `limit` (sid, last_seen) pairs, least recently used first."""
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryBackend(SessionBackend):
+    name = "memory"
+
+    def __init__(self):
+        self._data = OrderedDict()
+
+    def load(self, sid):
+        return self._data.get(sid)
+
+    def save(self, sid, context, last_seen):
+        self._data[sid] = (context, last_seen)
+        self._data.move_to_end(sid)
+
+    def delete(self, sid):
+        self._data.pop(sid, None)
+
+    def oldest(self, limit):
+        out = []
+        for sid, (_, seen) in self._data.items():
+            if len(out) >= limit:
+                break
+            out.append((sid, seen))
+        return out
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend(SessionBackend):
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " sid TEXT PRIMARY KEY, context TEXT NOT NULL, last_seen REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions(last_seen)")
+
+    def load(self, sid):
+        row = self._conn.execute(
+            "SELECT context, last_seen FROM sessions WHERE sid = ?", (sid,)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def save(self, sid, context, last_seen):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sessions (sid, context, last_seen) VALUES (?, ?, ?)",
+            (sid, json.dumps(context, ensure_ascii=False), last_seen),
+        )
+
+    def delete(self, sid):
+        self._conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def oldest(self, limit):
+        return self._conn.execute(
+            "SELECT sid, last_seen FROM sessions ORDER BY last_seen LIMIT ?", (limit,)
+        ).fetchall()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class SessionStore:
+    """
+    get() returns the context for a session (a fresh one if it is unknown or
+    idle for longer than `ttl` seconds); put() writes it back and evicts the
+    least recently used sessions once there are more than `max_size`.
+    """
+
+    def __init__(self, backend=None, ttl=1800, max_size=10000, sweep_every=256):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.max_size = max_size
+        self.sweep_every = sweep_every
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+        self._ops = 0
+        # upper bound on the backend's size (every put counts as a new session);
+        # the backend is only counted again when this passes max_size, and on
+        # every sweep, which also picks up other processes sharing a SQLite file
+        self._size = len(self.backend)
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        now = time.time()
+        with self._lock:
+            found = self.backend.load(sid)
+            if found is not None:
+                context, seen = found
+                if not self.ttl or now - seen <= self.ttl:
+                    return context
+                self.backend.delete(sid)
+                self._size -= 1
+                self.expired += 1
+            self.created += 1
+            return new_context()
+
+    def put(self, sid, context):
+        now = time.time()
+        with self._lock:
+            self.backend.save(sid, context, now)
+            self._size += 1
+            self._ops += 1
+            if self._ops % self.sweep_every == 0:
+                if self.ttl:
+                    self._sweep(now)
+                self._size = len(self.backend)
+            if self.max_size and self._size > self.max_size:
+                self._size = len(self.backend)
+                over = self._size - self.max_size
+                if over > 0:
+                    for old_sid, _ in self.backend.oldest(over):
+                        self.backend.delete(old_sid)
+                        self._size -= 1
+                        self.evicted += 1
+
+    def _sweep(self, now):
+        # idle sessions sit at the front of the LRU order, so stop at the first live one
+        while True:
+            batch = self.backend.oldest(128)
+            stale = [sid for sid, seen in batch if now - seen > self.ttl]
+            for sid in stale:
+                self.backend.delete(sid)
+            self.expired += len(stale)
+            if len(stale) < len(batch) or not batch:
+                return
+
+    def stats(self):
+        with self._lock:
+            size = len(self.backend)
+        return {
+            "backend": self.backend.name,
+            "size": size,
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+    def close(self):
+        with self._lock:
+            self.backend.close()
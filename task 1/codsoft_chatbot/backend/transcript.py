@@ -0,0 +1,145 @@
+# backend/transcript.py
+"""
+Background transcript sink for the chatbot.
+
+Request threads only put records on a bounded queue; a single writer thread
+drains it in batches, keeps the log file open, rotates it by size and/or age
+and flushes whatever is left on shutdown. When the queue is full new records
+are dropped (and counted) rather than blocking the request.
+
+Two output formats:
+- "text":  "<iso timestamp> You: <message>" (the original chat_transcript.log format)
+- "jsonl": one JSON object per line with ts, session_id, speaker, text and intent
+"""
+import json
+import os
+import queue
+import threading
+import time
+import datetime
+import atexit
+
+_STOP = object()
+
+
+class TranscriptWriter:
+    def __init__(self, path, fmt="text", max_queue=10000, batch_size=256,
+                 flush_interval=0.5, max_bytes=0, rotate_seconds=0, backups=5, observe=None):
+        self.path = path
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes            # 0 disables size rotation
+        self.rotate_seconds = rotate_seconds  # 0 disables time rotation
+        self.backups = backups
+        self.observe = observe                # observe(stage, seconds) per batch write
+        self.written = 0
+        self.dropped = 0
+        # dropped is bumped by request threads and the writer thread alike
+        self._count_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._file = None
+        self._opened_at = 0.0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="transcript-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, speaker, text, session_id=None, intent=None):
+        """Queue one transcript line. Never blocks; returns False if it was dropped."""
+        if self._closed:
+            return False
+        rec = {
+            "ts": datetime.datetime.now().isoformat(),
+            "session_id": session_id,
+            "speaker": speaker,
+            "text": text,
+            "intent": intent,
+        }
+        try:
+            self._queue.put_nowait(rec)
+            return True
+        except queue.Full:
+            with self._count_lock:
+                self.dropped += 1
+            return False
+
+    def close(self, timeout=5.0):
+        """Flush pending records and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # writer thread
+
+    def _format(self, rec):
+        if self.fmt == "jsonl":
+            return json.dumps(rec, ensure_ascii=False) + "\n"
+        return f"{rec['ts']} {rec['speaker']}: {rec['text']}\n"
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._opened_at = time.time()
+
+    def _should_rotate(self):
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            return True
+        if self.rotate_seconds and time.time() - self._opened_at >= self.rotate_seconds:
+            return True
+        return False
+
+    def _rotate(self):
+        self._file.close()
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                src = f"{self.path}.{i}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def _write_batch(self, batch):
+        t0 = time.perf_counter()
+        if self._file is None:
+            self._open()
+        elif self._should_rotate():
+            self._rotate()
+        self._file.write("".join(self._format(rec) for rec in batch))
+        self._file.flush()
+        self.written += len(batch)
+        if self.observe is not None:
+            self.observe("transcript_write", time.perf_counter() - t0)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            try:
+                rec = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            while True:
+                if rec is _STOP:
+                    stop = True
+                    break
+                batch.append(rec)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    rec = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except OSError:
+                    # keep serving requests even if the disk is unhappy
+                    with self._count_lock:
+                        self.dropped += len(batch)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
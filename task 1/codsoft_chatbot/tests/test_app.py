@@ -0,0 +1,66 @@
+import os, sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+import app as webapp
+from metrics import Metrics
+from sessions import MemoryBackend, SessionStore
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # keep the real chat_transcript.log, stats.json and session store untouched
+    metrics = Metrics()
+    monkeypatch.setattr(webapp.bot, "transcript", None)
+    monkeypatch.setattr(webapp.bot, "metrics", metrics)
+    monkeypatch.setattr(webapp, "metrics", metrics)
+    monkeypatch.setattr(webapp, "sessions", SessionStore(MemoryBackend()))
+    return webapp.app.test_client()
+
+
+def test_batch_answers_in_order_with_per_item_errors(client):
+    items = [
+        {"session_id": "a", "message": "hello"},
+        {"session_id": "a"},
+        "not an item",
+        {"session_id": "b", "message": "bye"},
+        {"message": "hello"},
+    ]
+    data = client.post("/api/chat/batch", json={"items": items}).get_json()
+    assert data["success"] and data["count"] == 5
+    res = data["results"]
+    assert [r["success"] for r in res] == [True, False, False, True, True]
+    assert res[1]["error"] == res[2]["error"] == "Missing 'message' field."
+    assert (res[0]["intent"], res[0]["session_id"]) == ("greeting", "a")
+    assert (res[3]["intent"], res[3]["session_id"]) == ("goodbye", "b")
+    assert res[4]["notice"] == "new_session_id_created" and res[4]["session_id"] not in ("a", "b")
+    assert "notice" not in res[0]
+    assert webapp.metrics.snapshot()["queries"] == 3
+
+
+def test_batch_carries_session_context_across_items(client):
+    items = [
+        {"session_id": "s", "message": "hello"},
+        {"session_id": "s", "message": "my name is Ada"},
+        {"session_id": "s", "message": "bye"},
+        {"session_id": "t", "message": "bye"},
+    ]
+    res = client.post("/api/chat/batch", json={"items": items}).get_json()["results"]
+    # each result holds the context as it was after that item, not the final one
+    assert [r["context"]["user_name"] for r in res] == [None, "Ada", "Ada", None]
+    assert [r["context"]["last_intent"] for r in res[:3]] == ["greeting", "set_name", "goodbye"]
+    # the batch writes each session back, so a later single call sees it
+    data = client.post("/api/chat", json={"session_id": "s", "message": "hello"}).get_json()
+    assert data["context"]["user_name"] == "Ada"
+
+
+def test_batch_rejects_bad_payloads(client, monkeypatch):
+    assert client.post("/api/chat/batch", json={"items": "hello"}).status_code == 400
+    assert client.post("/api/chat/batch", json={}).status_code == 400
+    monkeypatch.setitem(webapp.bot.settings, "batch_max_items", 2)
+    items = [{"session_id": "a", "message": "hello"}] * 3
+    assert client.post("/api/chat/batch", json={"items": items}).status_code == 413
+    assert webapp.metrics.snapshot()["queries"] == 0
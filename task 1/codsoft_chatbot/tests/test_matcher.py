@@ -0,0 +1,178 @@
+import difflib, json, os, random, re, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from matcher import FuzzyIndex, IntentMatcher, normalize
+
+with open(os.path.join(ROOT, "backend", "rules.json"), encoding="utf-8") as f:
+    RULES = json.load(f)
+INTENTS = RULES["intents"]
+THRESHOLD = float(RULES["settings"]["fuzzy_threshold"])
+
+
+def reference_match(intents, text, cutoff):
+    """The per-message scan RuleBot.match_intent did before IntentMatcher."""
+    ntext = normalize(text)
+    for intent in intents:
+        for patt in intent.get("patterns", []):
+            if any(ch in patt for ch in "()[]\\.*+?"):
+                try:
+                    m = re.search(patt, text, flags=re.I)
+                    if m:
+                        return intent, m
+                except re.error:
+                    continue
+    tokens = ntext.split()
+    for intent in intents:
+        for patt in intent.get("patterns", []):
+            npatt = normalize(patt)
+            if not npatt:
+                continue
+            if npatt in ntext:
+                return intent, None
+            if all(w in tokens for w in npatt.split()):
+                return intent, None
+    allp, p2i = [], {}
+    for intent in intents:
+        for patt in intent.get("patterns", []):
+            npatt = normalize(patt)
+            if npatt:
+                allp.append(npatt)
+                p2i[npatt] = intent
+    if allp:
+        matches = difflib.get_close_matches(ntext, allp, n=1, cutoff=cutoff)
+        if matches:
+            return p2i[matches[0]], None
+    return None, None
+
+
+def typo(word, rng):
+    if len(word) < 2:
+        return word
+    i = rng.randrange(len(word))
+    op = rng.randrange(3)
+    if op == 0:
+        return word[:i] + word[i + 1:]
+    if op == 1:
+        return word[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + word[i:]
+    return word[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + word[i + 1:]
+
+
+def messages(n, seed=0):
+    rng = random.Random(seed)
+    patterns = [p for intent in INTENTS for p in intent.get("patterns", [])]
+    words = sorted({w for p in patterns for w in normalize(p).split()})
+    out = []
+    for _ in range(n):
+        kind = rng.randrange(4)
+        if kind == 0:
+            text = rng.choice(patterns)
+        elif kind == 1:
+            text = " ".join(typo(w, rng) for w in rng.choice(patterns).split())
+        elif kind == 2:
+            text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 6)))
+        else:
+            text = " ".join(typo(rng.choice(words), rng) for _ in range(rng.randint(1, 3)))
+        if rng.random() < 0.3:
+            text = text.upper() + rng.choice(["!", "?", " ...", ""])
+        out.append(text)
+    return out
+
+
+def same(got, want):
+    (gi, gm), (wi, wm) = got, want
+    assert gi is wi
+    assert (gm is None) == (wm is None)
+    if gm is not None:
+        assert gm.group(0) == wm.group(0)
+
+
+def test_matcher_agrees_with_reference_scan():
+    matcher = IntentMatcher(INTENTS, THRESHOLD, fuzzy_parity=True)
+    for text in messages(1000):
+        same(matcher.match(text), reference_match(INTENTS, text, THRESHOLD))
+    assert matcher.parity_checks > 0
+
+
+def test_regex_and_keyword_stages_match_reference_without_parity():
+    matcher = IntentMatcher(INTENTS, THRESHOLD)
+    for text in messages(1000, seed=1):
+        want = reference_match(INTENTS, text, THRESHOLD)
+        intent, m = matcher.match_regex(text)
+        if intent is None:
+            intent = matcher.match_keyword(normalize(text))
+        if intent is not None:
+            same((intent, m), want)
+
+
+def test_first_keyword_pattern_in_rules_order_wins():
+    intents = [
+        {"tag": "a", "patterns": ["help"]},
+        {"tag": "b", "patterns": ["project help", "help"]},
+        {"tag": "c", "patterns": ["need help with my project"]},
+    ]
+    matcher = IntentMatcher(intents)
+    for text in ["i need help with my project", "project help please", "help"]:
+        assert matcher.match(text)[0]["tag"] == "a"
+        assert reference_match(intents, text, 0.6)[0]["tag"] == "a"
+    # all-words match of a later pattern still loses to an earlier substring
+    intents = [{"tag": "x", "patterns": ["project"]}, {"tag": "y", "patterns": ["help project"]}]
+    assert IntentMatcher(intents).match("project help")[0]["tag"] == "x"
+
+
+def test_added_intents_rank_after_existing_ones():
+    matcher = IntentMatcher(INTENTS, THRESHOLD, fuzzy_parity=True)
+    extra = {"tag": "extra", "patterns": ["hello there", "purple elephant"]}
+    grown = matcher.with_intent(extra)
+    intents = INTENTS + [extra]
+    for text in ["hello there", "purple elephant", "purpel elefant", "hi"] + messages(300, seed=2):
+        same(grown.match(text), reference_match(intents, text, THRESHOLD))
+
+
+def test_fuzzy_parity_answers_with_difflib(monkeypatch):
+    words = [f"pattern number {i}" for i in range(40)]
+    intents = [{"tag": w, "patterns": [w]} for w in words]
+    text = "patern numbr 37"
+    expected = difflib.get_close_matches(text, words, n=1, cutoff=0.6)[0]
+    parity = IntentMatcher(intents, 0.6, fuzzy_parity=True)
+    assert parity.match(text)[0]["tag"] == expected
+    assert (parity.parity_checks, parity.parity_mismatches) == (1, 0)
+    # when the index gets it wrong, parity mode still answers with difflib
+    monkeypatch.setattr(parity.fuzzy, "best_match", lambda t: (1.0, "pattern number 3"))
+    assert parity.match(text)[0]["tag"] == expected
+    assert (parity.parity_checks, parity.parity_mismatches) == (2, 1)
+    fast = IntentMatcher(intents, 0.6)
+    monkeypatch.setattr(fast.fuzzy, "best_match", lambda t: (1.0, "pattern number 3"))
+    assert fast.match(text)[0]["tag"] == "pattern number 3"
+
+
+def test_fuzzy_no_match_below_cutoff():
+    matcher = IntentMatcher(INTENTS, THRESHOLD, fuzzy_parity=True)
+    assert matcher.match("zzzzzzzzzzqqqq") == (None, None)
+    assert matcher.parity_mismatches == 0
+
+
+def test_fuzzy_index_agrees_with_difflib_on_a_large_rule_set():
+    rng = random.Random(5)
+    syllables = ["ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "pe", "da", "go", "hu", "ze", "bo"]
+    vocab = sorted({"".join(rng.choice(syllables) for _ in range(rng.randint(1, 4))) for _ in range(1500)})
+    patterns = sorted({" ".join(rng.choice(vocab) for _ in range(rng.randint(1, 6))) for _ in range(2000)})
+    index = FuzzyIndex(0.6)
+    for p in patterns:
+        index.add(p)
+    queries = []
+    for _ in range(100):
+        q = rng.choice(patterns)
+        for _ in range(rng.randint(1, 4)):
+            q = typo(q, rng) or q
+        if rng.random() < 0.3:
+            q += " " + rng.choice(vocab)
+        queries.append(normalize(q))
+    mismatches = 0
+    for q in queries:
+        want = difflib.get_close_matches(q, patterns, n=1, cutoff=0.6)
+        if index.lookup(q) != (want[0] if want else None):
+            mismatches += 1
+    # the shortlist is a heuristic: allow the odd near-tie, not a systematic bias
+    assert mismatches <= len(queries) // 50, mismatches
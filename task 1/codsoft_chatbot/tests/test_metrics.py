@@ -0,0 +1,85 @@
+import json, os, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from metrics import BUCKETS, Histogram, Metrics, StatsFlusher, load_stats
+
+
+def test_histogram_buckets_and_quantiles():
+    h = Histogram()
+    assert h.quantile(0.5) is None
+    for seconds in [0.00004] * 50 + [0.003] * 40 + [0.2] * 9 + [10.0]:
+        h.observe(seconds)
+    assert h.total == 100 and abs(h.sum - (50 * 0.00004 + 40 * 0.003 + 9 * 0.2 + 10.0)) < 1e-9
+    assert h.quantile(0.50) == 0.00005
+    assert h.quantile(0.90) == 0.005
+    assert h.quantile(0.99) == 0.25
+    assert h.quantile(1.0) == float("inf")
+    # a value on a bucket bound goes into that bucket
+    h = Histogram()
+    h.observe(BUCKETS[3])
+    assert h.counts[3] == 1
+
+
+def test_prometheus_exposition():
+    m = Metrics({"queries": 5, "fallbacks": 1, "intent_hits": {"greeting": 4}})
+    m.record_reply("greeting")
+    m.record_reply("fallback")
+    m.record_reply('say "hi"')
+    m.observe("match_regex", 0.00002)
+    m.observe("match_regex", 0.003)
+    m.observe("custom_stage", 3.0)
+    text = m.prometheus()
+    lines = text.splitlines()
+    assert text.endswith("\n")
+    assert "chatbot_queries_total 8" in lines
+    assert "chatbot_fallbacks_total 2" in lines
+    assert 'chatbot_intent_hits_total{intent="greeting"} 5' in lines
+    assert 'chatbot_intent_hits_total{intent="say \\"hi\\""} 1' in lines
+    assert "# TYPE chatbot_latency_seconds histogram" in lines
+    # buckets are cumulative and end with +Inf == count
+    regex = [l for l in lines if l.startswith('chatbot_latency_seconds_bucket{stage="match_regex"')]
+    assert len(regex) == len(BUCKETS) + 1
+    values = [int(l.rsplit(" ", 1)[1]) for l in regex]
+    assert values == sorted(values) and values[0] == 1 and values[-1] == 2
+    assert 'chatbot_latency_seconds_bucket{stage="match_regex",le="0.005"} 2' in lines
+    assert 'chatbot_latency_seconds_count{stage="match_regex"} 2' in lines
+    assert 'chatbot_latency_seconds_bucket{stage="custom_stage",le="2.5"} 0' in lines
+    assert 'chatbot_latency_seconds_bucket{stage="custom_stage",le="+Inf"} 1' in lines
+    for line in lines:
+        assert line.startswith("#") or len(line.rsplit(" ", 1)) == 2
+
+
+def test_snapshot_merges_into_another_metrics():
+    worker = Metrics()
+    worker.record_reply("greeting")
+    worker.observe("request", 0.001)
+    total = Metrics({"queries": 1, "intent_hits": {"greeting": 1}})
+    total.merge(worker.snapshot())
+    snap = total.snapshot()
+    assert snap["queries"] == 2 and snap["intent_hits"] == {"greeting": 2}
+    assert snap["latency"]["request"]["count"] == 1
+    assert snap["latency"]["request"]["p50_seconds"] == 0.001
+
+
+def test_flusher_persists_counters(tmp_path):
+    path = str(tmp_path / "stats.json")
+    m = Metrics(load_stats(path))
+    assert m.stats() == {"intent_hits": {}, "fallbacks": 0, "queries": 0}
+    flusher = StatsFlusher(m, path, interval=0.02).start()
+    try:
+        m.record_reply("greeting")
+        m.record_reply("fallback")
+        deadline = time.time() + 3
+        while load_stats(path).get("queries") != 2 and time.time() < deadline:
+            time.sleep(0.01)
+        assert load_stats(path) == {"intent_hits": {"greeting": 1}, "fallbacks": 1, "queries": 2}
+        m.record_reply("thanks")
+    finally:
+        flusher.stop()     # writes whatever changed since the last flush
+    with open(path, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert saved == {"intent_hits": {"greeting": 1, "thanks": 1}, "fallbacks": 1, "queries": 3}
+    # a restart continues from the saved counters
+    assert Metrics(load_stats(path)).stats() == saved
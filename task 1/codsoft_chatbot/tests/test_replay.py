@@ -0,0 +1,64 @@
+import json, os, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+import replay
+
+TRANSCRIPT = [
+    "2024-01-01T10:00:00 You: hello",
+    "2024-01-01T10:00:00 Bot: Hi there!",
+    "2024-01-01T10:00:05 You: my name is Ada",
+    "2024-01-01T10:00:05 Bot: Nice to meet you, Ada!",
+    "2024-01-01T10:00:09 You:    ",
+    "2024-01-01T10:00:10 You: qwzx vbnm",
+    json.dumps({"ts": "2024-01-01T10:01:00", "speaker": "You", "text": "hello", "session_id": "s1"}),
+    json.dumps({"ts": "2024-01-01T10:01:00", "speaker": "Bot", "text": "Hi!", "session_id": "s1"}),
+    json.dumps({"ts": "2024-01-01T10:01:02", "speaker": "You", "text": "bye", "session_id": "s2"}),
+    json.dumps({"ts": "2024-01-01T10:01:03", "speaker": "You", "text": "bye"}),
+    "{not json",
+]
+
+
+def write_transcript(tmp_path):
+    path = tmp_path / "chat_transcript.log"
+    path.write_text("\n".join(TRANSCRIPT) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_read_messages_mixes_text_and_jsonl(tmp_path):
+    assert replay.read_messages(write_transcript(tmp_path)) == [
+        ("replay", "hello"),
+        ("replay", "my name is Ada"),
+        ("replay", "qwzx vbnm"),
+        ("s1", "hello"),
+        ("s2", "bye"),
+        ("replay", "bye"),
+    ]
+
+
+def test_replay_report(tmp_path, capsys):
+    assert replay.main([write_transcript(tmp_path), "--repeat", "3", "--json"]) == 0
+    out = json.loads(capsys.readouterr().out)
+    assert out["messages"] == 18 and out["workers"] == 1
+    assert out["messages_per_second"] > 0
+    assert out["fallbacks"] == 3
+    assert out["intents"] == {"greeting": 6, "goodbye": 6, "set_name": 3}
+    # intents are listed most frequent first
+    assert list(out["intents"].values()) == sorted(out["intents"].values(), reverse=True)
+    assert out["stages"]["match_regex"]["count"] == 18
+
+
+def test_replay_over_workers_matches_single_process(tmp_path):
+    messages = replay.read_messages(write_transcript(tmp_path)) * 4
+    single, _ = replay.run(messages, workers=1)
+    pooled, _ = replay.run(messages, workers=2)
+    assert pooled.snapshot()["intent_hits"] == single.snapshot()["intent_hits"]
+    assert pooled.snapshot()["queries"] == len(messages)
+
+
+def test_empty_transcript(tmp_path, capsys):
+    path = tmp_path / "empty.log"
+    path.write_text("2024-01-01T10:00:00 Bot: nobody here\n", encoding="utf-8")
+    assert replay.main([str(path)]) == 1
+    assert "no user messages" in capsys.readouterr().err
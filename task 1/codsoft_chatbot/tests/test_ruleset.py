@@ -0,0 +1,117 @@
+import json, os, shutil, sys, time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+import matcher
+from matcher import IntentMatcher
+from rulebot import RuleBot
+from ruleset import RuleSet, RulesWatcher, load_rules, write_json_atomic
+
+ELEPHANT = {"name": "elephant", "patterns": ["purple elephant"], "responses": ["Trunk call!"]}
+
+
+@pytest.fixture
+def rules_path(tmp_path):
+    path = str(tmp_path / "rules.json")
+    shutil.copy(os.path.join(ROOT, "backend", "rules.json"), path)
+    return path
+
+
+def intent_name(bot, text):
+    intent, _ = bot.match_intent(text)
+    return intent["name"] if intent else None
+
+
+def test_add_intent_leaves_earlier_snapshots_alone(rules_path):
+    bot = RuleBot(rules_path)
+    before = bot.snapshot
+    n = len(before.intents)
+    assert intent_name(bot, "purple elephant") != "elephant"
+
+    bot.add_intent(ELEPHANT)
+    assert intent_name(bot, "I saw a purple elephant") == "elephant"
+    assert intent_name(bot, "hello") == "greeting"
+    # a request still holding the old snapshot sees the old rules
+    assert len(before.intents) == n and len(before.rules["intents"]) == n
+    intent, _ = before.matcher.match("purple elephant")
+    assert intent is None or intent["name"] != "elephant"
+    # rules.json was rewritten with the new intent
+    on_disk = load_rules(rules_path)["intents"]
+    assert len(on_disk) == n + 1 and on_disk[-1] == ELEPHANT
+    assert not bot.snapshot.changed_on_disk(rules_path)
+
+
+def test_overflow_list_is_rebuilt_past_the_threshold():
+    base = [{"name": "greeting", "patterns": ["hello", "hi there"]}]
+    m = IntentMatcher(base)
+    added = []
+    step = 0
+    while len(m.extra) + 10 <= matcher.REBUILD_AFTER:
+        intent = {"name": f"topic{step}", "patterns": [f"topic {step} word {i}" for i in range(10)]}
+        added.append(intent)
+        m = m.with_intent(intent)
+        step += 1
+        assert len(m.extra) == 10 * step
+    assert m.match("topic 3 word 7 please")[0]["name"] == "topic3"
+    # one more intent pushes the overflow list past REBUILD_AFTER: full rebuild
+    intent = {"name": "last", "patterns": [f"last word {i}" for i in range(10)]}
+    m = m.with_intent(intent)
+    assert m.extra == []
+    fresh = IntentMatcher(base + added + [intent])
+    for text in ["hello", "topic 0 word 1", "last word 9", "topik 2 wrd 5", "nothing at all"]:
+        assert m.match(text) == fresh.match(text)
+
+
+def test_add_intent_keeps_an_external_edit(rules_path):
+    bot = RuleBot(rules_path)
+    rules = load_rules(rules_path)
+    rules["intents"].append({"name": "external", "patterns": ["edited by hand"], "responses": ["ok"]})
+    time.sleep(0.01)
+    write_json_atomic(rules_path, rules)
+    bot.add_intent(ELEPHANT)
+    names = [i["name"] for i in load_rules(rules_path)["intents"]]
+    assert names[-2:] == ["external", "elephant"]
+    assert intent_name(bot, "edited by hand") == "external"
+
+
+def wait_for(cond, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_watcher_reloads_after_an_external_edit(rules_path):
+    bot = RuleBot(rules_path)
+    watcher = RulesWatcher(bot, interval=0.02).start()
+    try:
+        old = bot.snapshot
+        rules = load_rules(rules_path)
+        rules["intents"].append(ELEPHANT)
+        time.sleep(0.01)
+        write_json_atomic(rules_path, rules)
+        assert wait_for(lambda: bot.snapshot is not old)
+        assert intent_name(bot, "purple elephant") == "elephant"
+
+        # a broken file is ignored; the bot keeps the last good rules
+        current = bot.snapshot
+        time.sleep(0.01)
+        with open(rules_path, "w", encoding="utf-8") as f:
+            f.write("{not json")
+        time.sleep(0.2)
+        assert bot.snapshot is current
+        assert intent_name(bot, "purple elephant") == "elephant"
+    finally:
+        watcher.stop()
+
+
+def test_ruleset_save_is_atomic_and_round_trips(rules_path):
+    snap = RuleSet.load(rules_path).with_intent(ELEPHANT)
+    snap.save(rules_path)
+    assert RuleSet.load(rules_path).rules == json.loads(json.dumps(snap.rules))
+    assert not [f for f in os.listdir(os.path.dirname(rules_path)) if f.startswith(".tmp-")]
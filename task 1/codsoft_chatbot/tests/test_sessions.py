@@ -0,0 +1,100 @@
+import os, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+import sessions
+from sessions import MemoryBackend, SessionStore, SQLiteBackend, new_context
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class CountingBackend(MemoryBackend):
+    def __init__(self):
+        super().__init__()
+        self.counts = 0
+
+    def __len__(self):
+        self.counts += 1
+        return super().__len__()
+
+
+def test_idle_sessions_expire(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sessions.time, "time", clock)
+    store = SessionStore(ttl=60)
+    store.put("a", {"user_name": "Ann", "last_intent": "greeting"})
+    clock.now += 59
+    assert store.get("a")["user_name"] == "Ann"
+    clock.now += 61
+    assert store.get("a") == new_context()
+    stats = store.stats()
+    assert (stats["expired"], stats["created"], stats["size"]) == (1, 1, 0)
+
+
+def test_sweep_drops_idle_sessions_without_a_lookup(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sessions.time, "time", clock)
+    store = SessionStore(ttl=60, sweep_every=4)
+    for sid in "abc":
+        store.put(sid, new_context())
+    clock.now += 120
+    store.put("d", new_context())       # 4th put: sweep
+    assert store.stats()["size"] == 1 and store.expired == 3
+
+
+def test_least_recently_used_sessions_are_evicted(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sessions.time, "time", clock)
+    store = SessionStore(ttl=0, max_size=3)
+    for sid in "abc":
+        clock.now += 1
+        store.put(sid, {"user_name": sid, "last_intent": None})
+    clock.now += 1
+    store.put("a", store.get("a"))      # a is now the most recently used
+    clock.now += 1
+    store.put("d", new_context())
+    assert store.evicted == 1
+    assert store.get("b") == new_context()
+    assert store.get("a")["user_name"] == "a" and store.get("c")["user_name"] == "c"
+    assert store.stats()["size"] == 3
+
+
+def test_put_does_not_count_the_backend_every_time():
+    backend = CountingBackend()
+    store = SessionStore(backend, ttl=0, max_size=1000, sweep_every=256)
+    before = backend.counts
+    for i in range(500):
+        store.put(str(i % 50), new_context())
+    assert backend.counts - before <= 500 // 256 + 1
+    # near the limit the real size is checked and the store stays bounded
+    store = SessionStore(CountingBackend(), ttl=0, max_size=10)
+    for i in range(100):
+        store.put(str(i), new_context())
+    assert len(store.backend) == 10 and store.evicted == 90
+
+
+def test_sqlite_sessions_survive_a_restart(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sessions.time, "time", clock)
+    path = str(tmp_path / "sessions.db")
+    store = SessionStore(SQLiteBackend(path), ttl=60, max_size=2)
+    for sid, context in (("a", {"user_name": "Zoë", "last_intent": "name"}), ("b", new_context()),
+                         ("c", {"user_name": None, "last_intent": "bye"})):
+        clock.now += 1
+        store.put(sid, context)
+    store.close()
+
+    store = SessionStore(SQLiteBackend(path), ttl=60, max_size=2)
+    assert store.stats()["backend"] == "sqlite" and store.stats()["size"] == 2
+    assert store.get("c") == {"user_name": None, "last_intent": "bye"}
+    assert store.get("a") == new_context()      # evicted before the restart
+    store.put("d", new_context())
+    assert store.stats()["size"] == 2
+    store.close()
@@ -0,0 +1,84 @@
+import json, os, subprocess, sys, textwrap, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND = os.path.join(ROOT, "backend")
+sys.path.insert(0, BACKEND)
+
+from transcript import TranscriptWriter
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_close_flushes_pending_records_as_jsonl(tmp_path):
+    path = str(tmp_path / "chat.jsonl")
+    w = TranscriptWriter(path, fmt="jsonl", flush_interval=5.0)
+    assert w.log("You", "hello", session_id="s1")
+    assert w.log("Bot", "Hi there!", session_id="s1", intent="greeting")
+    assert w.log("You", "héllo again", session_id="s2", intent=None)
+    w.close()
+    recs = [json.loads(line) for line in read_lines(path)]
+    assert [(r["speaker"], r["text"], r["session_id"], r["intent"]) for r in recs] == [
+        ("You", "hello", "s1", None),
+        ("Bot", "Hi there!", "s1", "greeting"),
+        ("You", "héllo again", "s2", None),
+    ]
+    assert all(r["ts"] for r in recs)
+    assert (w.written, w.dropped) == (3, 0)
+    # nothing is queued after close
+    assert not w.log("You", "late")
+
+
+def test_text_format_matches_the_original_log(tmp_path):
+    path = str(tmp_path / "chat.log")
+    w = TranscriptWriter(path)
+    w.log("You", "hi")
+    w.close()
+    (line,) = read_lines(path)
+    ts, rest = line.split(" ", 1)
+    assert rest == "You: hi" and "T" in ts
+
+
+def test_rotates_by_size_and_keeps_the_configured_backups(tmp_path):
+    path = str(tmp_path / "chat.log")
+    w = TranscriptWriter(path, max_bytes=200, backups=2, batch_size=1, flush_interval=0.01)
+    for i in range(40):
+        w.log("You", f"message number {i:02d}")
+        time.sleep(0.002)
+    w.close()
+    assert os.path.exists(path + ".1") and os.path.exists(path + ".2")
+    assert not os.path.exists(path + ".3")
+    for p in (path, path + ".1", path + ".2"):
+        # a file is only rotated once it has passed the limit, one batch at most
+        assert os.path.getsize(p) < 200 + 100
+    # the newest records are in the live file, older ones in the backups, in order
+    assert read_lines(path)[-1].endswith("message number 39")
+    numbers = [int(line[-2:]) for p in (path + ".2", path + ".1", path) for line in read_lines(p)]
+    assert numbers == sorted(numbers)
+
+
+def test_rotates_by_age(tmp_path):
+    path = str(tmp_path / "chat.log")
+    w = TranscriptWriter(path, rotate_seconds=0.05, batch_size=1, flush_interval=0.01)
+    w.log("You", "first")
+    time.sleep(0.2)
+    w.log("You", "second")
+    w.close()
+    assert read_lines(path + ".1")[0].endswith("You: first")
+    assert read_lines(path)[0].endswith("You: second")
+
+
+def test_records_are_flushed_at_interpreter_exit(tmp_path):
+    path = str(tmp_path / "chat.jsonl")
+    script = textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {BACKEND!r})
+        from transcript import TranscriptWriter
+        w = TranscriptWriter({path!r}, fmt="jsonl", flush_interval=60)
+        for i in range(100):
+            w.log("You", str(i), session_id="s")
+    """)
+    subprocess.run([sys.executable, "-c", script], check=True, timeout=30)
+    assert [json.loads(line)["text"] for line in read_lines(path)] == [str(i) for i in range(100)]
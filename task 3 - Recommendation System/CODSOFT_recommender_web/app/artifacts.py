@@ -0,0 +1,216 @@
+"""
+On-disk TF-IDF artifacts for the recommender.
+
+Fitting the TfidfVectorizer over movies.csv takes a few hundred milliseconds
+and every worker used to keep its own copy of the matrix. Instead, the fitted
+model is written once to data/artifacts/<csv hash>/:
+
+- matrix_data.npy, matrix_indices.npy, matrix_indptr.npy: the CSR matrix
+- terms.txt: the vocabulary, one term per line in column order
+- idf.npy: the idf weights
+- meta.json: shape, vectorizer parameters and the CSV hash
+
+The arrays are opened with mmap_mode='r', so every worker maps the same
+pages. The directory name is the CSV's content hash, so editing movies.csv
+simply leads to a new artifact.
+
+Prebuild (e.g. at deploy time), including the top-K neighbour index of
+neighbors.py and the rating factors of collab.py (and, with --dense, the
+embeddings and IVF index of dense.py):
+    python -m app.artifacts build [--k 50] [--workers 4] [--dense]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+ARTIFACT_DIR = os.path.join(DATA_DIR, 'artifacts')
+FORMAT_VERSION = 1
+
+VECTORIZER_PARAMS = {'stop_words': 'english', 'ngram_range': (1, 2)}
+
+_ARRAYS = ('matrix_data', 'matrix_indices', 'matrix_indptr', 'idf')
+
+
+def file_hash(path):
+    """sha256 hex digest of a file's bytes."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def artifact_path(csv_hash, root=ARTIFACT_DIR):
+    return os.path.join(root, csv_hash[:16])
+
+
+def make_vectorizer():
+    return TfidfVectorizer(**VECTORIZER_PARAMS)
+
+
+def save(path, vectorizer, matrix, csv_hash):
+    """
+    Write an artifact directory. It is built in a temporary sibling and
+    renamed into place, so readers never see a half-written artifact; if
+    another process got there first, its copy is kept.
+    """
+    matrix = sp.csr_matrix(matrix)
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+    try:
+        np.save(os.path.join(tmp, 'matrix_data.npy'), matrix.data)
+        np.save(os.path.join(tmp, 'matrix_indices.npy'), matrix.indices)
+        np.save(os.path.join(tmp, 'matrix_indptr.npy'), matrix.indptr)
+        np.save(os.path.join(tmp, 'idf.npy'), vectorizer.idf_)
+        terms = vectorizer.get_feature_names_out()
+        with open(os.path.join(tmp, 'terms.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(terms))
+        meta = {
+            'format': FORMAT_VERSION,
+            'csv_sha256': csv_hash,
+            'shape': list(matrix.shape),
+            'vectorizer': {'stop_words': VECTORIZER_PARAMS['stop_words'],
+                           'ngram_range': list(VECTORIZER_PARAMS['ngram_range'])},
+        }
+        with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.chmod(tmp, 0o755)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            if not os.path.isdir(path):
+                raise
+    finally:
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+class Artifact:
+    """A loaded artifact: memory-mapped CSR matrix plus a lazily rebuilt vectorizer."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('format') != FORMAT_VERSION:
+            raise ValueError(f'unsupported artifact format in {path}')
+        arrays = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r') for name in _ARRAYS}
+        self.matrix = sp.csr_matrix(
+            (arrays['matrix_data'], arrays['matrix_indices'], arrays['matrix_indptr']),
+            shape=tuple(self.meta['shape']), copy=False)
+        self.idf = arrays['idf']
+        self._vectorizer = None
+
+    @property
+    def csv_hash(self):
+        return self.meta['csv_sha256']
+
+    def vectorizer(self):
+        """The fitted TfidfVectorizer (only needed to transform free-text queries)."""
+        if self._vectorizer is None:
+            with open(os.path.join(self.path, 'terms.txt'), encoding='utf-8') as f:
+                terms = f.read().split('\n')
+            params = self.meta['vectorizer']
+            vec = TfidfVectorizer(stop_words=params['stop_words'], ngram_range=tuple(params['ngram_range']))
+            vec.vocabulary_ = {t: i for i, t in enumerate(terms)}
+            vec.idf_ = np.asarray(self.idf)
+            self._vectorizer = vec
+        return self._vectorizer
+
+
+def load(path):
+    """Artifact at path, or None if it is missing or unreadable."""
+    if not os.path.isfile(os.path.join(path, 'meta.json')):
+        return None
+    try:
+        return Artifact(path)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def prune(keep, root=ARTIFACT_DIR):
+    """Remove artifact directories other than `keep`; returns the removed names."""
+    removed = []
+    if not os.path.isdir(root):
+        return removed
+    keep = os.path.basename(os.path.normpath(keep))
+    for name in os.listdir(root):
+        full = os.path.join(root, name)
+        if name != keep and os.path.isdir(full):
+            shutil.rmtree(full, ignore_errors=True)
+            removed.append(name)
+    return removed
+
+
+def main(argv=None):
+    from . import collab, dense, neighbors
+    from .recommender_core import DATA_PATH, Recommender
+
+    ap = argparse.ArgumentParser(prog='python -m app.artifacts',
+                                 description='Prebuild the recommender TF-IDF artifact.')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    b = sub.add_parser('build', help='fit and save the artifact for a movies.csv')
+    b.add_argument('--data', default=DATA_PATH, help='movies.csv to index')
+    b.add_argument('--out', default=ARTIFACT_DIR, help='artifact root directory')
+    b.add_argument('--force', action='store_true', help='rebuild even if an artifact exists')
+    b.add_argument('--prune', action='store_true', help='delete artifacts of other CSV versions')
+    b.add_argument('--k', type=int, default=None,
+                   help='neighbours per movie in the top-K index (default: 50)')
+    b.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                   help='processes for the neighbour index (default: all CPUs)')
+    b.add_argument('--no-neighbors', action='store_true', help='skip the top-K neighbour index')
+    b.add_argument('--ratings', default=collab.RATINGS_ZIP,
+                   help='MovieLens zip (or ratings.csv) for the collaborative model')
+    b.add_argument('--no-collab', action='store_true', help='skip the collaborative model')
+    b.add_argument('--dense', action='store_true', help='also build the dense embeddings + IVF index')
+    b.add_argument('--dim', type=int, default=dense.DIM, help='embedding size for --dense (default: 128)')
+    args = ap.parse_args(argv)
+
+    path = os.path.normpath(artifact_path(file_hash(args.data), args.out))
+    if args.force and os.path.isdir(path):
+        shutil.rmtree(path)
+    rec = Recommender(data_path=args.data, artifact_dir=args.out,
+                      ratings_path=None if args.no_collab else args.ratings)
+    print(f'{"built" if rec.artifact_built else "found"} {path} '
+          f'({rec.tfidf_matrix.shape[0]} movies x {rec.tfidf_matrix.shape[1]} terms)')
+    if not args.no_neighbors:
+        have = rec.neighbors[0].shape[1] if rec.neighbors is not None else None
+        k = args.k or have or neighbors.DEFAULT_K
+        if rec.artifact_built or have != k:
+            k = rec.build_neighbors(k, workers=max(1, args.workers))
+            print(f'built top-{k} neighbour index')
+        else:
+            print(f'found top-{k} neighbour index')
+    if not args.no_collab:
+        model = rec.collab_model()
+        if model is None:
+            print(f'no collaborative model (missing {args.ratings} or movieId column)')
+        else:
+            print(f'collaborative model: {int(model.has_signal.sum())} movies with rating factors '
+                  f'(k={model.embeddings.shape[1]})')
+    if args.dense:
+        model = rec.dense_model() if args.dim == dense.DIM else None
+        if model is None or model.dim != min(args.dim, min(rec.tfidf_matrix.shape) - 1):
+            model = dense.DenseModel.build(rec.tfidf_matrix, args.dim)
+            if rec.artifact is not None:
+                dense.save(rec.artifact.path, model, rec.tfidf_matrix.shape)
+        print(f'dense model: {model.embeddings.shape[0]} x {model.dim} embeddings, '
+              f'{model.index.centroids.shape[0]} IVF lists')
+    if args.prune:
+        for name in prune(path, args.out):
+            print(f'removed {name}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Result cache for /recommend and /recommend/batch.
+
+Traffic is skewed towards a few popular titles, so finished answers are kept
+per (normalised query, topn, mode) as ready-to-send JSON bytes: a hit costs a
+dict lookup and no resolving, scoring or serialising.
+
+Entries expire `ttl` seconds after they were stored, and the least recently
+used ones are evicted beyond `max_size`. Entries are keyed by the model
+version they were computed with (Recommender.version) as well, so a request
+only ever sees answers of the model it reads. During a swap (new movies.csv,
+rebuilt artifact or neighbour index, catalogue update) requests still running
+on the old model and new ones on the new model both keep their entries; once
+a third version shows up, the oldest one's entries are dropped and that
+version is no longer cached.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from .titles import normalize
+
+DEFAULT_MAX_SIZE = 4096
+DEFAULT_TTL = 600
+KEEP_VERSIONS = 2    # the live model and the one it replaced
+
+
+def cache_key(query, topn, mode):
+    # queries that differ only in case or spacing resolve to the same results
+    return normalize(query), int(topn), mode
+
+
+class ResultCache:
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = None            # newest version seen
+        self._versions = []            # cached versions, oldest first
+        self._retired = set()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.invalidations = 0
+        self._data = OrderedDict()     # (version, key) -> (stored_at, payload)
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        """False for a retired version, whose results are not cached any more."""
+        if version in self._versions:
+            return True
+        if version in self._retired:
+            return False
+        self._versions.append(version)
+        self.version = version
+        if len(self._versions) > KEEP_VERSIONS:
+            old = self._versions.pop(0)
+            self._retired.add(old)
+            stale = [k for k in self._data if k[0] == old]
+            for k in stale:
+                del self._data[k]
+            if stale:
+                self.invalidations += 1
+        return True
+
+    def get(self, key, version):
+        """Cached payload for key under this model version, or None."""
+        now = time.time()
+        with self._lock:
+            key = version, key
+            found = self._data.get(key) if self._check_version(version) else None
+            if found is not None:
+                stored, payload = found
+                if not self.ttl or now - stored <= self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return payload
+                del self._data[key]
+                self.expired += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, version, payload):
+        now = time.time()
+        with self._lock:
+            if not self._check_version(version):
+                return
+            key = version, key
+            self._data[key] = (now, payload)
+            self._data.move_to_end(key)
+            if self.max_size:
+                while len(self._data) > self.max_size:
+                    self._data.popitem(last=False)
+                    self.evicted += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            size = len(self._data)
+            lookups = self.hits + self.misses
+            return {
+                'size': size,
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'version': self.version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'expired': self.expired,
+                'evicted': self.evicted,
+                'invalidations': self.invalidations,
+            }
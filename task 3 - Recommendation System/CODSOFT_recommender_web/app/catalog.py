@@ -0,0 +1,314 @@
+"""
+Incremental catalogue updates: add or change movies without refitting.
+
+upsert() takes a live Recommender and a list of movies and returns a new
+Recommender for the updated catalogue; the old one is not modified, so the
+web app can keep answering from it and then swap the reference in one
+assignment.
+
+- Vocabulary and idf stay frozen (those of the last full fit). New and
+  changed movies are vectorised with the existing vectorizer and their rows
+  are appended to (or replace rows in) the sparse matrix. Words the
+  vocabulary doesn't know are ignored; they are reported back.
+- Document frequencies are maintained per term, so the drift between the
+  frozen idf and the idf the current catalogue would get is known. When
+  unknown terms or drift grow, refit with
+  `python -m app.artifacts build --force`.
+- The top-K neighbour lists are refreshed only where they can change (see
+  neighbors.refresh), and so is the title index (TitleIndex.updated);
+  movies without ratings get no collaborative factors. A loaded dense
+  model projects the new rows with its SVD components and files them under
+  the nearest IVF list (DenseModel.updated).
+- persist() writes movies.csv and the artifact of the new CSV hash, so a
+  restart loads the updated catalogue without refitting, and removes the
+  artifact of the CSV it replaced. It rewrites the whole artifact, so the
+  web app only does it when asked ({"persist": true}); send that with the
+  last of a series of upserts.
+
+A movie is {'title': ..., 'genres': 'A|B', 'movieId': 123}; genres and
+movieId are optional. A movieId that already exists replaces that movie;
+without one the movie is added with the next free id.
+
+CLI (offline, on movies.csv and its artifact; or against a running app):
+    python -m app.catalog upsert new_movies.csv [--data data/movies.csv]
+    python -m app.catalog upsert new_movies.json --url http://127.0.0.1:5000 [--persist]
+"""
+import argparse
+import copy
+import json
+import os
+import shutil
+import sys
+import threading
+import urllib.request
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from . import artifacts, collab, dense, neighbors
+
+NO_GENRES = '(no genres listed)'
+MAX_UNKNOWN_TERMS = 20
+
+
+def _entries(movies):
+    """Validated [{'movieId', 'title', 'genres'}]; a later entry with the same movieId wins."""
+    if not isinstance(movies, list) or not movies:
+        raise ValueError('movies must be a non-empty list')
+    out, by_id = [], {}
+    for m in movies:
+        if not isinstance(m, dict):
+            raise ValueError('every movie must be an object')
+        title = m.get('title')
+        if not isinstance(title, str) or not title.strip():
+            raise ValueError('every movie needs a non-empty title')
+        genres = m.get('genres')
+        if genres is None or (isinstance(genres, float) and np.isnan(genres)):
+            genres = NO_GENRES
+        if not isinstance(genres, str):
+            raise ValueError('genres must be a string like "Comedy|Drama"')
+        mid = m.get('movieId')
+        if mid is not None and not (isinstance(mid, float) and np.isnan(mid)):
+            try:
+                mid = int(mid)
+            except (TypeError, ValueError):
+                raise ValueError('movieId must be an integer')
+        else:
+            mid = None
+        entry = {'movieId': mid, 'title': title.strip(), 'genres': genres.strip() or NO_GENRES}
+        if mid is not None and mid in by_id:
+            out[by_id[mid]] = entry
+        else:
+            if mid is not None:
+                by_id[mid] = len(out)
+            out.append(entry)
+    return out
+
+
+def doc_freq(matrix):
+    """Number of rows each term occurs in."""
+    matrix = sp.csr_matrix(matrix)
+    return np.bincount(matrix.indices, minlength=matrix.shape[1]).astype(np.int64)
+
+
+def idf_drift(idf, df_counts, n_docs):
+    """
+    Mean gap between the frozen idf and the smooth idf the current document
+    frequencies give, weighted by how many rows use each term (0 right after
+    a fit; a single rare term moving does not dominate it).
+    """
+    total = df_counts.sum()
+    if not total:
+        return 0.0
+    current = np.log((1 + n_docs) / (1 + df_counts)) + 1
+    return float(np.dot(df_counts, np.abs(current - np.asarray(idf))) / total)
+
+
+def _unknown_terms(vectorizer, texts):
+    analyze = vectorizer.build_analyzer()
+    vocab = vectorizer.vocabulary_
+    return sorted({t for text in texts for t in analyze(text) if t not in vocab})
+
+
+def upsert(rec, movies):
+    """
+    (new Recommender, summary) for rec's catalogue with `movies` added or
+    replaced. Raises ValueError for malformed movies.
+    """
+    entries = _entries(movies)
+    df = rec.df
+    n_old = len(df)
+    has_ids = 'movieId' in df.columns
+    rows_by_id = {}
+    next_id = 1
+    if has_ids and n_old:
+        ids = df['movieId'].to_numpy()
+        rows_by_id = {int(m): r for r, m in enumerate(ids.tolist())}
+        next_id = int(np.max(ids)) + 1
+    replaced, appended = {}, []
+    for e in entries:
+        if has_ids and e['movieId'] is None:
+            e['movieId'] = next_id
+            next_id += 1
+        elif has_ids:
+            next_id = max(next_id, e['movieId'] + 1)
+        row = rows_by_id.get(e['movieId']) if has_ids else None
+        if row is None:
+            appended.append(e)
+        else:
+            replaced[row] = e
+    replaced_rows = sorted(replaced)
+    changed_entries = [replaced[r] for r in replaced_rows] + appended
+    texts = [f"{e['title']} {e['genres']}" for e in changed_entries]
+
+    # catalogue
+    new_df = df.copy()
+    for r in replaced_rows:
+        e = replaced[r]
+        new_df.iat[r, new_df.columns.get_loc('title')] = e['title']
+        new_df.iat[r, new_df.columns.get_loc('genres')] = e['genres']
+        new_df.iat[r, new_df.columns.get_loc('text')] = f"{e['title']} {e['genres']}"
+    if appended:
+        add = pd.DataFrame([{'movieId': e['movieId'], 'title': e['title'], 'genres': e['genres'],
+                             'text': f"{e['title']} {e['genres']}"} for e in appended])
+        if not has_ids:
+            add = add.drop(columns='movieId')
+        new_df = pd.concat([new_df, add], ignore_index=True)
+        if has_ids:
+            new_df['movieId'] = new_df['movieId'].astype(np.int64)
+
+    # TF-IDF rows with the frozen vocabulary
+    vectorizer = rec.tfidf
+    rows = vectorizer.transform(texts)
+    old_matrix = sp.csr_matrix(rec.tfidf_matrix)
+    matrix = sp.vstack([old_matrix, rows], format='csr')
+    n_new = n_old + len(appended)
+    if replaced_rows:
+        order = np.arange(n_new)
+        order[replaced_rows] = n_old + np.arange(len(replaced_rows))
+        order[n_old:] = n_old + len(replaced_rows) + np.arange(len(appended))
+        matrix = matrix[order]
+    changed = np.array(replaced_rows + list(range(n_old, n_new)), dtype=np.int64)
+
+    # maintained document frequencies
+    df_counts = rec.doc_freq.copy()
+    if replaced_rows:
+        df_counts -= doc_freq(old_matrix[replaced_rows])
+    df_counts += doc_freq(rows)
+
+    new = copy.copy(rec)
+    new.df = new_df
+    new.tfidf_matrix = matrix
+    new._tfidf = vectorizer
+    new._doc_freq = df_counts
+    new.artifact = None      # set again by persist()
+    new.artifact_built = False
+    new.generation = rec.generation + 1
+    refreshed = 0
+    if rec.neighbors is not None:
+        ids, scores, refreshed = neighbors.refresh(matrix, rec.neighbors[0], rec.neighbors[1], changed)
+        new.neighbors = ids, scores
+    new.titles = rec.titles.updated({int(r): e['title'] for r, e in zip(changed, changed_entries)})
+    new._title_values = new_df['title'].to_numpy()
+    new._genre_values = new_df['genres'].to_numpy()
+    new._collab_lock = threading.Lock()
+    model = rec._collab
+    if model:
+        # new movies have no ratings yet; changed ones keep theirs
+        emb = np.asarray(model.embeddings)
+        new._collab = collab.CollabModel(
+            np.vstack([emb, np.zeros((len(appended), emb.shape[1]), dtype=emb.dtype)]))
+
+    new._dense_lock = threading.Lock()
+    if rec._dense is not None:
+        new._dense = rec._dense.updated(changed, rows, n_new)
+
+    unknown = _unknown_terms(vectorizer, texts)
+    summary = {
+        'added': len(appended),
+        'updated': len(replaced_rows),
+        'movies': [{'movieId': e['movieId'], 'title': e['title']} if has_ids else {'title': e['title']}
+                   for e in changed_entries],
+        'catalog_size': n_new,
+        'neighbors_refreshed': refreshed,
+        'unknown_terms': unknown[:MAX_UNKNOWN_TERMS],
+        'unknown_term_count': len(unknown),
+        'idf_drift': round(idf_drift(vectorizer.idf_, df_counts, n_new), 4),
+    }
+    return new, summary
+
+
+def persist(rec, data_path=None):
+    """
+    Write rec's catalogue to movies.csv (atomically) and save the artifact
+    for its new hash, then point rec at it and remove the artifact of the
+    CSV that was replaced. Call before the swap.
+    """
+    data_path = data_path or rec.data_path
+    old_hash = artifacts.file_hash(data_path) if os.path.isfile(data_path) else None
+    tmp = data_path + '.tmp'
+    rec.df.drop(columns='text').to_csv(tmp, index=False)
+    os.replace(tmp, data_path)
+    rec.data_path = data_path
+    rec.csv_hash = artifacts.file_hash(data_path)
+    if rec.artifact_dir is None:
+        return None
+    path = artifacts.artifact_path(rec.csv_hash, rec.artifact_dir)
+    art = artifacts.load(path)
+    if art is not None:
+        # this exact CSV was fitted before; serve that fit, as a restart would
+        rec._tfidf = None
+        rec._doc_freq = None
+        rec._dense = None
+        rec.neighbors = neighbors.load(path, art.matrix.shape)
+    else:
+        artifacts.save(path, rec.tfidf, rec.tfidf_matrix, rec.csv_hash)
+        art = artifacts.load(path)
+        if art is None:
+            return None
+        if rec.neighbors is not None:
+            neighbors.save(path, rec.neighbors[0], rec.neighbors[1], rec.tfidf_matrix.shape)
+            rec.neighbors = neighbors.load(path, rec.tfidf_matrix.shape)
+        rec.titles.save(os.path.join(path, 'titles.npz'))
+        if rec._dense is not None:
+            dense.save(path, rec._dense, rec.tfidf_matrix.shape)
+            rec._dense = dense.load(path, rec.tfidf_matrix.shape) or rec._dense
+    rec.artifact = art
+    rec.tfidf_matrix = art.matrix
+    if old_hash is not None and old_hash != rec.csv_hash:
+        # nothing loads the replaced CSV's artifact any more; requests still
+        # running on the old model keep their memory maps open
+        shutil.rmtree(artifacts.artifact_path(old_hash, rec.artifact_dir), ignore_errors=True)
+    return path
+
+
+def _read_movies(path):
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return data['movies'] if isinstance(data, dict) else data
+    return pd.read_csv(path).to_dict('records')
+
+
+def main(argv=None):
+    from .recommender_core import DATA_PATH, Recommender
+
+    ap = argparse.ArgumentParser(prog='python -m app.catalog',
+                                 description='Add or update movies without refitting the model.')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    u = sub.add_parser('upsert', help='add/replace movies from a CSV (title,genres[,movieId]) or JSON list')
+    u.add_argument('file')
+    u.add_argument('--data', default=DATA_PATH, help='movies.csv to update (offline mode)')
+    u.add_argument('--out', default=artifacts.ARTIFACT_DIR, help='artifact root directory')
+    u.add_argument('--url', help='base URL of a running app; sends the movies to its /catalog/upsert')
+    u.add_argument('--persist', action='store_true',
+                   help='with --url: also have the app write movies.csv and the artifact')
+    args = ap.parse_args(argv)
+
+    movies = _read_movies(args.file)
+    if args.url:
+        body = json.dumps({'movies': movies, 'persist': args.persist}, default=str).encode()
+        req = urllib.request.Request(args.url.rstrip('/') + '/catalog/upsert', data=body,
+                                     headers={'Content-Type': 'application/json'})
+        token = os.environ.get('CATALOG_TOKEN')
+        if token:
+            req.add_header('X-Catalog-Token', token)
+        with urllib.request.urlopen(req) as resp:
+            print(resp.read().decode())
+        return 0
+    rec = Recommender(data_path=args.data, artifact_dir=args.out)
+    try:
+        new, summary = upsert(rec, movies)
+    except ValueError as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 2
+    path = persist(new)
+    print(json.dumps(summary, indent=2))
+    if path:
+        print(f'saved {path}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
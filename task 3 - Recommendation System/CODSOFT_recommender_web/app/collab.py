@@ -0,0 +1,174 @@
+"""
+Collaborative filtering from MovieLens ratings.
+
+ratings.csv is streamed straight out of the MovieLens zip in chunks (no
+extraction, no full DataFrame). Every chunk is reduced to int32 user/item ids
+and float32 ratings, and the chunks become one sparse user x item CSR matrix;
+no dense pivot is ever built. Ratings are centred on each user's mean so
+"liked more than usual" and "liked less than usual" point in opposite
+directions.
+
+Items are then embedded with a truncated SVD of that sparse matrix
+(scipy.sparse.linalg.svds, k factors), and the embeddings are L2-normalised,
+so item-item similarity is a dot product. Movies with fewer than MIN_RATINGS
+ratings get a zero vector (no collaborative signal).
+
+Memory grows with the number of ratings (12 bytes each while loading), not
+with users x items, so the full MovieLens 25M fits on one machine. The
+embeddings (float32, n_movies x k) are saved with the TF-IDF artifact and
+memory-mapped like it.
+"""
+import json
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.linalg import svds
+
+RATINGS_ZIP = os.path.join(os.path.dirname(__file__), '..', 'ml-latest-small.zip')
+CHUNK_ROWS = 1_000_000
+FACTORS = 64
+MIN_RATINGS = 5
+
+MODES = ('content', 'collab', 'hybrid')
+HYBRID_WEIGHT = 0.5      # share of the collaborative score in hybrid mode
+
+
+def ratings_member(zf):
+    """Name of the ratings.csv inside a MovieLens zip."""
+    for name in zf.namelist():
+        if name.rsplit('/', 1)[-1] == 'ratings.csv':
+            return name
+    raise FileNotFoundError('no ratings.csv in the MovieLens zip')
+
+
+def ratings_source_id(path):
+    """Cheap identity of the ratings file (name, size, mtime) for artifact invalidation."""
+    st = os.stat(path)
+    return f'{os.path.basename(path)}:{st.st_size}:{int(st.st_mtime)}'
+
+
+def load_ratings(path, movie_ids, chunk_rows=CHUNK_ROWS):
+    """
+    Sparse user x movie rating matrix (float32 CSR) with columns in the order
+    of `movie_ids`. Ratings of movies that aren't in the catalogue are dropped.
+    `path` is a MovieLens zip or a plain ratings.csv.
+    """
+    movie_ids = np.asarray(movie_ids, dtype=np.int64)
+    order = np.argsort(movie_ids, kind='stable')
+    sorted_ids = movie_ids[order]
+    users, cols, vals = [], [], []
+
+    def consume(f):
+        reader = pd.read_csv(f, usecols=['userId', 'movieId', 'rating'], chunksize=chunk_rows,
+                             dtype={'userId': np.int32, 'movieId': np.int64, 'rating': np.float32})
+        for chunk in reader:
+            mids = chunk['movieId'].to_numpy()
+            pos = np.searchsorted(sorted_ids, mids)
+            pos[pos == len(sorted_ids)] = 0
+            known = sorted_ids[pos] == mids if len(sorted_ids) else np.zeros(len(mids), dtype=bool)
+            users.append(chunk['userId'].to_numpy()[known])
+            cols.append(order[pos[known]].astype(np.int32))
+            vals.append(chunk['rating'].to_numpy()[known])
+
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf, zf.open(ratings_member(zf)) as f:
+            consume(f)
+    else:
+        with open(path, 'rb') as f:
+            consume(f)
+
+    user_ids = np.concatenate(users) if users else np.empty(0, dtype=np.int32)
+    cols = np.concatenate(cols) if cols else np.empty(0, dtype=np.int32)
+    vals = np.concatenate(vals) if vals else np.empty(0, dtype=np.float32)
+    _, rows = np.unique(user_ids, return_inverse=True)
+    n_users = int(rows.max()) + 1 if rows.shape[0] else 0
+    matrix = sp.csr_matrix((vals, (rows.astype(np.int32), cols)),
+                           shape=(n_users, len(movie_ids)), dtype=np.float32)
+    matrix.sum_duplicates()
+    return matrix
+
+
+def center_users(matrix):
+    """Subtract each user's mean rating from their (stored) ratings; stays sparse."""
+    matrix = matrix.tocsr(copy=True)
+    counts = np.diff(matrix.indptr)
+    rows = np.repeat(np.arange(matrix.shape[0]), counts)
+    sums = np.bincount(rows, weights=matrix.data, minlength=matrix.shape[0])
+    means = (sums / np.maximum(counts, 1)).astype(np.float32)
+    matrix.data -= means[rows]
+    matrix.eliminate_zeros()
+    return matrix
+
+
+def item_embeddings(matrix, factors=FACTORS, min_ratings=MIN_RATINGS):
+    """L2-normalised float32 item factors [n_items, k] from a user x item rating matrix."""
+    counts = np.diff(matrix.tocsc().indptr)
+    centered = center_users(matrix)
+    k = max(1, min(factors, min(centered.shape) - 1))
+    _, s, vt = svds(centered, k=k, random_state=0)
+    emb = (vt.T * s).astype(np.float32)
+    emb[counts < min_ratings] = 0
+    norms = np.linalg.norm(emb, axis=1)
+    nz = norms > 0
+    emb[nz] /= norms[nz, None]
+    return emb
+
+
+def save(artifact_path, emb, source_id, n_ratings):
+    tmp = os.path.join(artifact_path, 'collab_items.npy.tmp')
+    with open(tmp, 'wb') as f:
+        np.save(f, emb)
+    os.replace(tmp, os.path.join(artifact_path, 'collab_items.npy'))
+    meta_tmp = os.path.join(artifact_path, 'collab.json.tmp')
+    with open(meta_tmp, 'w', encoding='utf-8') as f:
+        json.dump({'source': source_id, 'ratings': int(n_ratings), 'factors': int(emb.shape[1]),
+                   'min_ratings': MIN_RATINGS}, f)
+    os.replace(meta_tmp, os.path.join(artifact_path, 'collab.json'))
+
+
+def load(artifact_path, source_id, n_items):
+    """Memory-mapped item embeddings saved for this ratings file, or None."""
+    try:
+        with open(os.path.join(artifact_path, 'collab.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('source') != source_id:
+            return None
+        emb = np.load(os.path.join(artifact_path, 'collab_items.npy'), mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    return emb if emb.shape[0] == n_items else None
+
+
+class CollabModel:
+    """Item embeddings plus the scoring used by Recommender's collab/hybrid modes."""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.has_signal = np.any(np.asarray(embeddings) != 0, axis=1)
+
+    @classmethod
+    def build(cls, path, movie_ids, factors=FACTORS):
+        matrix = load_ratings(path, movie_ids)
+        model = cls(item_embeddings(matrix, factors))
+        model.n_ratings = matrix.nnz
+        return model
+
+    def scores(self, idx):
+        """
+        Cosine similarity of every movie's factors to movie idx (zeros if idx
+        has no signal). An array of rows gives one score row per movie [len(idx), n].
+        """
+        emb = np.asarray(self.embeddings)
+        return emb[idx] @ emb.T
+
+    def blend(self, idx, content_scores, weight=HYBRID_WEIGHT):
+        """Hybrid score (idx a row or an array of rows); movies without enough ratings keep their content score."""
+        rows = self.has_signal[idx]
+        if not np.any(rows):
+            return content_scores
+        mixed = weight * self.scores(idx) + (1 - weight) * content_scores
+        mixed = np.where(self.has_signal, mixed, content_scores)
+        return np.where(np.asarray(rows)[..., None], mixed, content_scores)
@@ -0,0 +1,365 @@
+"""
+Dense embeddings with an approximate nearest-neighbour index (mode 'dense').
+
+The sparse TF-IDF matrix grows with the vocabulary and exact scoring grows
+with the catalogue. For large catalogues the matrix is reduced to float32
+embeddings of fixed size DIM (truncated SVD), L2-normalised so cosine is a
+dot product, and searched through an IVF index in plain NumPy:
+
+- the embeddings are clustered (spherical k-means, ~sqrt(n) clusters)
+- every movie is filed under its nearest centroid (inverted lists, CSR-style)
+- a query scores the centroids, scans only the `nprobe` closest lists (more,
+  if those hold fewer than k movies) and ranks those candidates exactly;
+  nprobe trades recall for latency
+
+Free-text queries are projected with the same SVD components. Everything is
+stored with the TF-IDF artifact and memory-mapped:
+
+- dense_items.npy:      float32 [n_movies, DIM]
+- dense_components.npy: float32 [DIM, n_terms]
+- ivf_centroids.npy:    float32 [n_lists, DIM]
+- ivf_ids.npy:          int32 movie rows grouped by list
+- ivf_offsets.npy:      int64 [n_lists + 1], list i is ids[offsets[i]:offsets[i+1]]
+- dense.json:           dimensions and the matrix shape it was built from
+
+Build with `python -m app.artifacts build --dense`. Compare recall and
+latency against the exact paths with
+    python -m app.dense bench [--nprobe 1 2 4 8 16] [--synthetic 1000000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+
+from . import neighbors
+
+DIM = 128
+NPROBE = 8
+KMEANS_ITERS = 10
+TRAIN_PER_LIST = 256      # k-means trains on a sample of this many rows per list
+ASSIGN_ROWS = 8192        # rows per block when assigning to centroids
+
+
+def normalize_rows(x):
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return np.divide(x, norms, out=np.zeros_like(x), where=norms > 0)
+
+
+def embed(matrix, dim=DIM):
+    """(L2-normalised float32 embeddings [n, dim], float32 components [dim, n_terms])."""
+    dim = max(1, min(dim, min(matrix.shape) - 1))
+    svd = TruncatedSVD(n_components=dim, algorithm='randomized', random_state=0)
+    emb = svd.fit_transform(matrix)
+    return normalize_rows(emb), svd.components_.astype(np.float32)
+
+
+def assign(vectors, centroids, block=ASSIGN_ROWS):
+    """Nearest centroid (largest dot product) of every row."""
+    out = np.empty(vectors.shape[0], dtype=np.int32)
+    for start in range(0, vectors.shape[0], block):
+        out[start:start + block] = np.argmax(vectors[start:start + block] @ centroids.T, axis=1)
+    return out
+
+
+def kmeans(vectors, n_lists, iters=KMEANS_ITERS, seed=0):
+    """Spherical k-means centroids (float32 [n_lists, dim]) trained on a sample of the rows."""
+    rng = np.random.default_rng(seed)
+    n = vectors.shape[0]
+    sample = vectors
+    if n > n_lists * TRAIN_PER_LIST:
+        sample = vectors[np.sort(rng.choice(n, n_lists * TRAIN_PER_LIST, replace=False))]
+    sample = np.asarray(sample, dtype=np.float32)
+    centroids = sample[rng.choice(sample.shape[0], n_lists, replace=False)].copy()
+    for _ in range(iters):
+        labels = assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = np.flatnonzero(np.bincount(labels, minlength=n_lists) == 0)
+        # an empty list restarts from a random row
+        sums[empty] = sample[rng.choice(sample.shape[0], empty.shape[0])]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file index over normalised vectors: centroids plus CSR-style lists."""
+
+    def __init__(self, centroids, ids, offsets):
+        self.centroids = centroids
+        self.ids = ids
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, vectors, n_lists=None):
+        n = vectors.shape[0]
+        n_lists = n_lists or max(1, int(round(np.sqrt(n))))
+        n_lists = max(1, min(n_lists, n))
+        centroids = kmeans(vectors, n_lists)
+        return cls.from_labels(centroids, assign(vectors, centroids))
+
+    @classmethod
+    def from_labels(cls, centroids, labels):
+        ids = np.argsort(labels, kind='stable').astype(np.int32)
+        offsets = np.zeros(centroids.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=centroids.shape[0]), out=offsets[1:])
+        return cls(centroids, ids, offsets)
+
+    def labels(self, n):
+        out = np.empty(n, dtype=np.int32)
+        out[self.ids] = np.repeat(np.arange(self.centroids.shape[0], dtype=np.int32), np.diff(self.offsets))
+        return out
+
+    def candidates(self, query, nprobe, min_count=0):
+        """
+        Sorted rows of the nprobe lists whose centroids are closest to query.
+        While those hold fewer than min_count rows, the next closest lists are
+        added as well.
+        """
+        n_lists = self.centroids.shape[0]
+        cs = np.asarray(self.centroids) @ query
+        if nprobe < n_lists:
+            sizes = np.diff(self.offsets)
+            probe = np.argpartition(-cs, nprobe - 1)[:nprobe]
+            if sizes[probe].sum() < min_count:
+                order = np.argsort(-cs, kind='stable')
+                enough = int(np.searchsorted(np.cumsum(sizes[order]), min_count)) + 1
+                probe = order[:max(nprobe, enough)]
+        else:
+            probe = np.arange(n_lists)
+        parts = [self.ids[self.offsets[p]:self.offsets[p + 1]] for p in probe]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int32)
+
+
+class DenseModel:
+    """Embeddings, SVD components and the IVF index behind the 'dense' mode."""
+
+    def __init__(self, embeddings, components, index):
+        self.embeddings = embeddings
+        self.components = components
+        self.index = index
+
+    @classmethod
+    def build(cls, matrix, dim=DIM, n_lists=None):
+        emb, components = embed(matrix, dim)
+        return cls(emb, components, IVFIndex.build(emb, n_lists))
+
+    @property
+    def dim(self):
+        return self.embeddings.shape[1]
+
+    def project(self, tfidf_rows):
+        """Normalised embeddings of TF-IDF rows (e.g. vectorised free-text queries)."""
+        return normalize_rows(tfidf_rows @ np.asarray(self.components).T)
+
+    def search(self, query, k, nprobe=NPROBE, exclude=None):
+        """
+        Approximate top-k rows for one query vector (ties by lower row). Probes
+        more than nprobe lists when the closest ones are too small to fill k.
+        """
+        cand = self.index.candidates(query, nprobe, k + 1 if exclude is not None else k)
+        if exclude is not None:
+            cand = cand[cand != exclude]
+        scores = np.asarray(self.embeddings[cand]) @ query
+        return cand[neighbors.top_k(scores, k)]
+
+    def exact(self, query, k, exclude=None):
+        """Brute-force top-k over all embeddings (what search() approximates)."""
+        return neighbors.top_k(np.asarray(self.embeddings) @ query, k, exclude=exclude)
+
+    def updated(self, rows, tfidf_rows, n):
+        """
+        Copy for a catalogue of n movies in which `rows` got these TF-IDF rows
+        (see catalog.upsert): they are projected with the existing components
+        and filed under their nearest existing centroid.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        emb = np.zeros((n, self.dim), dtype=np.float32)
+        old = np.asarray(self.embeddings)
+        emb[:old.shape[0]] = old
+        emb[rows] = self.project(tfidf_rows)
+        labels = np.zeros(n, dtype=np.int32)
+        labels[:old.shape[0]] = self.index.labels(old.shape[0])
+        labels[rows] = assign(emb[rows], np.asarray(self.index.centroids))
+        return DenseModel(emb, self.components, IVFIndex.from_labels(self.index.centroids, labels))
+
+
+def _save_array(path, arr):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+
+def save(artifact_path, model, shape):
+    """Write the model into an artifact directory; dense.json goes last and marks it complete."""
+    meta_path = os.path.join(artifact_path, 'dense.json')
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    _save_array(os.path.join(artifact_path, 'dense_items.npy'), np.asarray(model.embeddings))
+    _save_array(os.path.join(artifact_path, 'dense_components.npy'), np.asarray(model.components))
+    _save_array(os.path.join(artifact_path, 'ivf_centroids.npy'), np.asarray(model.index.centroids))
+    _save_array(os.path.join(artifact_path, 'ivf_ids.npy'), np.asarray(model.index.ids))
+    _save_array(os.path.join(artifact_path, 'ivf_offsets.npy'), np.asarray(model.index.offsets))
+    tmp = meta_path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'dim': int(model.dim), 'lists': int(model.index.centroids.shape[0]),
+                   'shape': list(shape)}, f)
+    os.replace(tmp, meta_path)
+
+
+def load(artifact_path, shape):
+    """DenseModel memory-mapped from an artifact directory, or None if absent or stale."""
+    def arr(name):
+        return np.load(os.path.join(artifact_path, name + '.npy'), mmap_mode='r')
+    try:
+        with open(os.path.join(artifact_path, 'dense.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if tuple(meta['shape']) != tuple(shape):
+            return None
+        model = DenseModel(arr('dense_items'), arr('dense_components'),
+                           IVFIndex(arr('ivf_centroids'), arr('ivf_ids'), arr('ivf_offsets')))
+    except (OSError, ValueError, KeyError):
+        return None
+    if model.embeddings.shape[0] != shape[0] or model.components.shape[1] != shape[1]:
+        return None
+    return model
+
+
+# benchmark
+
+def _percentiles(times):
+    ms = np.asarray(times) * 1000
+    return {'p50_ms': round(float(np.percentile(ms, 50)), 3), 'p95_ms': round(float(np.percentile(ms, 95)), 3)}
+
+
+def _recall(found, truth):
+    return float(np.mean([len(set(f.tolist()) & set(t.tolist())) / max(1, len(t))
+                          for f, t in zip(found, truth)]))
+
+
+def _score_recall(found, sims, k):
+    # share of results scoring at least the exact k-th best; with many movies tied on
+    # the same genres, which of them the exact top-k lists is arbitrary
+    out = []
+    for f, (row_sims, kth) in zip(found, sims):
+        out.append(np.count_nonzero(row_sims[f] >= kth - 1e-9) / max(1, min(k, row_sims.shape[0] - 1)))
+    return float(np.mean(out))
+
+
+def _synthetic(n, dim, seed=0):
+    # noisy unit vectors around many topics (more topics than IVF lists, noise as large
+    # as the topic), so the index has structure to find but no perfect partition
+    rng = np.random.default_rng(seed)
+    centres = normalize_rows(rng.standard_normal((max(1, n // 100), dim)))
+    emb = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 100_000):
+        m = min(100_000, n - start)
+        emb[start:start + m] = centres[rng.integers(0, centres.shape[0], m)] \
+            + rng.standard_normal((m, dim)).astype(np.float32) / np.sqrt(dim)
+    return normalize_rows(emb)
+
+
+def bench(rec=None, nprobes=(1, 2, 4, 8, 16, 32), queries=300, k=10, synthetic=None, dim=DIM, seed=0):
+    """
+    Recall@k and per-query latency of IVF search at several nprobe values.
+    Recall is measured against brute force over the same embeddings (the
+    loss of the index) and, on the real catalogue, against the exact TF-IDF
+    scores (the loss of the SVD reduction as well; a result counts if it
+    scores at least the k-th best, since tied movies are interchangeable).
+    """
+    from sklearn.metrics.pairwise import linear_kernel
+
+    rng = np.random.default_rng(seed)
+    report = {'k': k}
+    if synthetic:
+        t = time.perf_counter()
+        emb = _synthetic(synthetic, dim, seed)
+        model = DenseModel(emb, None, IVFIndex.build(emb))
+        report['build_s'] = round(time.perf_counter() - t, 2)
+        matrix = None
+    else:
+        matrix = rec.tfidf_matrix
+        t = time.perf_counter()
+        model = rec.dense_model() if dim == DIM else DenseModel.build(matrix, dim)
+        report['build_s'] = round(time.perf_counter() - t, 2)
+    n = model.embeddings.shape[0]
+    report.update({'movies': n, 'dim': int(model.dim), 'lists': int(model.index.centroids.shape[0])})
+    rows = rng.choice(n, min(queries, n), replace=False)
+    emb = np.asarray(model.embeddings)
+
+    exact, times = [], []
+    for r in rows:
+        t = time.perf_counter()
+        exact.append(model.exact(emb[r], k, exclude=r))
+        times.append(time.perf_counter() - t)
+    report['exact_dense'] = _percentiles(times)
+    if matrix is not None:
+        tfidf, times = [], []
+        for r in rows:
+            t = time.perf_counter()
+            sims = linear_kernel(matrix[r:r + 1], matrix).ravel()
+            top = neighbors.top_k(sims, k, exclude=r)
+            times.append(time.perf_counter() - t)
+            sims[r] = -np.inf
+            tfidf.append((sims, sims[top[-1]] if top.shape[0] else np.inf))
+        report['exact_tfidf'] = _percentiles(times)
+        report['exact_dense']['recall_vs_tfidf'] = round(_score_recall(exact, tfidf, k), 4)
+
+    report['ivf'] = []
+    for nprobe in nprobes:
+        found, times = [], []
+        for r in rows:
+            t = time.perf_counter()
+            found.append(model.search(emb[r], k, nprobe, exclude=r))
+            times.append(time.perf_counter() - t)
+        row = {'nprobe': nprobe, **_percentiles(times), 'recall_vs_exact_dense': round(_recall(found, exact), 4)}
+        if matrix is not None:
+            row['recall_vs_tfidf'] = round(_score_recall(found, tfidf, k), 4)
+        report['ivf'].append(row)
+    return report
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog='python -m app.dense',
+                                 description='Recall/latency of the dense IVF index against exact search.')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    b = sub.add_parser('bench')
+    b.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    b.add_argument('--queries', type=int, default=300)
+    b.add_argument('--k', type=int, default=10)
+    b.add_argument('--dim', type=int, default=DIM)
+    b.add_argument('--synthetic', type=int, metavar='N',
+                   help='benchmark N clustered random embeddings instead of the catalogue')
+    b.add_argument('--json', action='store_true', help='print the raw report')
+    args = ap.parse_args(argv)
+
+    rec = None
+    if not args.synthetic:
+        from .recommender_core import Recommender
+        rec = Recommender()
+    report = bench(rec, args.nprobe, args.queries, args.k, args.synthetic, args.dim)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"{report['movies']} movies, dim {report['dim']}, {report['lists']} lists, "
+          f"built in {report['build_s']}s, recall@{report['k']}")
+    if 'exact_tfidf' in report:
+        e = report['exact_tfidf']
+        print(f"  exact tf-idf   p50 {e['p50_ms']:8.3f}ms  p95 {e['p95_ms']:8.3f}ms")
+    e = report['exact_dense']
+    extra = f"  vs tf-idf {e['recall_vs_tfidf']:.3f}" if 'recall_vs_tfidf' in e else ''
+    print(f"  exact dense    p50 {e['p50_ms']:8.3f}ms  p95 {e['p95_ms']:8.3f}ms{extra}")
+    for row in report['ivf']:
+        extra = f"  vs tf-idf {row['recall_vs_tfidf']:.3f}" if 'recall_vs_tfidf' in row else ''
+        print(f"  ivf nprobe {row['nprobe']:3d} p50 {row['p50_ms']:8.3f}ms  p95 {row['p95_ms']:8.3f}ms  "
+              f"recall {row['recall_vs_exact_dense']:.3f}{extra}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
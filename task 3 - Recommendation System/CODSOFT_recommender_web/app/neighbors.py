@@ -0,0 +1,221 @@
+"""
+Precomputed item-item top-K neighbour index.
+
+For every movie the K most similar other movies (cosine similarity of the
+TF-IDF rows) are stored next to the TF-IDF artifact:
+
+- neighbors_ids.npy:    int32 [n_movies, K], most similar first
+- neighbors_scores.npy: float32 [n_movies, K]
+- neighbors.json:       K and the matrix shape it was built from
+
+A known-title query then reads one row instead of scoring the whole
+catalogue. The index is built offline in row chunks, so only a chunk of the
+similarity matrix is ever dense. The chunks can be spread over a process
+pool: workers memory-map the artifact instead of receiving a pickled copy.
+Each row is cut down with argpartition and only its K survivors are sorted.
+
+Ties are ordered by catalogue position (lower row first), both here and in
+the live path (top_k), so both give the same order.
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+DEFAULT_K = 50
+CHUNK_ROWS = 512
+
+_worker_matrix = None
+
+
+def top_k(scores, k, exclude=None):
+    """
+    Indices of the k highest entries of a 1-D score array, best first (ties by
+    lower index), skipping `exclude`. Partial selection: O(n + k log k).
+    """
+    scores = np.asarray(scores)
+    if exclude is not None:
+        scores = scores.copy()
+        scores[exclude] = -np.inf
+    n = scores.shape[0] - (0 if exclude is None else 1)
+    k = max(0, min(k, n))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        part = np.argpartition(-scores, k - 1)[:k]
+        kth = scores[part].min()
+        # entries tied with the k-th best: keep the lowest indices
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[:k - above.shape[0]]
+        cand = np.concatenate((above, ties))
+    else:
+        cand = np.arange(scores.shape[0])
+    order = np.lexsort((cand, -scores[cand]))[:k]
+    return cand[order]
+
+
+def rows_top_k(scores, k, exclude=None):
+    """
+    Row-wise top_k of a 2-D score array: int64 [n_rows, k], same order and
+    tie-breaking as top_k. exclude, if given, holds one column per row to skip.
+    One argpartition over the whole block; rows where the k-th score is tied
+    with unselected entries get their ties refilled by lowest column.
+    """
+    # work on negated scores (one copy), so the best entries are the smallest
+    neg = np.negative(scores)
+    n_rows, n_cols = neg.shape
+    if exclude is not None:
+        neg[np.arange(n_rows), exclude] = np.inf
+    k = max(0, min(k, n_cols - (0 if exclude is None else 1)))
+    if k == 0 or n_rows == 0:
+        return np.empty((n_rows, k), dtype=np.int64)
+    if k < n_cols:
+        cand = np.argpartition(neg, k - 1, axis=1)[:, :k]
+        # argpartition picks arbitrary members of a tie at the k-th place; like top_k, keep the lowest ids
+        kth = np.take_along_axis(neg, cand, axis=1).max(axis=1)[:, None]
+        above = neg < kth
+        tied = np.flatnonzero(above.sum(axis=1) + (neg == kth).sum(axis=1) > k)
+        if tied.shape[0]:
+            sub_above = above[tied]
+            ties = neg[tied] == kth[tied]
+            need = k - sub_above.sum(axis=1)
+            keep = sub_above | (ties & (np.cumsum(ties, axis=1) <= need[:, None]))
+            cand[tied] = np.nonzero(keep)[1].reshape(-1, k)
+    else:
+        cand = np.tile(np.arange(n_cols), (n_rows, 1))
+    vals = np.take_along_axis(neg, cand, axis=1)
+    return np.take_along_axis(cand, np.lexsort((cand, vals), axis=1), axis=1)
+
+
+def _rows_top_k(sims, k, first_row):
+    """Row-wise top_k of a dense chunk; row i's own column is excluded."""
+    n_rows = sims.shape[0]
+    ids = np.empty((n_rows, k), dtype=np.int32)
+    scores = np.empty((n_rows, k), dtype=np.float32)
+    for i in range(n_rows):
+        cols = top_k(sims[i], k, exclude=first_row + i)
+        ids[i] = cols
+        scores[i] = sims[i, cols]
+    return ids, scores
+
+
+def _chunk(matrix, start, stop, k):
+    sims = (matrix[start:stop] @ matrix.T).toarray()
+    return _rows_top_k(sims, k, start)
+
+
+def _top_rows(matrix, rows, k):
+    """Exact top_k lists (ids, scores) of the given rows, each excluding itself."""
+    sims = (matrix[rows] @ matrix.T).toarray()
+    ids = rows_top_k(sims, k, exclude=rows)
+    return ids.astype(np.int32), np.take_along_axis(sims, ids, axis=1).astype(np.float32)
+
+
+def refresh(matrix, ids, scores, changed, chunk_rows=CHUNK_ROWS):
+    """
+    Index for `matrix` after the rows in `changed` were replaced or appended
+    (rows from ids.shape[0] on are new), without rebuilding it. Recomputed are
+    the changed rows, rows whose list held a changed row, and rows a changed
+    row now scores at least their K-th neighbour for; every other list cannot
+    have moved. The result equals build(matrix, k). Returns (ids, scores,
+    number of recomputed rows); the input arrays are left untouched.
+    """
+    matrix = matrix.tocsr()
+    n = matrix.shape[0]
+    n_old, k = ids.shape
+    changed = np.unique(np.asarray(changed, dtype=np.int64))
+    new_ids = np.empty((n, k), dtype=np.int32)
+    new_scores = np.empty((n, k), dtype=np.float32)
+    new_ids[:n_old] = ids
+    new_scores[:n_old] = scores
+    stale = []
+    for start in range(0, changed.shape[0], chunk_rows):
+        rows = changed[start:start + chunk_rows]
+        sims = (matrix[rows] @ matrix.T).toarray()
+        top = rows_top_k(sims, k, exclude=rows)
+        new_ids[rows] = top
+        new_scores[rows] = np.take_along_axis(sims, top, axis=1)
+        # similarity is symmetric: sims[:, i] is what row i sees of the changed rows
+        reach = (sims[:, :n_old].astype(np.float32) >= np.asarray(scores)[:, -1]).any(axis=0)
+        stale.append(np.flatnonzero(reach))
+    old = np.setdiff1d(np.arange(n_old), changed)
+    listed = old[np.isin(np.asarray(ids)[old], changed).any(axis=1)]
+    stale = np.setdiff1d(np.union1d(listed, np.concatenate(stale) if stale else listed), changed)
+    for start in range(0, stale.shape[0], chunk_rows):
+        rows = stale[start:start + chunk_rows]
+        new_ids[rows], new_scores[rows] = _top_rows(matrix, rows, k)
+    return new_ids, new_scores, int(changed.shape[0] + stale.shape[0])
+
+
+def _init_worker(artifact_path):
+    global _worker_matrix
+    from . import artifacts
+    _worker_matrix = artifacts.Artifact(artifact_path).matrix
+
+
+def _worker_chunk(args):
+    start, stop, k = args
+    return start, _chunk(_worker_matrix, start, stop, k)
+
+
+def build(matrix, k=DEFAULT_K, chunk_rows=CHUNK_ROWS, workers=1, artifact_path=None):
+    """
+    Top-k neighbours of every row of a CSR matrix with L2-normalised rows.
+    Returns (ids int32 [n, k], scores float32 [n, k]); k is capped at n - 1.
+    With workers > 1 the chunks run in a process pool; that needs
+    artifact_path so each worker can map the matrix itself.
+    """
+    n = matrix.shape[0]
+    k = max(1, min(k, n - 1))
+    ids = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+    chunks = [(s, min(s + chunk_rows, n), k) for s in range(0, n, chunk_rows)]
+    if workers > 1 and artifact_path is not None and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(artifact_path,)) as pool:
+            for start, (c_ids, c_scores) in pool.map(_worker_chunk, chunks):
+                ids[start:start + len(c_ids)] = c_ids
+                scores[start:start + len(c_ids)] = c_scores
+    else:
+        matrix = matrix.tocsr()
+        for start, stop, _ in chunks:
+            ids[start:stop], scores[start:stop] = _chunk(matrix, start, stop, k)
+    return ids, scores
+
+
+def _save_array(path, arr):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+
+def save(artifact_path, ids, scores, shape):
+    """Write the index into an artifact directory; neighbors.json goes last and marks it complete."""
+    meta_path = os.path.join(artifact_path, 'neighbors.json')
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    _save_array(os.path.join(artifact_path, 'neighbors_ids.npy'), ids)
+    _save_array(os.path.join(artifact_path, 'neighbors_scores.npy'), scores)
+    tmp = meta_path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'k': int(ids.shape[1]), 'shape': list(shape)}, f)
+    os.replace(tmp, meta_path)
+
+
+def load(artifact_path, shape):
+    """(ids, scores) memory-mapped from an artifact directory, or None if absent or stale."""
+    meta_path = os.path.join(artifact_path, 'neighbors.json')
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if tuple(meta['shape']) != tuple(shape):
+            return None
+        ids = np.load(os.path.join(artifact_path, 'neighbors_ids.npy'), mmap_mode='r')
+        scores = np.load(os.path.join(artifact_path, 'neighbors_scores.npy'), mmap_mode='r')
+    except (OSError, ValueError, KeyError):
+        return None
+    if ids.shape != scores.shape or ids.shape[0] != shape[0]:
+        return None
+    return ids, scores
@@ -1,13 +1,24 @@
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import linear_kernel
+import numpy as np
+import scipy.sparse as sp
 import os
+import threading
+
+from . import artifacts, collab, dense, neighbors
+from .titles import TitleIndex
 
 DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'movies.csv')
+BATCH_ROWS = 256    # query rows scored per dense block in recommend_many
+MODES = collab.MODES + ('dense',)
 
 class Recommender:
-    def __init__(self):
-        self.df = pd.read_csv(DATA_PATH)
+    def __init__(self, data_path=DATA_PATH, artifact_dir=artifacts.ARTIFACT_DIR,
+                 ratings_path=collab.RATINGS_ZIP):
+        self.data_path = data_path
+        self.artifact_dir = artifact_dir
+        self.ratings_path = ratings_path
+        self.df = pd.read_csv(data_path)
         # keep only relevant cols
         if 'genres' not in self.df.columns:
             self.df['genres'] = ''
@@ -15,22 +26,276 @@ class Recommender:
             self.df['title'] = self.df.get('movieId', '').astype(str)
         # create combined text
         self.df['text'] = self.df['title'].fillna('') + ' ' + self.df['genres'].fillna('')
-        self.tfidf = TfidfVectorizer(stop_words='english', ngram_range=(1,2))
-        self.tfidf_matrix = self.tfidf.fit_transform(self.df['text'])
-
-    def recommend(self, title_query, topn=10):
-        q = title_query.strip().lower()
-        # find best matching title by substring or fallback to exact similarity on title text
-        matches = self.df[self.df['title'].str.lower().str.contains(q, na=False)]
-        if matches.empty:
+        # reuse the fitted model saved for this exact CSV (see artifacts.py); fit and save it otherwise.
+        # artifact_dir=None always fits in memory.
+        self.artifact = None
+        self.artifact_built = False
+        self.csv_hash = artifacts.file_hash(data_path)
+        self.generation = 0   # bumped whenever results can change without a new CSV
+        if artifact_dir is not None:
+            path = artifacts.artifact_path(self.csv_hash, artifact_dir)
+            self.artifact = artifacts.load(path)
+            if self.artifact is None:
+                self._fit()
+                try:
+                    artifacts.save(path, self._tfidf, self.tfidf_matrix, self.csv_hash)
+                    self.artifact_built = True
+                    self.artifact = artifacts.load(path)
+                except OSError:
+                    pass   # read-only data dir: keep serving from the in-memory fit
+            if self.artifact is not None:
+                self.tfidf_matrix = self.artifact.matrix
+                self._tfidf = None
+        else:
+            self._fit()
+        # precomputed top-K neighbours (built by `python -m app.artifacts build`)
+        self.neighbors = None
+        if self.artifact is not None:
+            self.neighbors = neighbors.load(self.artifact.path, self.tfidf_matrix.shape)
+        self.titles = self._title_index()
+        # plain arrays for building batch results without pandas row objects
+        self._title_values = self.df['title'].to_numpy()
+        self._genre_values = self.df['genres'].to_numpy()
+        # collaborative model: loaded/built on first collab or hybrid request
+        self._collab = None
+        self._collab_lock = threading.Lock()
+        # dense embeddings + IVF index: loaded/built on first dense request
+        self._dense = None
+        self._dense_lock = threading.Lock()
+        self._doc_freq = None
+
+    def _title_index(self):
+        # saved next to the TF-IDF artifact; built (and saved) on first start
+        titles = self.df['title'].fillna('').tolist()
+        path = os.path.join(self.artifact.path, 'titles.npz') if self.artifact is not None else None
+        index = TitleIndex.load(path, titles) if path else None
+        if index is None:
+            index = TitleIndex(titles)
+            if path:
+                try:
+                    index.save(path)
+                except OSError:
+                    pass
+        return index
+
+    def collab_model(self):
+        """CollabModel for this catalogue, or None without ratings (or a movieId column)."""
+        if self._collab is not None:
+            return self._collab or None
+        with self._collab_lock:
+            if self._collab is None:
+                self._collab = self._load_collab() or False
+        return self._collab or None
+
+    def _load_collab(self):
+        if not self.ratings_path or not os.path.isfile(self.ratings_path) or 'movieId' not in self.df.columns:
+            return None
+        source = collab.ratings_source_id(self.ratings_path)
+        if self.artifact is not None:
+            emb = collab.load(self.artifact.path, source, len(self.df))
+            if emb is not None:
+                return collab.CollabModel(emb)
+        model = collab.CollabModel.build(self.ratings_path, self.df['movieId'].to_numpy())
+        if self.artifact is not None:
+            try:
+                collab.save(self.artifact.path, model.embeddings, source, model.n_ratings)
+            except OSError:
+                pass
+        return model
+
+    def dense_model(self):
+        """DenseModel (SVD embeddings + IVF index) for this catalogue."""
+        if self._dense is None:
+            with self._dense_lock:
+                if self._dense is None:
+                    self._dense = self._load_dense()
+        return self._dense
+
+    def _load_dense(self):
+        shape = self.tfidf_matrix.shape
+        if self.artifact is not None:
+            model = dense.load(self.artifact.path, shape)
+            if model is not None:
+                return model
+        model = dense.DenseModel.build(self.tfidf_matrix)
+        if self.artifact is not None:
+            try:
+                dense.save(self.artifact.path, model, shape)
+                model = dense.load(self.artifact.path, shape) or model
+            except OSError:
+                pass
+        return model
+
+    def _dense_ids(self, queries, topn):
+        """{query: rows} from the IVF index; queries without any known term are left out."""
+        model = self.dense_model()
+        resolved = [(q, self.titles.resolve(q)) for q in queries]
+        texts = [q for q, idx in resolved if idx is None]
+        projected = dict(zip(texts, model.project(self.tfidf.transform(texts)))) if texts else {}
+        out = {}
+        for q, idx in resolved:
+            vec = projected[q] if idx is None else np.asarray(model.embeddings[idx])
+            if np.any(vec):
+                out[q] = model.search(vec, topn, exclude=idx)
+        return out
+
+    def _fit(self):
+        self._tfidf = artifacts.make_vectorizer()
+        self.tfidf_matrix = self._tfidf.fit_transform(self.df['text'])
+
+    def build_neighbors(self, k=neighbors.DEFAULT_K, workers=1):
+        """Compute the top-k neighbour index (and save it with the artifact, if there is one)."""
+        path = self.artifact.path if self.artifact is not None else None
+        ids, scores = neighbors.build(self.tfidf_matrix, k, workers=workers, artifact_path=path)
+        if path is not None:
+            neighbors.save(path, ids, scores, self.tfidf_matrix.shape)
+            self.neighbors = neighbors.load(path, self.tfidf_matrix.shape)
+        else:
+            self.neighbors = ids, scores
+        self.generation += 1
+        return ids.shape[1]
+
+    @property
+    def version(self):
+        """Identifies the model behind the results (CSV content + in-process rebuilds); cached results are keyed on it."""
+        return f'{self.csv_hash[:16]}-{self.generation}'
+
+    @property
+    def doc_freq(self):
+        # per-term document counts, kept up to date by catalog.upsert
+        if self._doc_freq is None:
+            from .catalog import doc_freq
+            self._doc_freq = doc_freq(self.tfidf_matrix)
+        return self._doc_freq
+
+    @property
+    def artifact_loaded(self):
+        return self.artifact is not None
+
+    @property
+    def tfidf(self):
+        # with an artifact the vectorizer is rebuilt on first use (free-text queries only)
+        if self._tfidf is None:
+            self._tfidf = self.artifact.vectorizer()
+        return self._tfidf
+
+    def autocomplete(self, query, limit=10):
+        """Top title matches for a partial query: [{'title', 'genres', 'match', 'score'}]."""
+        hits = self.titles.search(query, limit=limit)
+        genres = self.df['genres']
+        return [{'title': self.titles.titles[r], 'genres': genres.iat[r], 'match': kind, 'score': score}
+                for r, kind, score in hits]
+
+    def recommend(self, title_query, topn=10, mode='content'):
+        """
+        mode: 'content' (TF-IDF of title + genres), 'collab' (rating factors),
+        'hybrid' (blend of both) or 'dense' (approximate search over SVD
+        embeddings of the TF-IDF rows, see dense.py). In collab/hybrid mode,
+        free-text queries that match no title and movies without ratings are
+        answered by content.
+        """
+        if mode not in MODES:
+            raise ValueError(f'unknown mode {mode!r}')
+        if mode == 'dense':
+            found = self._dense_ids([title_query], topn).get(title_query)
+            if found is not None:
+                return self.df.iloc[found][['title','genres']].drop_duplicates().head(topn)
+            mode = 'content'
+        # resolve the query to a movie through the title index (exact > prefix > substring > fuzzy)
+        idx = self.titles.resolve(title_query)
+        if idx is None:
             # fallback: compute similarity of query string to titles
             # vectorize the query using the same vectorizer (transform of combined field)
             q_vec = self.tfidf.transform([title_query])
             cosine_similarities = linear_kernel(q_vec, self.tfidf_matrix).flatten()
-            related_indices = cosine_similarities.argsort()[::-1][:topn]
+            related_indices = neighbors.top_k(cosine_similarities, topn)
             return self.df.iloc[related_indices][['title','genres']].drop_duplicates().head(topn)
-        idx = matches.index[0]
-        cosine_similarities = linear_kernel(self.tfidf_matrix[idx:idx+1], self.tfidf_matrix).flatten()
-        cosine_similarities[idx] = -1
-        related_indices = cosine_similarities.argsort()[::-1][:topn]
+        model = self.collab_model() if mode in ('collab', 'hybrid') else None
+        if model is not None and model.has_signal[idx]:
+            if mode == 'collab':
+                scores = np.where(model.has_signal, model.scores(idx), -np.inf)
+            else:
+                content = linear_kernel(self.tfidf_matrix[idx:idx+1], self.tfidf_matrix).flatten()
+                scores = model.blend(idx, content)
+            related_indices = neighbors.top_k(scores, topn, exclude=idx)
+        elif self.neighbors is not None and topn <= self.neighbors[0].shape[1]:
+            # O(topn) read of the precomputed index
+            related_indices = self.neighbors[0][idx, :topn]
+        else:
+            cosine_similarities = linear_kernel(self.tfidf_matrix[idx:idx+1], self.tfidf_matrix).flatten()
+            related_indices = neighbors.top_k(cosine_similarities, topn, exclude=idx)
         return self.df.iloc[related_indices][['title','genres']].drop_duplicates().head(topn)
+
+    def recommend_many(self, queries, topn=10, mode='content'):
+        """
+        Recommendations for several queries at once: one [{'title', 'genres'}]
+        list per query, in order, with the same results as recommend().
+        Every query is resolved first; the rows that need scoring are stacked
+        into one sparse query matrix (free text through the vectorizer, known
+        titles as their TF-IDF rows) and scored with one matrix product per
+        block of BATCH_ROWS, followed by a row-wise top-k.
+        """
+        if mode not in MODES:
+            raise ValueError(f'unknown mode {mode!r}')
+        topn = max(0, int(topn))
+        queries = list(queries)
+        unique = list(dict.fromkeys(queries))
+        if mode == 'dense':
+            found = self._dense_ids(unique, topn)
+            rest = [q for q in unique if q not in found]
+            fallback = dict(zip(rest, self.recommend_many(rest, topn))) if rest else {}
+            return [self._records(found[q], topn) if q in found else fallback[q] for q in queries]
+        model = self.collab_model() if mode in ('collab', 'hybrid') else None
+        use_index = self.neighbors is not None and topn <= self.neighbors[0].shape[1]
+        texts, known, rated, ids = [], [], [], {}
+        for q in unique:
+            idx = self.titles.resolve(q)
+            if idx is None:
+                texts.append(q)
+            elif model is not None and model.has_signal[idx]:
+                rated.append((q, idx))
+            elif use_index:
+                ids[q] = self.neighbors[0][idx, :topn]
+            else:
+                known.append((q, idx))
+        if mode == 'hybrid':
+            known += rated       # content scores first, blended below
+            rated = []
+        if texts or known:
+            blocks = []
+            if texts:
+                blocks.append(self.tfidf.transform(texts))
+            if known:
+                blocks.append(self.tfidf_matrix[np.array([i for _, i in known])])
+            matrix = sp.vstack(blocks, format='csr')
+            keys = texts + [q for q, _ in known]
+            rows = np.array([-1] * len(texts) + [i for _, i in known])
+            for start in range(0, matrix.shape[0], BATCH_ROWS):
+                block = rows[start:start + BATCH_ROWS]
+                sims = linear_kernel(matrix[start:start + BATCH_ROWS], self.tfidf_matrix)
+                free = block < 0
+                if model is not None and not free.all():
+                    sims[~free] = model.blend(block[~free], sims[~free])
+                self._collect(ids, keys[start:start + BATCH_ROWS], sims, block, topn)
+        if rated:
+            for start in range(0, len(rated), BATCH_ROWS):
+                chunk = rated[start:start + BATCH_ROWS]
+                block = np.array([i for _, i in chunk])
+                sims = np.where(model.has_signal, model.scores(block), -np.inf)
+                self._collect(ids, [q for q, _ in chunk], sims, block, topn)
+        return [self._records(ids[q], topn) for q in queries]
+
+    @staticmethod
+    def _collect(ids, keys, sims, rows, topn):
+        # rows: the movie each score row belongs to (excluded from its results), -1 for free text
+        free = rows < 0
+        for mask, exclude in ((free, None), (~free, rows[~free])):
+            if mask.any():
+                for q, top in zip(np.asarray(keys, dtype=object)[mask],
+                                  neighbors.rows_top_k(sims[mask], topn, exclude)):
+                    ids[q] = top
+
+    def _records(self, rows, topn):
+        # same as .drop_duplicates().head(topn) on the title/genres frame
+        pairs = dict.fromkeys(zip(self._title_values[rows].tolist(), self._genre_values[rows].tolist()))
+        return [{'title': t, 'genres': g} for t, g in list(pairs)[:topn]]
@@ -0,0 +1,373 @@
+"""
+Title index: resolves a typed query to a movie without scanning the catalogue.
+
+Built once when the Recommender loads. Every title gets a few lowercase
+search forms: the MovieLens form "matrix, the (1999)", the same without the
+year, and the natural forms "the matrix (1999)" / "the matrix". On top of
+these forms there are three structures:
+
+- prefix: sorted list of forms, searched with bisect (an exact match is the
+  equal range of the same list)
+- trigrams: two NumPy posting indexes (trigram code -> rows, built without a
+  Python loop per trigram). One covers all forms and narrows substring
+  candidates; the other covers the padded, year-less natural title and
+  counts shared trigrams for fuzzy matching (Dice coefficient).
+
+search() ranks exact > prefix > substring > fuzzy. Within a kind, older
+titles come first (so "star wars" finds the 1977 film before its sequels),
+then shorter ones, then catalogue order; fuzzy matches rank by similarity.
+Queries are matched literally (no regex).
+
+resolve() picks the movie a query names. It accepts a fuzzy match only if
+most trigrams of both the query and the title are shared (RESOLVE_OVERLAP):
+a misspelt title still resolves, but free text such as "comedy romance" is
+left to the TF-IDF search instead of landing on "Romance (1999)".
+
+The built index is plain arrays; save()/load() keep it in the TF-IDF artifact
+directory (titles.npz) so workers skip the ~0.2s build.
+"""
+import bisect
+import heapq
+import os
+import re
+
+import numpy as np
+
+EXACT, PREFIX, SUBSTRING, FUZZY = 'exact', 'prefix', 'substring', 'fuzzy'
+
+FUZZY_THRESHOLD = 0.5     # minimum Dice similarity for a fuzzy match
+RESOLVE_OVERLAP = 0.6     # resolve(): minimum share of the query's and the title's trigrams in common
+NO_YEAR = 9999            # sorts titles without a year after dated ones
+
+_YEAR = re.compile(r'\s*\(\d{4}(?:[-–]\d{0,4})?\)\s*$')
+# MovieLens moves leading articles to the end: "Matrix, The (1999)"
+_ARTICLE = re.compile(r"^(.*), (the|a|an|les|la|le|l'|il|lo|gli|i|das|der|die|den|det|de|el|los|las|un|une)$")
+
+
+def normalize(text):
+    return ' '.join(str(text).lower().split())
+
+
+def title_forms(title):
+    """Lowercase search forms of one title, the natural year-less form last."""
+    full = normalize(title)
+    base = _YEAR.sub('', full) if full.endswith(')') else full
+    year = full[len(base):].strip()
+    forms = [full, base]
+    m = _ARTICLE.match(base) if ', ' in base else None
+    if m:
+        name, article = m.groups()
+        natural = article + ('' if article.endswith("'") else ' ') + name
+        forms += [f'{natural} {year}'.strip(), natural]
+    return list(dict.fromkeys(forms))
+
+
+def title_year(title):
+    """Release year from a trailing "(1999)" (or "(1999-2004)"), NO_YEAR without one."""
+    m = _YEAR.search(str(title))
+    return int(m.group().strip()[1:5]) if m else NO_YEAR
+
+
+def _codes(text):
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+
+
+def _encode(codes):
+    # three code points (< 2**21 each) packed into one int64
+    return codes[:-2] << 42 | codes[1:-1] << 21 | codes[2:]
+
+
+def trigrams(text):
+    """Sorted unique trigram codes of a string."""
+    if len(text) < 3:
+        return np.empty(0, dtype=np.int64)
+    return np.unique(_encode(_codes(text)))
+
+
+class _GramIndex:
+    """trigram code -> sorted row ids, stored CSR-style (keys, offsets, rows)."""
+
+    FIELDS = ('keys', 'offsets', 'rows', 'counts')
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        self = cls.__new__(cls)
+        for name in cls.FIELDS:
+            setattr(self, name, arrays[prefix + name])
+        return self
+
+    def arrays(self, prefix):
+        return {prefix + name: getattr(self, name) for name in self.FIELDS}
+
+    def __init__(self, texts):
+        grams, rows = self._pairs(texts)
+        self._set_pairs(grams, rows, len(texts))
+
+    @staticmethod
+    def _pairs(texts, row_ids=None):
+        """Unique (trigram, row) pairs of some texts, sorted by trigram then row."""
+        lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+        codes = _codes(''.join(texts))
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+        grams, rows = _encode(codes), rows[:-2]
+        same = rows == np.repeat(np.arange(len(texts)), lengths)[2:]   # all 3 chars in one text
+        grams, rows = grams[same], rows[same]
+        if row_ids is not None:
+            rows = np.asarray(row_ids, dtype=np.int64)[rows]
+            order = np.lexsort((rows, grams))
+        else:
+            # rows are already ascending, so a stable sort by trigram keeps them sorted per trigram
+            order = np.argsort(grams, kind='stable')
+        grams, rows = grams[order], rows[order]
+        keep = np.ones(grams.shape[0], dtype=bool)
+        keep[1:] = (grams[1:] != grams[:-1]) | (rows[1:] != rows[:-1])
+        return grams[keep], rows[keep]
+
+    def _set_pairs(self, grams, rows, n_texts):
+        starts = np.flatnonzero(np.r_[True, grams[1:] != grams[:-1]])[:grams.shape[0]]
+        self.keys = grams[starts]
+        self.offsets = np.append(starts, grams.shape[0])
+        self.rows = rows.astype(np.int32)
+        # distinct trigrams per text
+        self.counts = np.bincount(rows, minlength=n_texts).astype(np.int32)
+
+    def updated(self, texts_by_row, n_texts):
+        """
+        Copy with the postings of the given rows replaced by those of their new
+        texts (rows past the old end are appended). The new pairs are merged
+        into the sorted arrays instead of re-sorting everything.
+        """
+        changed = np.array(sorted(texts_by_row), dtype=np.int64)
+        grams = np.repeat(self.keys, np.diff(self.offsets))
+        rows = self.rows.astype(np.int64)
+        keep = ~np.isin(rows, changed)
+        grams, rows = grams[keep], rows[keep]
+        add_grams, add_rows = self._pairs([texts_by_row[r] for r in changed], changed)
+        lo = np.searchsorted(grams, add_grams, 'left')
+        hi = np.searchsorted(grams, add_grams, 'right')
+        pos = np.array([a + np.searchsorted(rows[a:b], r) for a, b, r in zip(lo, hi, add_rows)],
+                       dtype=np.int64)
+        new = _GramIndex.__new__(_GramIndex)
+        new._set_pairs(np.insert(grams, pos, add_grams), np.insert(rows, pos, add_rows), n_texts)
+        return new
+
+    def postings(self, grams):
+        """Row arrays for each trigram code, None for a trigram that never occurs."""
+        pos = np.searchsorted(self.keys, grams)
+        out = []
+        for g, p in zip(grams, pos):
+            if p < self.keys.shape[0] and self.keys[p] == g:
+                out.append(self.rows[self.offsets[p]:self.offsets[p + 1]])
+            else:
+                out.append(None)
+        return out
+
+
+def _text_array(strings, sep):
+    return np.frombuffer(sep.join(strings).encode('utf-8'), dtype=np.uint8)
+
+
+def _text_list(arr, sep):
+    return bytes(arr).decode('utf-8').split(sep) if arr.shape[0] else []
+
+
+class TitleIndex:
+    def __init__(self, titles):
+        self.titles = [str(t) for t in titles]
+        prefix = []
+        self.forms = []
+        fuzzy_texts = []
+        for row, title in enumerate(self.titles):
+            forms = title_forms(title)
+            # every form is a substring of the first or of the natural form with year
+            self.forms.append('\t'.join(forms))
+            for form in forms:
+                prefix.append((form, row))
+            fuzzy_texts.append(f'  {forms[-1]} ')
+        prefix.sort()
+        self._prefix_keys = [f for f, _ in prefix]
+        self._prefix_rows = np.array([r for _, r in prefix], dtype=np.int32)
+        self._substring = _GramIndex(self.forms)
+        self._fuzzy = _GramIndex(fuzzy_texts)
+        self._lengths = np.array([len(t) for t in self.titles], dtype=np.int32)
+        self._years = np.array([title_year(t) for t in self.titles], dtype=np.int16)
+
+    def save(self, path):
+        """Write the index as one .npz (atomically)."""
+        arrays = {
+            'prefix_keys': _text_array(self._prefix_keys, '\n'),
+            'prefix_rows': self._prefix_rows,
+            'forms': _text_array(self.forms, '\n'),
+            'lengths': self._lengths,
+            'years': self._years,
+        }
+        arrays.update(self._substring.arrays('sub_'))
+        arrays.update(self._fuzzy.arrays('fuzzy_'))
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, titles):
+        """Index saved by save() for these titles, or None if missing or not matching."""
+        try:
+            with np.load(path) as data:
+                arrays = {k: data[k] for k in data.files}
+        except (OSError, ValueError):
+            return None
+        titles = [str(t) for t in titles]
+        try:
+            if arrays['lengths'].shape[0] != len(titles):
+                return None
+            self = cls.__new__(cls)
+            self.titles = titles
+            self._prefix_keys = _text_list(arrays['prefix_keys'], '\n')
+            self._prefix_rows = arrays['prefix_rows']
+            self.forms = _text_list(arrays['forms'], '\n')
+            self._lengths = arrays['lengths']
+            self._years = arrays['years']
+            self._substring = _GramIndex.from_arrays(arrays, 'sub_')
+            self._fuzzy = _GramIndex.from_arrays(arrays, 'fuzzy_')
+        except KeyError:
+            return None
+        return self
+
+    def updated(self, changes):
+        """
+        Copy of the index with titles[row] = title for each (row, title) in
+        `changes`; rows past the end are appended (in order). Only the changed
+        titles are processed; this index is left as it was.
+        """
+        n_old = len(self.titles)
+        titles = list(self.titles)
+        forms = list(self.forms)
+        for row in sorted(changes):
+            title = str(changes[row])
+            if row < n_old:
+                titles[row] = title
+                forms[row] = '\t'.join(title_forms(title))
+            elif row == len(titles):
+                titles.append(title)
+                forms.append('\t'.join(title_forms(title)))
+            else:
+                raise ValueError('appended rows must follow the last row')
+        rows = sorted(changes)
+        new = TitleIndex.__new__(TitleIndex)
+        new.titles = titles
+        new.forms = forms
+        # prefix list: drop the old forms of changed rows, merge in the new ones
+        gone = set(r for r in rows if r < n_old)
+        kept = [(f, int(r)) for f, r in zip(self._prefix_keys, self._prefix_rows) if int(r) not in gone]
+        added = sorted((f, r) for r in rows for f in forms[r].split('\t'))
+        merged = list(heapq.merge(kept, added))
+        new._prefix_keys = [f for f, _ in merged]
+        new._prefix_rows = np.array([r for _, r in merged], dtype=np.int32)
+        new._substring = self._substring.updated({r: forms[r] for r in rows}, len(titles))
+        natural = {r: forms[r].split('\t')[-1] for r in rows}
+        new._fuzzy = self._fuzzy.updated({r: f'  {natural[r]} ' for r in rows}, len(titles))
+        lengths = np.zeros(len(titles), dtype=np.int32)
+        lengths[:n_old] = self._lengths
+        lengths[rows] = [len(titles[r]) for r in rows]
+        new._lengths = lengths
+        years = np.zeros(len(titles), dtype=np.int16)
+        years[:n_old] = self._years
+        years[rows] = [title_year(titles[r]) for r in rows]
+        new._years = years
+        return new
+
+    def __len__(self):
+        return len(self.titles)
+
+    # individual match kinds; each returns row ids, best first
+
+    def match_exact(self, q):
+        lo = bisect.bisect_left(self._prefix_keys, q)
+        hi = bisect.bisect_right(self._prefix_keys, q, lo)
+        return self._ranked(np.unique(self._prefix_rows[lo:hi]))
+
+    def match_prefix(self, q):
+        lo = bisect.bisect_left(self._prefix_keys, q)
+        hi = bisect.bisect_left(self._prefix_keys, q + '\U0010ffff', lo)
+        return self._ranked(np.unique(self._prefix_rows[lo:hi]))
+
+    def match_substring(self, q):
+        """Titles containing q (3+ characters; shorter queries are left to prefix matching)."""
+        if len(q) < 3:
+            return []
+        lists = self._substring.postings(trigrams(q))
+        if any(p is None for p in lists):
+            return []
+        lists.sort(key=len)
+        rows = lists[0]
+        for other in lists[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+            if not rows.shape[0]:
+                return []
+        if len(q) > 3:
+            # sharing every trigram doesn't guarantee containment; check the survivors
+            rows = [r for r in rows if q in self.forms[r]]
+        return self._ranked(rows)
+
+    def match_fuzzy(self, q, threshold=FUZZY_THRESHOLD, limit=20, overlap=0.0):
+        """
+        [(row, similarity)] by Dice coefficient of padded trigrams, best first.
+        With `overlap`, a title must also share at least that fraction of its
+        own trigrams and of the query's.
+        """
+        grams = trigrams(f'  {q} ')
+        lists = [p for p in self._fuzzy.postings(grams) if p is not None]
+        if not lists:
+            return []
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.titles))
+        rows = np.flatnonzero(shared)
+        counts = self._fuzzy.counts[rows]
+        sims = 2.0 * shared[rows] / (grams.shape[0] + counts)
+        ok = sims >= threshold
+        if overlap:
+            ok &= shared[rows] / np.maximum(counts, grams.shape[0]) >= overlap
+        rows, sims = rows[ok], sims[ok]
+        order = np.lexsort((rows, -sims))[:limit]
+        return [(int(rows[i]), float(sims[i])) for i in order]
+
+    def _ranked(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        if not rows.shape[0]:
+            return []
+        return rows[np.lexsort((rows, self._lengths[rows], self._years[rows]))].tolist()
+
+    def search(self, query, limit=10, fuzzy=True):
+        """Ranked [(row, kind, score)]; score is 1.0 except for fuzzy matches."""
+        q = normalize(query)
+        if not q or limit <= 0:
+            return []
+        out, seen = [], set()
+
+        def add(rows, kind, score=1.0):
+            for r in rows:
+                if len(out) >= limit:
+                    return
+                if r not in seen:
+                    seen.add(r)
+                    out.append((r, kind, score))
+
+        add(self.match_exact(q), EXACT)
+        if len(out) < limit:
+            add(self.match_prefix(q), PREFIX)
+        if len(out) < limit:
+            add(self.match_substring(q), SUBSTRING)
+        if fuzzy and len(out) < limit:
+            for r, sim in self.match_fuzzy(q, limit=limit):
+                add([r], FUZZY, round(sim, 4))
+        return out
+
+    def resolve(self, query, fuzzy=True):
+        """Row of the movie a query names, or None (see RESOLVE_OVERLAP for fuzzy matches)."""
+        hits = self.search(query, limit=1, fuzzy=False)
+        if hits:
+            return hits[0][0]
+        if fuzzy:
+            hits = self.match_fuzzy(normalize(query), limit=1, overlap=RESOLVE_OVERLAP)
+            if hits:
+                return hits[0][0]
+        return None
@@ -1,10 +1,21 @@
 from flask import Flask, render_template, request, jsonify
-from .recommender_core import Recommender
+from .recommender_core import MODES, Recommender
+from .cache import ResultCache, cache_key
+from . import catalog
+import json
 import os
+import threading
 
 app = Flask(__name__, template_folder=os.path.join(os.path.dirname(__file__),'..','templates'),
             static_folder=os.path.join(os.path.dirname(__file__),'..','static'))
 recommender = Recommender()
+results_cache = ResultCache()
+# catalogue updates build a new Recommender and swap this reference; a request
+# reads it once, so it is answered by one model from start to end
+_catalog_lock = threading.Lock()
+
+MAX_BATCH_QUERIES = 100
+MAX_UPSERT_MOVIES = 1000
 
 @app.route('/', methods=['GET'])
 def index():
@@ -15,11 +26,92 @@ def recommend():
     data = request.form or request.get_json() or {}
     title = data.get('title','').strip()
     topn = int(data.get('topn') or 8)
+    mode = (data.get('mode') or 'content').strip().lower()
     if not title:
         return jsonify({'error':'Please provide a movie title/query.'}), 400
-    recs = recommender.recommend(title, topn=topn)
-    results = [{'title': r['title'], 'genres': r['genres']} for _,r in recs.iterrows()]
-    return jsonify({'query': title, 'results': results})
+    if mode not in MODES:
+        return jsonify({'error': f"mode must be one of: {', '.join(MODES)}."}), 400
+    results = cached_results([title], topn, mode)[0]
+    return json_response(b'{"query":%s,"results":%s}' % (json.dumps(title).encode(), results))
+
+@app.route('/recommend/batch', methods=['POST'])
+def recommend_batch():
+    data = request.get_json(silent=True) or {}
+    queries = data.get('queries')
+    if not isinstance(queries, list) or not queries:
+        return jsonify({'error': 'Please provide a non-empty "queries" list.'}), 400
+    if len(queries) > MAX_BATCH_QUERIES:
+        return jsonify({'error': f'At most {MAX_BATCH_QUERIES} queries per batch.'}), 400
+    if not all(isinstance(q, str) and q.strip() for q in queries):
+        return jsonify({'error': 'Every query must be a non-empty string.'}), 400
+    try:
+        topn = int(data.get('topn') or 8)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'topn must be a number.'}), 400
+    mode = str(data.get('mode') or 'content').strip().lower()
+    if mode not in MODES:
+        return jsonify({'error': f"mode must be one of: {', '.join(MODES)}."}), 400
+    queries = [q.strip() for q in queries]
+    results = cached_results(queries, topn, mode)
+    items = [b'{"query":%s,"results":%s}' % (json.dumps(q).encode(), res) for q, res in zip(queries, results)]
+    return json_response(b'{"results":[%s]}' % b','.join(items))
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    return jsonify(results_cache.stats())
+
+def cached_results(queries, topn, mode):
+    """Serialized result list (JSON bytes) per query; cache misses are computed in one batch."""
+    rec = recommender
+    version = rec.version
+    keys = [cache_key(q, topn, mode) for q in queries]
+    found = {k: results_cache.get(k, version) for k in dict.fromkeys(keys)}
+    missing = {k: q for k, q in zip(keys, queries) if found[k] is None}
+    if missing:
+        computed = rec.recommend_many(list(missing.values()), topn=topn, mode=mode)
+        for k, res in zip(missing, computed):
+            found[k] = json.dumps(res, separators=(',', ':')).encode()
+            results_cache.put(k, version, found[k])
+    return [found[k] for k in keys]
+
+def json_response(body):
+    return app.response_class(body, mimetype='application/json')
+
+@app.route('/catalog/upsert', methods=['POST'])
+def catalog_upsert():
+    global recommender
+    token = os.environ.get('CATALOG_TOKEN')
+    if token:
+        if request.headers.get('X-Catalog-Token') != token:
+            return jsonify({'error': 'Invalid catalog token.'}), 403
+    elif request.remote_addr not in ('127.0.0.1', '::1'):
+        return jsonify({'error': 'Catalog updates are only allowed from localhost (or set CATALOG_TOKEN).'}), 403
+    data = request.get_json(silent=True) or {}
+    movies = data.get('movies')
+    if isinstance(movies, list) and len(movies) > MAX_UPSERT_MOVIES:
+        return jsonify({'error': f'At most {MAX_UPSERT_MOVIES} movies per request.'}), 400
+    with _catalog_lock:
+        try:
+            updated, summary = catalog.upsert(recommender, movies)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        # rewriting movies.csv and the artifact is opt-in (see catalog.py)
+        if data.get('persist'):
+            catalog.persist(updated)
+        recommender = updated
+    summary['version'] = updated.version
+    return jsonify(summary)
+
+@app.route('/autocomplete', methods=['GET'])
+def autocomplete():
+    q = request.args.get('q', '').strip()
+    try:
+        limit = max(1, min(int(request.args.get('limit') or 10), 50))
+    except ValueError:
+        return jsonify({'error': 'limit must be a number.'}), 400
+    if not q:
+        return jsonify({'query': q, 'results': []})
+    return jsonify({'query': q, 'results': recommender.autocomplete(q, limit=limit)})
 
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=5000, debug=False)
@@ -41,6 +41,8 @@ CSV
 fi
 
 # 3) Write recommender (content-based TF-IDF) - app/recommender_core.py
+#    (only when missing: a checkout already has the full app)
+if [ ! -f app/recommender_core.py ]; then
 cat > app/recommender_core.py <<'PY'
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
@@ -79,8 +81,10 @@ class Recommender:
         related_indices = cosine_similarities.argsort()[::-1][:topn]
         return self.df.iloc[related_indices][['title','genres']].drop_duplicates().head(topn)
 PY
+fi
 
 # 4) Write Flask web app - app/webapp.py
+if [ ! -f app/webapp.py ]; then
 cat > app/webapp.py <<'PY'
 from flask import Flask, render_template, request, jsonify
 from .recommender_core import Recommender
@@ -108,8 +112,10 @@ def recommend():
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=5000, debug=False)
 PY
+fi
 
 # 5) Minimal HTML template and CSS (templates/index.html + static/style.css)
+if [ ! -f templates/index.html ]; then
 cat > templates/index.html <<'HTML'
 <!doctype html>
 <html lang="en">
@@ -159,7 +165,9 @@ cat > templates/index.html <<'HTML'
 </body>
 </html>
 HTML
+fi
 
+if [ ! -f static/style.css ]; then
 cat > static/style.css <<'CSS'
 *{box-sizing:border-box;font-family:Inter,ui-sans-serif,system-ui,-apple-system,Segoe UI,Roboto,"Helvetica Neue",Arial}
 body{display:flex;min-height:100vh;align-items:center;justify-content:center;background:linear-gradient(135deg,#0f172a 0%,#0b1220 100%);color:#e6eef8;margin:0;padding:20px}
@@ -173,6 +181,7 @@ button{padding:10px 14px;border-radius:8px;border:0;background:#2563eb;color:whi
 .note{display:block;margin-top:12px;color:#8fa9d9}
 ol{padding-left:20px}
 CSS
+fi
 
 # 6) Create venv and install deps (if not present)
 if [ ! -f venv/bin/python3 ]; then
@@ -181,6 +190,9 @@ if [ ! -f venv/bin/python3 ]; then
   ./venv/bin/pip install pandas scikit-learn flask
 fi
 
-# 7) Start Flask app (background) and show instruction
+# 7) Prebuild the TF-IDF artifact (data/artifacts/) so the app starts without refitting
+./venv/bin/python3 -m app.artifacts build --prune
+
+# 8) Start Flask app (background) and show instruction
 echo "Starting Flask app at http://127.0.0.1:5000 — use Ctrl+C to stop."
-./venv/bin/python3 app/webapp.py
+./venv/bin/python3 -m app.webapp
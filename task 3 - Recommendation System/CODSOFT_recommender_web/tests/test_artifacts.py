@@ -0,0 +1,102 @@
+import json, os, sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import artifacts
+from app.recommender_core import DATA_PATH, Recommender
+
+N_MOVIES = 400
+
+
+@pytest.fixture(scope="module")
+def movies():
+    return pd.read_csv(DATA_PATH).head(N_MOVIES)
+
+
+def write_csv(movies, path):
+    movies.to_csv(path, index=False)
+    return str(path)
+
+
+def test_saved_artifact_round_trips(movies, tmp_path):
+    texts = (movies["title"] + " " + movies["genres"]).tolist()
+    vectorizer = artifacts.make_vectorizer()
+    matrix = vectorizer.fit_transform(texts).tocsr()
+    path = str(tmp_path / "abc")
+    artifacts.save(path, vectorizer, matrix, "abc" * 8)
+
+    art = artifacts.load(path)
+    assert art.csv_hash == "abc" * 8 and art.path == path
+    assert art.matrix.shape == matrix.shape
+    for name in ("data", "indices", "indptr"):
+        assert np.array_equal(getattr(art.matrix, name), getattr(matrix, name))
+    loaded = art.vectorizer()
+    assert loaded.vocabulary_ == vectorizer.vocabulary_
+    assert np.array_equal(loaded.idf_, vectorizer.idf_)
+    queries = texts[:20] + ["space adventure with robots", "romantic comedy", "zzz unknown words"]
+    assert (loaded.transform(queries) != vectorizer.transform(queries)).nnz == 0
+    # no temporary build directories are left behind
+    assert os.listdir(tmp_path) == ["abc"]
+
+
+def test_unreadable_artifacts_are_ignored(movies, tmp_path):
+    vectorizer = artifacts.make_vectorizer()
+    matrix = vectorizer.fit_transform(movies["title"])
+    path = str(tmp_path / "a")
+    assert artifacts.load(path) is None
+    artifacts.save(path, vectorizer, matrix, "a" * 64)
+    meta_path = os.path.join(path, "meta.json")
+    with open(meta_path) as f:
+        meta = json.load(f)
+    meta["format"] = artifacts.FORMAT_VERSION + 1
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    assert artifacts.load(path) is None
+    os.remove(os.path.join(path, "idf.npy"))
+    meta["format"] = artifacts.FORMAT_VERSION
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    assert artifacts.load(path) is None
+
+
+def test_a_changed_csv_gets_a_new_artifact(movies, tmp_path):
+    data = write_csv(movies, tmp_path / "movies.csv")
+    root = str(tmp_path / "artifacts")
+    built = Recommender(data_path=data, artifact_dir=root, ratings_path=None)
+    assert built.artifact_built and built.artifact.csv_hash == artifacts.file_hash(data)
+    want = built.recommend("Toy Story", 5)["title"].tolist()
+
+    loaded = Recommender(data_path=data, artifact_dir=root, ratings_path=None)
+    assert not loaded.artifact_built and loaded.artifact.path == built.artifact.path
+    assert loaded.recommend("Toy Story", 5)["title"].tolist() == want
+
+    # same number of rows, one title edited: the old artifact must not be reused
+    edited = movies.copy()
+    edited.loc[0, "title"] = "Toy Robots From Space (1995)"
+    write_csv(edited, data)
+    rebuilt = Recommender(data_path=data, artifact_dir=root, ratings_path=None)
+    assert rebuilt.artifact_built and rebuilt.artifact.path != built.artifact.path
+    assert rebuilt.artifact.csv_hash == artifacts.file_hash(data)
+    assert "robots" in rebuilt.tfidf.vocabulary_ and "robots" not in loaded.tfidf.vocabulary_
+    assert rebuilt.tfidf_matrix.shape[0] == N_MOVIES and rebuilt.titles.resolve("toy robots from space") == 0
+    assert sorted(os.listdir(root)) == sorted(os.path.basename(r.artifact.path) for r in (built, rebuilt))
+
+    assert artifacts.prune(rebuilt.artifact.path, root) == [os.path.basename(built.artifact.path)]
+    assert os.listdir(root) == [os.path.basename(rebuilt.artifact.path)]
+
+
+def test_build_command(movies, tmp_path, capsys):
+    data = write_csv(movies, tmp_path / "movies.csv")
+    root = str(tmp_path / "artifacts")
+    args = ["build", "--data", data, "--out", root, "--k", "5", "--workers", "1", "--no-collab"]
+    assert artifacts.main(args) == 0
+    assert artifacts.main(args) == 0
+    out = capsys.readouterr().out
+    assert "built top-5 neighbour index" in out and "found top-5 neighbour index" in out
+    path = artifacts.artifact_path(artifacts.file_hash(data), root)
+    assert os.path.isfile(os.path.join(path, "neighbors_ids.npy"))
@@ -0,0 +1,66 @@
+import os, sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import neighbors
+from app.recommender_core import MODES, Recommender
+
+QUERIES = [
+    "Toy Story", "toy story (1995)", "Heat", "jumanji", "Matrix", "the godfather",
+    "Toy Story",                       # duplicates are answered like the first one
+    "space adventure with robots", "romantic comedy in paris", "zzzz qqqq",
+    "Grumpier Old Men", "Tom and Huck",
+]
+
+
+@pytest.fixture(scope="module")
+def rec():
+    return Recommender(artifact_dir=None)
+
+
+def test_rows_top_k_matches_top_k_on_ties():
+    rng = np.random.default_rng(0)
+    for n_cols in (1, 2, 5, 40, 300):
+        # few distinct values: most rows have ties at and around the k-th place
+        scores = rng.integers(0, 4, size=(25, n_cols)).astype(np.float32)
+        scores[3] = 1.0                # one row tied everywhere
+        exclude = rng.integers(0, n_cols, size=25)
+        for k in (0, 1, 3, 10, n_cols - 1, n_cols, n_cols + 5):
+            got = neighbors.rows_top_k(scores, k)
+            want = [neighbors.top_k(row, k) for row in scores]
+            assert got.tolist() == [w.tolist() for w in want]
+            if n_cols > 1:
+                got = neighbors.rows_top_k(scores, k, exclude)
+                want = [neighbors.top_k(row, k, exclude=e) for row, e in zip(scores, exclude)]
+                assert got.tolist() == [w.tolist() for w in want]
+
+
+def _records(frame):
+    return frame.to_dict("records")
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("topn", [10, 60])
+def test_recommend_many_matches_recommend(rec, mode, topn):
+    got = rec.recommend_many(QUERIES, topn, mode)
+    assert len(got) == len(QUERIES)
+    for q, records in zip(QUERIES, got):
+        assert records == _records(rec.recommend(q, topn, mode)), (q, mode)
+
+
+def test_recommend_many_with_the_neighbour_index(rec):
+    rec.build_neighbors(k=20)
+    try:
+        for topn in (5, 20, 30):
+            got = rec.recommend_many(QUERIES, topn)
+            assert got == [_records(rec.recommend(q, topn)) for q in QUERIES]
+    finally:
+        rec.neighbors = None
+
+
+def test_recommend_many_rejects_unknown_modes(rec):
+    with pytest.raises(ValueError):
+        rec.recommend_many(["Heat"], 5, "nope")
@@ -0,0 +1,107 @@
+import os, sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import cache
+from app.cache import ResultCache, cache_key
+from app.recommender_core import DATA_PATH, Recommender
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    return clock
+
+
+def test_cache_key_normalises_the_query():
+    assert cache_key("  Toy   STORY ", "5", "content") == cache_key("toy story", 5, "content")
+    assert cache_key("toy story", 5, "content") != cache_key("toy story", 5, "hybrid")
+
+
+def test_hits_misses_ttl_and_lru(clock):
+    c = ResultCache(max_size=2, ttl=10)
+    assert c.get("a", "v1") is None
+    c.put("a", "v1", b"A")
+    assert c.get("a", "v1") == b"A"
+    c.put("b", "v1", b"B")
+    c.get("a", "v1")                 # "b" is now the least recently used
+    c.put("c", "v1", b"C")
+    assert c.get("b", "v1") is None and c.get("a", "v1") == b"A"
+    clock.now += 11
+    assert c.get("a", "v1") is None
+    stats = c.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"], stats["evicted"]) == (3, 3, 1, 1)
+    assert stats["size"] == 1 and stats["hit_rate"] == 0.5
+
+
+def test_a_model_swap_does_not_thrash(clock):
+    c = ResultCache()
+    c.put("q", "old", b"old answer")
+    # requests on the new model and ones still running on the old model interleave
+    for _ in range(3):
+        assert c.get("q", "new") in (None, b"new answer")
+        c.put("q", "new", b"new answer")
+        assert c.get("q", "old") == b"old answer"
+    assert c.get("q", "new") == b"new answer"
+    assert c.stats()["invalidations"] == 0 and c.stats()["version"] == "new"
+
+
+def test_a_third_version_retires_the_oldest(clock):
+    c = ResultCache()
+    for version in ("v1", "v2", "v3"):
+        c.put("q", version, version.encode())
+    assert c.stats()["invalidations"] == 1 and c.stats()["size"] == 2
+    assert c.get("q", "v2") == b"v2" and c.get("q", "v3") == b"v3"
+    # a late request on the retired model is answered but no longer cached
+    assert c.get("q", "v1") is None
+    c.put("q", "v1", b"v1")
+    assert c.get("q", "v1") is None
+    assert c.stats()["version"] == "v3" and c.stats()["size"] == 2
+
+
+@pytest.fixture(scope="module")
+def small_rec(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("cache") / "movies.csv")
+    pd.read_csv(DATA_PATH).head(300).to_csv(path, index=False)
+    return Recommender(data_path=path, artifact_dir=None, ratings_path=None)
+
+
+@pytest.fixture
+def client(small_rec, monkeypatch):
+    from app import webapp
+    monkeypatch.setattr(webapp, "recommender", small_rec)
+    monkeypatch.setattr(webapp, "results_cache", ResultCache())
+    return webapp.app.test_client()
+
+
+def test_cache_stats_endpoint(client, small_rec):
+    first = client.post("/recommend", json={"title": "Toy Story", "topn": 3}).get_json()
+    again = client.post("/recommend", json={"title": " toy  story ", "topn": 3}).get_json()
+    assert first["results"] == again["results"]
+    client.post("/recommend/batch", json={"queries": ["Toy Story", "Heat"], "topn": 3})
+    stats = client.get("/cache_stats").get_json()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 2, 2)
+    assert stats["version"] == small_rec.version
+
+    # a catalogue update swaps the model: its answers are computed afresh
+    resp = client.post("/catalog/upsert", json={"movies": [{"title": "Toy Story 5 (2030)",
+                                                            "genres": "Animation|Children|Comedy"}]})
+    assert resp.status_code == 200
+    updated = client.post("/recommend", json={"title": "Toy Story", "topn": 3}).get_json()
+    stats = client.get("/cache_stats").get_json()
+    assert stats["version"] == resp.get_json()["version"] != small_rec.version
+    assert (stats["hits"], stats["misses"], stats["size"], stats["invalidations"]) == (2, 3, 3, 0)
+    assert "Toy Story 5 (2030)" in [r["title"] for r in updated["results"]]
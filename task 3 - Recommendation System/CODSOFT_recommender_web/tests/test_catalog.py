@@ -0,0 +1,181 @@
+import os, sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import artifacts, catalog, neighbors
+from app.recommender_core import DATA_PATH, Recommender
+from app.titles import TitleIndex, _GramIndex
+
+N_MOVIES = 800
+K = 10
+
+
+@pytest.fixture(scope="module")
+def movies():
+    return pd.read_csv(DATA_PATH).head(N_MOVIES)
+
+
+@pytest.fixture
+def rec(movies, tmp_path):
+    path = str(tmp_path / "movies.csv")
+    movies.to_csv(path, index=False)
+    rec = Recommender(data_path=path, artifact_dir=None, ratings_path=None)
+    rec.build_neighbors(k=K)
+    return rec
+
+
+def assert_same_index(got, want):
+    assert got.titles == want.titles
+    assert got.forms == want.forms
+    assert got._prefix_keys == want._prefix_keys
+    for a, b in ((got._prefix_rows, want._prefix_rows), (got._lengths, want._lengths),
+                 (got._years, want._years)):
+        assert a.dtype == b.dtype and np.array_equal(a, b)
+    for part in ("_substring", "_fuzzy"):
+        for name in _GramIndex.FIELDS:
+            a, b = getattr(getattr(got, part), name), getattr(getattr(want, part), name)
+            assert a.dtype == b.dtype and np.array_equal(a, b), (part, name)
+
+
+def test_title_index_updated_equals_a_fresh_build(movies):
+    titles = movies["title"].tolist()
+    index = TitleIndex(titles)
+    changes = {
+        0: "Toy Story: Reloaded (2031)",
+        5: titles[6],                          # now a duplicate of its neighbour
+        17: "Amélie, The (2001)",
+        N_MOVIES - 1: "x",
+        N_MOVIES: "Brand New Movie (2030)",
+        N_MOVIES + 1: "Matrix Resurrections, The (2021)",
+        N_MOVIES + 2: "",
+    }
+    updated = index.updated(changes)
+    for row, title in changes.items():
+        if row < len(titles):
+            titles[row] = title
+        else:
+            titles.append(title)
+    assert_same_index(updated, TitleIndex(titles))
+    assert updated.resolve("brand new movie") == N_MOVIES
+    # the original index is left as it was
+    assert_same_index(index, TitleIndex(movies["title"].tolist()))
+    with pytest.raises(ValueError):
+        index.updated({N_MOVIES + 5: "gap"})
+
+
+def test_refresh_equals_build(movies):
+    texts = (movies["title"] + " " + movies["genres"]).tolist()
+    # fit_transform rounds a few rows differently from transform; upsert keeps
+    # the old rows as they are, so both matrices come from transform here
+    vectorizer = artifacts.make_vectorizer().fit(texts)
+    matrix = vectorizer.transform(texts).tocsr()
+    ids, scores = neighbors.build(matrix, K)
+    changed_texts = {3: texts[100], 42: "Heat Action|Crime|Thriller", 500: "Nothing like anything",
+                     N_MOVIES: texts[3], N_MOVIES + 1: "Toy Story 5 Animation|Children|Comedy"}
+    for row, text in changed_texts.items():
+        if row < len(texts):
+            texts[row] = text
+        else:
+            texts.append(text)
+    new_matrix = vectorizer.transform(texts).tocsr()
+    want_ids, want_scores = neighbors.build(new_matrix, K)
+    for chunk_rows in (neighbors.CHUNK_ROWS, 2):
+        got_ids, got_scores, refreshed = neighbors.refresh(new_matrix, ids, scores, sorted(changed_texts),
+                                                           chunk_rows=chunk_rows)
+        assert np.array_equal(got_ids, want_ids)
+        assert np.array_equal(got_scores, want_scores)
+        assert len(changed_texts) <= refreshed < len(texts)
+    # the input index is left untouched
+    assert np.array_equal(ids, neighbors.build(matrix, K)[0])
+
+
+def test_upsert_replaces_and_appends(rec, movies):
+    old_df = rec.df.copy()
+    old_matrix = rec.tfidf_matrix.copy()
+    first, second = int(movies["movieId"].iat[0]), int(movies["movieId"].iat[10])
+    new, summary = catalog.upsert(rec, [
+        {"movieId": first, "title": "Toy Story (1995)", "genres": "Animation|Comedy|Western"},
+        {"title": "Space Cowboys on Mars (2031)", "genres": "Sci-Fi|Western"},
+        {"movieId": second, "title": "Renamed Movie (1995)"},
+        {"movieId": 10 ** 7, "title": "Toy Story 5 (2030)", "genres": "Animation|Children|Comedy"},
+    ])
+    assert (summary["added"], summary["updated"], summary["catalog_size"]) == (2, 2, N_MOVIES + 2)
+
+    df = new.df
+    assert len(df) == N_MOVIES + 2
+    assert df["genres"].iat[0] == "Animation|Comedy|Western"
+    assert (df["title"].iat[10], df["genres"].iat[10]) == ("Renamed Movie (1995)", catalog.NO_GENRES)
+    assert df["movieId"].iat[N_MOVIES] == int(movies["movieId"].max()) + 1
+    assert df["movieId"].iat[N_MOVIES + 1] == 10 ** 7
+
+    # same rows as vectorising the whole catalogue with the frozen vocabulary
+    full = rec.tfidf.transform(df["text"]).toarray()
+    assert np.allclose(new.tfidf_matrix.toarray(), full)
+    want_ids, want_scores = neighbors.build(new.tfidf_matrix, K)
+    assert np.array_equal(new.neighbors[0], want_ids)
+    assert np.array_equal(new.neighbors[1], want_scores)
+    assert_same_index(new.titles, TitleIndex(df["title"].tolist()))
+    assert np.array_equal(new.doc_freq, catalog.doc_freq(new.tfidf_matrix))
+    assert new.version != rec.version
+
+    top = new.recommend("Toy Story 5", 3)["title"].tolist()
+    assert "Toy Story (1995)" in top or "Toy Story 2 (1999)" in top
+
+    # the live recommender is untouched
+    assert rec.df.equals(old_df)
+    assert (rec.tfidf_matrix != old_matrix).nnz == 0
+    assert len(rec.titles) == N_MOVIES and rec.neighbors[0].shape[0] == N_MOVIES
+
+
+def test_upsert_extends_the_dense_model(rec):
+    rec.dense_model()
+    new, _ = catalog.upsert(rec, [{"title": "Brand New Space Movie (2030)", "genres": "Sci-Fi"}])
+    model = new.dense_model()
+    assert model.embeddings.shape[0] == N_MOVIES + 1
+    assert rec.dense_model().embeddings.shape[0] == N_MOVIES
+    assert np.array_equal(model.index.labels(N_MOVIES + 1)[:N_MOVIES], rec.dense_model().index.labels(N_MOVIES))
+    assert len(new.recommend("Brand New Space Movie", 5, "dense")) == 5
+
+
+def test_upsert_rejects_malformed_movies(rec):
+    for movies in ([], [{"genres": "Drama"}], [{"title": "x", "movieId": "abc"}], ["x"]):
+        with pytest.raises(ValueError):
+            catalog.upsert(rec, movies)
+
+
+def test_persist_keeps_a_single_artifact(movies, tmp_path):
+    data_path = str(tmp_path / "movies.csv")
+    root = str(tmp_path / "artifacts")
+    movies.to_csv(data_path, index=False)
+    rec = Recommender(data_path=data_path, artifact_dir=root, ratings_path=None)
+    rec.build_neighbors(k=K)
+    for title in ("Space Cowboys on Mars (2031)", "Toy Story 5 (2030)"):
+        rec, _ = catalog.upsert(rec, [{"title": title, "genres": "Sci-Fi|Western"}])
+        path = catalog.persist(rec)
+        assert os.listdir(root) == [os.path.basename(path)]
+        assert rec.artifact.path == path and rec.neighbors is not None
+    assert len(pd.read_csv(data_path)) == N_MOVIES + 2
+    # a restart loads the persisted catalogue without refitting
+    restarted = Recommender(data_path=data_path, artifact_dir=root, ratings_path=None)
+    assert not restarted.artifact_built and len(restarted.titles) == N_MOVIES + 2
+
+
+def test_persist_reuses_an_existing_artifact(rec, tmp_path):
+    root = str(tmp_path / "artifacts")
+    rec.artifact_dir = root
+    movie = [{"title": "Space Cowboys on Mars (2031)", "genres": "Sci-Fi|Western"}]
+    first, _ = catalog.upsert(rec, movie)
+    path = catalog.persist(first)
+    # the same catalogue again: its artifact is already on disk
+    second, _ = catalog.upsert(rec, movie)
+    assert catalog.persist(second) == path
+    assert second.artifact is not None and second.artifact.path == path
+    assert (second.tfidf_matrix != first.tfidf_matrix).nnz == 0
+    assert np.array_equal(second.neighbors[0], first.neighbors[0])
+    assert second.recommend("Space Cowboys on Mars", 3)["title"].tolist()
+    assert os.listdir(root) == [os.path.basename(path)]
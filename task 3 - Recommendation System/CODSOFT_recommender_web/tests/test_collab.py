@@ -0,0 +1,126 @@
+import io, os, sys, zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import collab
+from app.recommender_core import Recommender
+
+MOVIES = [
+    (10, "Space Battle (1990)", "Action|Sci-Fi"),
+    (20, "Space Battle 2 (1992)", "Action|Sci-Fi"),
+    (30, "Robot Planet (1994)", "Sci-Fi"),
+    (40, "Paris Love (1991)", "Romance"),
+    (50, "Paris Love Again (1993)", "Romance"),
+    (60, "Little Known Love (1995)", "Romance"),     # too few ratings
+    (70, "Unrated Space Battle (2030)", "Action|Sci-Fi"),   # no ratings at all
+    (80, "Funny Business (1996)", "Comedy"),
+]
+MOVIE_IDS = [m for m, _, _ in MOVIES]
+
+
+def ratings_frame():
+    rng = np.random.default_rng(0)
+    rows = []
+    for user in range(1, 41):
+        scifi_fan = user % 2 == 0
+        for movie in (10, 20, 30):
+            rows.append((user, movie, 5.0 if scifi_fan else 1.5))
+        for movie in (40, 50):
+            rows.append((user, movie, 1.0 if scifi_fan else 4.5))
+        rows.append((user, 80, float(rng.integers(2, 5))))
+        rows.append((user, 999, 3.0))               # not in the catalogue
+    rows += [(1, 60, 4.0), (3, 60, 5.0), (5, 60, 4.5)]
+    return pd.DataFrame(rows, columns=["userId", "movieId", "rating"]).assign(timestamp=0)
+
+
+@pytest.fixture(scope="module")
+def ratings_zip(tmp_path_factory):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("ml-latest-small/movies.csv", "movieId,title,genres\n")
+        zf.writestr("ml-latest-small/ratings.csv", ratings_frame().to_csv(index=False))
+    path = tmp_path_factory.mktemp("collab") / "ml-test.zip"
+    path.write_bytes(buf.getvalue())
+    return str(path)
+
+
+def test_ratings_are_streamed_into_catalogue_columns(ratings_zip, tmp_path):
+    frame = ratings_frame()
+    matrix = collab.load_ratings(ratings_zip, MOVIE_IDS, chunk_rows=7)
+    assert matrix.dtype == np.float32 and matrix.shape == (40, len(MOVIES))
+    assert matrix.nnz == len(frame) - 40              # the unknown movie is dropped
+    assert np.array_equal(np.diff(matrix.tocsc().indptr), [40, 40, 40, 40, 40, 3, 0, 40])
+    assert matrix[1, 0] == 5.0 and matrix[0, 3] == 4.5 and matrix[2, 5] == 5.0
+
+    # chunk size, a plain ratings.csv and the column order don't change the data
+    csv_path = tmp_path / "ratings.csv"
+    frame.to_csv(csv_path, index=False)
+    assert (collab.load_ratings(str(csv_path), MOVIE_IDS) != matrix).nnz == 0
+    shuffled = MOVIE_IDS[::-1]
+    reordered = collab.load_ratings(ratings_zip, shuffled)
+    assert (reordered[:, ::-1] != matrix).nnz == 0
+
+    with zipfile.ZipFile(ratings_zip) as zf:
+        assert collab.ratings_member(zf) == "ml-latest-small/ratings.csv"
+
+
+def test_center_users(ratings_zip):
+    matrix = collab.load_ratings(ratings_zip, MOVIE_IDS)
+    centered = collab.center_users(matrix)
+    assert centered.shape == matrix.shape
+    dense, counts = matrix.toarray(), np.diff(matrix.indptr)
+    want = np.where(dense != 0, dense - dense.sum(axis=1, keepdims=True) / counts[:, None], 0)
+    assert np.allclose(centered.toarray(), want, atol=1e-6)
+    # the input is left as it was
+    assert np.array_equal(matrix.toarray(), dense)
+
+
+def test_item_embeddings(ratings_zip):
+    matrix = collab.load_ratings(ratings_zip, MOVIE_IDS)
+    emb = collab.item_embeddings(matrix, factors=64)
+    # k is capped by the matrix size
+    assert emb.dtype == np.float32 and emb.shape == (len(MOVIES), len(MOVIES) - 1)
+    norms = np.linalg.norm(emb, axis=1)
+    assert np.allclose(norms[[0, 1, 2, 3, 4, 7]], 1.0, atol=1e-5)
+    assert norms[5] == 0 and norms[6] == 0            # below MIN_RATINGS / unrated
+    assert collab.item_embeddings(matrix, factors=3).shape == (len(MOVIES), 3)
+
+    model = collab.CollabModel(emb)
+    assert model.has_signal.tolist() == [True] * 5 + [False, False, True]
+    scores = model.scores(0)
+    assert scores[1] > 0.9 and scores[3] < -0.9
+    assert model.scores(np.array([0, 3])).shape == (2, len(MOVIES))
+
+
+def test_blend_keeps_content_scores_without_ratings(ratings_zip):
+    model = collab.CollabModel.build(ratings_zip, MOVIE_IDS, factors=4)
+    assert model.n_ratings == 40 * 6 + 3
+    content = np.linspace(0.1, 0.8, len(MOVIES))
+    # a rated title: rated movies are mixed, unrated ones keep their content score
+    mixed = model.blend(0, content)
+    rated = model.has_signal
+    assert np.allclose(mixed[rated], 0.5 * model.scores(0)[rated] + 0.5 * content[rated])
+    assert np.array_equal(mixed[~rated], content[~rated])
+    # a title without ratings: pure content
+    assert np.array_equal(model.blend(6, content), content)
+    rows = model.blend(np.array([0, 6]), np.vstack([content, content]))
+    assert np.allclose(rows[0], mixed) and np.array_equal(rows[1], content)
+
+
+def test_hybrid_recommendations(ratings_zip, tmp_path):
+    path = str(tmp_path / "movies.csv")
+    pd.DataFrame(MOVIES, columns=["movieId", "title", "genres"]).to_csv(path, index=False)
+    rec = Recommender(data_path=path, artifact_dir=None, ratings_path=ratings_zip)
+    # an unrated title is answered by content in every mode
+    content = rec.recommend("Unrated Space Battle", 4, "content")["title"].tolist()
+    assert rec.recommend("Unrated Space Battle", 4, "hybrid")["title"].tolist() == content
+    assert rec.recommend("Unrated Space Battle", 4, "collab")["title"].tolist() == content
+    # a rated one: its fans' other favourites come first
+    top = rec.recommend("Space Battle", 2, "collab")["title"].tolist()
+    assert set(top) == {"Space Battle 2 (1992)", "Robot Planet (1994)"}
+    assert "Unrated Space Battle (2030)" not in rec.recommend("Space Battle", 5, "collab")["title"].tolist()
@@ -0,0 +1,49 @@
+import os, sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import dense
+from app.recommender_core import Recommender
+
+
+def _clustered(n, dim, lists, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = dense.normalize_rows(rng.normal(size=(lists, dim)))
+    return dense.normalize_rows(centers[rng.integers(0, lists, n)] + 0.3 * rng.normal(size=(n, dim)))
+
+
+def test_search_fills_k_from_more_lists_when_the_probed_ones_are_small():
+    vectors = _clustered(600, 16, 30)
+    index = dense.IVFIndex.build(vectors, n_lists=30)
+    model = dense.DenseModel(vectors, np.eye(16, dtype=np.float32), index)
+    sizes = np.diff(index.offsets)
+    for row in (0, 17, 599):
+        q = vectors[row]
+        for k in (5, int(sizes.max()) + 1, 300, 599, 1000):
+            found = model.search(q, k, nprobe=1, exclude=row)
+            assert len(found) == min(k, 599)
+            assert row not in found and len(set(found.tolist())) == len(found)
+        # with every row as a candidate the result is the exact one
+        assert model.search(q, 599, nprobe=1, exclude=row).tolist() == model.exact(q, 599, exclude=row).tolist()
+
+
+def test_candidates_probe_nprobe_lists_when_they_are_big_enough():
+    vectors = _clustered(400, 8, 10, seed=1)
+    index = dense.IVFIndex.build(vectors, n_lists=10)
+    q = vectors[0]
+    assert index.candidates(q, 2, min_count=1).tolist() == index.candidates(q, 2).tolist()
+    assert len(index.candidates(q, 1, min_count=400)) == 400
+
+
+@pytest.fixture(scope="module")
+def rec():
+    return Recommender(artifact_dir=None)
+
+
+def test_dense_mode_returns_topn_results(rec):
+    for topn in (10, 2000, 5000):
+        assert len(rec.recommend("Toy Story", topn, "dense")) == topn
+        assert len(rec.recommend_many(["Toy Story"], topn, "dense")[0]) == topn
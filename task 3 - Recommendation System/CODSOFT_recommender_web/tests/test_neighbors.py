@@ -0,0 +1,98 @@
+import os, sys
+
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse as sp
+from sklearn.metrics.pairwise import linear_kernel
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import artifacts, neighbors
+from app.recommender_core import DATA_PATH, Recommender
+
+N_MOVIES = 300
+K = 12
+
+
+@pytest.fixture(scope="module")
+def matrix():
+    movies = pd.read_csv(DATA_PATH).head(N_MOVIES)
+    texts = (movies["title"] + " " + movies["genres"]).tolist()
+    # exact duplicates: self-exclusion and tie order both matter for these rows
+    texts[10] = texts[11] = texts[12] = "Heat Action|Crime|Thriller"
+    return artifacts.make_vectorizer().fit_transform(texts).tocsr()
+
+
+def live(matrix, row, k):
+    """The query-time path: one linear_kernel row, then top_k without the row itself."""
+    sims = linear_kernel(matrix[row:row + 1], matrix).flatten()
+    return neighbors.top_k(sims, k, exclude=row), sims
+
+
+def test_index_equals_the_live_path(matrix):
+    ids, scores = neighbors.build(matrix, K)
+    assert ids.dtype == np.int32 and scores.dtype == np.float32
+    assert ids.shape == scores.shape == (N_MOVIES, K)
+    for row in range(N_MOVIES):
+        want, sims = live(matrix, row, K)
+        assert ids[row].tolist() == want.tolist(), row
+        assert np.array_equal(scores[row], sims[want].astype(np.float32))
+        assert row not in ids[row]
+    # the duplicates list each other first, lower row first
+    assert ids[10, :2].tolist() == [11, 12] and ids[12, :2].tolist() == [10, 11]
+    assert scores[10, 0] == pytest.approx(1.0)
+
+
+def test_ties_are_ordered_by_row():
+    # rows 0-4 identical, 5-7 identical to each other and half-similar to 0-4
+    dense = np.array([[1.0, 0.0]] * 5 + [[1.0, 1.0]] * 3 + [[0.0, 1.0]])
+    matrix = sp.csr_matrix(dense / np.linalg.norm(dense, axis=1, keepdims=True))
+    for k in (1, 3, 6, 8, 20):
+        ids, _ = neighbors.build(matrix, k)
+        for row in range(matrix.shape[0]):
+            assert ids[row].tolist() == live(matrix, row, k)[0].tolist()
+    ids, _ = neighbors.build(matrix, 6)
+    assert ids[2].tolist() == [0, 1, 3, 4, 5, 6]
+    assert ids[6].tolist() == [5, 7, 0, 1, 2, 3]
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, N_MOVIES])
+def test_chunk_size_does_not_change_the_index(matrix, chunk_rows):
+    want_ids, want_scores = neighbors.build(matrix, K)
+    ids, scores = neighbors.build(matrix, K, chunk_rows=chunk_rows)
+    assert np.array_equal(ids, want_ids) and np.array_equal(scores, want_scores)
+
+
+def test_workers_give_the_same_index(matrix, tmp_path):
+    vectorizer = artifacts.make_vectorizer().fit(["placeholder text"])
+    path = str(tmp_path / "art")
+    artifacts.save(path, vectorizer, matrix, "0" * 64)
+    mapped = artifacts.load(path).matrix
+    want_ids, want_scores = neighbors.build(matrix, K)
+    ids, scores = neighbors.build(mapped, K, chunk_rows=40, workers=2, artifact_path=path)
+    assert np.array_equal(ids, want_ids) and np.array_equal(scores, want_scores)
+
+    neighbors.save(path, ids, scores, matrix.shape)
+    loaded_ids, loaded_scores = neighbors.load(path, matrix.shape)
+    assert np.array_equal(loaded_ids, ids) and np.array_equal(loaded_scores, scores)
+    # an index built for another catalogue size is not used
+    assert neighbors.load(path, (N_MOVIES + 1, matrix.shape[1])) is None
+
+
+def test_k_is_capped_by_the_catalogue():
+    matrix = sp.csr_matrix(np.eye(4))
+    ids, scores = neighbors.build(matrix, 10)
+    assert ids.shape == (4, 3)
+    assert ids[0].tolist() == [1, 2, 3] and not scores.any()
+
+
+def test_recommend_reads_the_index_like_the_live_path(tmp_path):
+    path = str(tmp_path / "movies.csv")
+    pd.read_csv(DATA_PATH).head(N_MOVIES).to_csv(path, index=False)
+    rec = Recommender(data_path=path, artifact_dir=None, ratings_path=None)
+    titles = rec.df["title"].tolist()[:60]
+    want = [rec.recommend(t, 8)["title"].tolist() for t in titles]
+    rec.build_neighbors(k=K)
+    assert [rec.recommend(t, 8)["title"].tolist() for t in titles] == want
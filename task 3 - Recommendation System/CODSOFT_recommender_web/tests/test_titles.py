@@ -0,0 +1,127 @@
+import os, sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import titles
+from app.recommender_core import Recommender
+from app.titles import EXACT, FUZZY, PREFIX, SUBSTRING, TitleIndex
+
+MOVIES = [
+    ("Star Wars: The Last Jedi (2017)", "Action|Adventure|Sci-Fi"),
+    ("Star Wars: Episode IV - A New Hope (1977)", "Action|Adventure|Sci-Fi"),
+    ("Star Wars: Episode V - The Empire Strikes Back (1980)", "Action|Adventure|Sci-Fi"),
+    ("Starman (1984)", "Adventure|Drama|Romance|Sci-Fi"),
+    ("Lone Star (1996)", "Drama|Mystery|Western"),
+    ("Romance (1999)", "Drama|Romance"),
+    ("Sleepless in Seattle (1993)", "Comedy|Drama|Romance"),
+    ("When Harry Met Sally... (1989)", "Comedy|Romance"),
+    ("Notting Hill (1999)", "Comedy|Romance"),
+    ("Matrix, The (1999)", "Action|Sci-Fi|Thriller"),
+    ("Hamlet (1996)", "Crime|Drama|Romance"),
+    ("Hamlet (1990)", "Drama"),
+    ("Hamlet", "Drama"),
+    ("Toy Story (1995)", "Adventure|Animation|Children|Comedy|Fantasy"),
+    ("Toy Story 2 (1999)", "Adventure|Animation|Children|Comedy|Fantasy"),
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return TitleIndex([t for t, _ in MOVIES])
+
+
+def names(index, rows):
+    return [index.titles[r] for r in rows]
+
+
+def test_title_year():
+    assert titles.title_year("Matrix, The (1999)") == 1999
+    assert titles.title_year("Babylon 5 (1994-1998)") == 1994
+    assert titles.title_year("Hamlet") == titles.NO_YEAR
+
+
+def test_search_ranks_kinds_then_year(index):
+    hits = index.search("star", limit=10)
+    assert [kind for _, kind, _ in hits] == [PREFIX] * 4 + [SUBSTRING]
+    # the original before its sequels, however long its title
+    assert names(index, [r for r, _, _ in hits]) == [
+        "Star Wars: Episode IV - A New Hope (1977)",
+        "Star Wars: Episode V - The Empire Strikes Back (1980)",
+        "Starman (1984)",
+        "Star Wars: The Last Jedi (2017)",
+        "Lone Star (1996)",
+    ]
+    # same year: the shorter title first
+    assert names(index, index.match_prefix("toy story")) == ["Toy Story (1995)", "Toy Story 2 (1999)"]
+    # titles without a year come after dated ones
+    assert names(index, index.match_exact("hamlet")) == ["Hamlet (1990)", "Hamlet (1996)", "Hamlet"]
+    hits = index.search("the matrx", limit=3)
+    assert hits[0][:2] == (MOVIES.index(("Matrix, The (1999)", "Action|Sci-Fi|Thriller")), FUZZY)
+    assert 0.5 <= hits[0][2] < 1
+    assert index.search("matrix, the (1999)", limit=1)[0][1] == EXACT
+
+
+def test_resolve_takes_only_close_fuzzy_matches(index):
+    assert names(index, [index.resolve("star wars")]) == ["Star Wars: Episode IV - A New Hope (1977)"]
+    assert names(index, [index.resolve("the matrx")]) == ["Matrix, The (1999)"]
+    assert names(index, [index.resolve("toy stroy")]) == ["Toy Story (1995)"]
+    assert index.resolve("toy stroy", fuzzy=False) is None
+    # free text that merely contains a title: search() still offers it ...
+    assert index.search("comedy romance", limit=1)[0][0] == index.titles.index("Romance (1999)")
+    # ... but resolve() leaves it to the TF-IDF search
+    assert index.resolve("comedy romance") is None
+    assert index.resolve("romance comedy") is None
+
+
+def test_saved_index_without_years_is_rebuilt(index, tmp_path):
+    path = str(tmp_path / "titles.npz")
+    index.save(path)
+    loaded = TitleIndex.load(path, index.titles)
+    assert loaded.search("star", limit=10) == index.search("star", limit=10)
+    # an index saved before years were stored
+    with np.load(path) as data:
+        arrays = {k: data[k] for k in data.files if k != "years"}
+    np.savez(path, **arrays)
+    assert TitleIndex.load(path, index.titles) is None
+
+
+@pytest.fixture(scope="module")
+def small_rec(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("titles") / "movies.csv")
+    pd.DataFrame([{"movieId": i + 1, "title": t, "genres": g} for i, (t, g) in enumerate(MOVIES)]).to_csv(
+        path, index=False)
+    return Recommender(data_path=path, artifact_dir=None, ratings_path=None)
+
+
+def test_free_text_query_reaches_tfidf(small_rec):
+    got = small_rec.recommend("comedy romance", 3)["title"].tolist()
+    # resolved to "Romance (1999)", the query would exclude that movie and list its neighbours
+    assert "Romance (1999)" in got
+    assert set(got[:2]) <= {"Sleepless in Seattle (1993)", "When Harry Met Sally... (1989)", "Notting Hill (1999)"}
+
+
+@pytest.fixture
+def client(small_rec, monkeypatch):
+    from app import webapp
+    monkeypatch.setattr(webapp, "recommender", small_rec)
+    return webapp.app.test_client()
+
+
+def test_autocomplete_endpoint(client):
+    data = client.get("/autocomplete?q=Star&limit=2").get_json()
+    assert data["query"] == "Star"
+    assert [(r["title"], r["match"], r["score"]) for r in data["results"]] == [
+        ("Star Wars: Episode IV - A New Hope (1977)", PREFIX, 1.0),
+        ("Star Wars: Episode V - The Empire Strikes Back (1980)", PREFIX, 1.0),
+    ]
+    assert data["results"][0]["genres"] == "Action|Adventure|Sci-Fi"
+    fuzzy = client.get("/autocomplete?q=notting hil").get_json()["results"]
+    assert fuzzy[0]["title"] == "Notting Hill (1999)"
+    assert client.get("/autocomplete?q=toy&limit=500").get_json()["results"][0]["title"] == "Toy Story (1995)"
+    assert client.get("/autocomplete?q=%20").get_json() == {"query": "", "results": []}
+    assert client.get("/autocomplete?q=toy&limit=many").status_code == 400
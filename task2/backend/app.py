@@ -1,11 +1,19 @@
 # backend/app.py
 import os
-import math
+import sys
+import time
 import random
 from flask import Flask, request, jsonify, send_from_directory, abort
 from flask_cors import CORS
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# shared modules (engine.py, solved_table.py) live in the project root, next to the CLI
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+import engine
+import search
+import solved_table
+from sessions import GameSessions
+
 # frontend is a sibling directory to backend
 FRONTEND_DIR = os.path.abspath(os.path.join(BASE_DIR, '..', 'frontend'))
 
@@ -20,83 +28,230 @@ app = Flask(__name__,
             static_url_path='')  # serve frontend at root
 CORS(app)
 
-EMPTY = " "
+EMPTY = engine.EMPTY
+
+# bigger boards (size x size, k in a row) go through search.py under a time budget
+MAX_SIZE = 19
+DEFAULT_BUDGET_MS = 200
+MAX_BUDGET_MS = 5000
+
+# /api/moves: items per request, and the search time shared by all of them
+MAX_BATCH_ITEMS = 1000
+MAX_BATCH_BUDGET_MS = 10000
+
+# server-side games that keep their search tables between moves
+SESSION_TTL_SECONDS = 900
+MAX_SESSIONS = 1000
+sessions = GameSessions(ttl=SESSION_TTL_SECONDS, max_size=MAX_SESSIONS)
 
+# list-board helpers kept for the JSON contract; the work happens on bitboards in engine.py
 def available_moves(board):
-    return [i for i, v in enumerate(board) if v == EMPTY]
-
-def check_winner(board):
-    lines = [(0,1,2),(3,4,5),(6,7,8),(0,3,6),(1,4,7),(2,5,8),(0,4,8),(2,4,6)]
-    for a,b,c in lines:
-        if board[a] != EMPTY and board[a] == board[b] == board[c]:
-            return board[a]
-    return None
-
-def is_full(board):
-    return all(c != EMPTY for c in board)
-
-def score_for(w, ai, depth):
-    if not w:
-        return 0
-    return (10 - depth) if w == ai else (depth - 10)
-
-def minimax(board, depth, maximizing, ai, human, alpha, beta):
-    winner = check_winner(board)
-    if winner or is_full(board):
-        return score_for(winner, ai, depth), None
-
-    best_move = None
-    if maximizing:
-        best_score = -math.inf
-        for m in available_moves(board):
-            board[m] = ai
-            sc, _ = minimax(board, depth+1, False, ai, human, alpha, beta)
-            board[m] = EMPTY
-            if sc > best_score:
-                best_score = sc
-                best_move = m
-            alpha = max(alpha, sc)
-            if beta <= alpha:
-                break
-        return best_score, best_move
-    else:
-        best_score = math.inf
-        for m in available_moves(board):
-            board[m] = human
-            sc, _ = minimax(board, depth+1, True, ai, human, alpha, beta)
-            board[m] = EMPTY
-            if sc < best_score:
-                best_score = sc
-                best_move = m
-            beta = min(beta, sc)
-            if beta <= alpha:
-                break
-        return best_score, best_move
+    return engine.free_cells(engine.occupied(board))
 
 def ai_move(board, ai, human):
-    # quick center preference
-    try:
-        if board[4] == EMPTY:
-            return 4
-    except Exception:
-        pass
+    # O(1) answer from the precomputed table; among equally good moves prefer
+    # the center (a bare "center if free" shortcut could throw away a win)
+    moves = solved_table.optimal_moves(board, ai, human)
+    if moves:
+        return 4 if 4 in moves else moves[0]
 
-    score, move = minimax(board, 0, True, ai, human, -math.inf, math.inf)
+    # positions the table does not cover (odd symbols, impossible move counts)
+    me, opp, other = engine.from_list(board, ai, human)
+    score, move = engine.best_move(me, opp, other)
     if move is None:
         av = available_moves(board)
         return random.choice(av) if av else None
     return move
 
+def _int_param(data, name, default):
+    value = data.get(name, default)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(name)
+    return value
+
+def _game_params(data, size=3, k=None):
+    size = _int_param(data, 'size', size)
+    k = _int_param(data, 'k', min(size, 4) if k is None else k)
+    if not 3 <= size <= MAX_SIZE:
+        raise ValueError('size')
+    if not 3 <= k <= size:
+        raise ValueError('k')
+    return size, k
+
+def _move_params(data):
+    """
+    Validate one move request. Raises ValueError (-> 400) for bad fields and
+    LookupError (-> 404) for an unknown or expired session_id.
+    """
+    session = None
+    session_id = data.get('session_id')
+    if session_id is not None:
+        session = sessions.get(session_id) if isinstance(session_id, str) else None
+        if session is None:
+            raise LookupError('unknown session')
+        size, k = _game_params(data, session.size, session.k)
+        if (size, k) != (session.size, session.k):
+            raise ValueError('size/k for this session')
+    else:
+        size, k = _game_params(data)
+    board = data.get('board')
+    if not isinstance(board, list) or len(board) != size * size:
+        raise ValueError('board')
+    budget_ms = _int_param(data, 'budget_ms', DEFAULT_BUDGET_MS)
+    return {'board': board, 'ai': data.get('ai'), 'human': data.get('human'),
+            'size': size, 'k': k, 'budget_ms': max(1, min(budget_ms, MAX_BUDGET_MS)),
+            'session': session}
+
+def _needs_search(p):
+    return not (p['size'] == 3 and p['k'] == 3)
+
+def _play(p, searcher=None, with_stats=False, quick=False):
+    """
+    (move, stats or None) for validated params; 3x3 k=3 uses the table, the rest
+    search.py. quick=True answers bigger boards without searching (search.quick_move).
+    """
+    board, ai, human = p['board'], p['ai'], p['human']
+    started = time.perf_counter()
+    if not _needs_search(p):
+        move = ai_move(board, ai, human)
+        stats = None
+    elif quick:
+        move, stats = search.quick_move(board, ai, human, p['size'], p['k'])
+    else:
+        move, stats = search.choose_move(board, ai, human, p['size'], p['k'], p['budget_ms'], searcher)
+    if not with_stats:
+        return move, None
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+    if stats is None:
+        # 3x3 is answered from the solved table (or, off-table, by the exhaustive engine search)
+        table = solved_table.optimal_moves(board, ai, human) is not None
+        stats = {'source': 'table' if table else 'engine', 'depth': 0 if table else None,
+                 'nodes': 0 if table else None, 'tt_hits': 1 if table else 0}
+    else:
+        stats = dict(stats, source='quick' if quick else 'search')
+    stats['elapsed_ms'] = elapsed_ms
+    return move, stats
+
+def _play_in_session(p, with_stats=False, quick=False):
+    session = p['session']
+    with session.lock:
+        move, stats = _play(p, session.searcher, with_stats, quick)
+        session.moves += 1
+    return move, stats
+
+def _result(move, stats):
+    return {'move': move} if stats is None else {'move': move, 'stats': stats}
+
 @app.route('/api/move', methods=['POST'])
 def api_move():
     data = request.get_json() or {}
-    board = data.get('board')
-    ai = data.get('ai')
-    human = data.get('human')
-    if not isinstance(board, list) or len(board) != 9:
-        return jsonify({'error': 'invalid board'}), 400
-    move = ai_move(board, ai, human)
-    return jsonify({'move': move})
+    try:
+        p = _move_params(data)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': f'invalid {e}'}), 400
+    with_stats = bool(data.get('stats'))
+    if p['session'] is not None:
+        move, stats = _play_in_session(p, with_stats)
+    else:
+        move, stats = _play(p, with_stats=with_stats)
+    return jsonify(_result(move, stats))
+
+@app.route('/api/moves', methods=['POST'])
+def api_moves():
+    """
+    Many move requests in one round trip: {"items": [<move request>, ...]}.
+    Identical positions outside sessions are searched once; boards of the same
+    size/k share one Searcher for the batch. Session items run in order
+    against their session. The wall-clock search time of the whole batch is
+    capped at MAX_BATCH_BUDGET_MS: each search gets at most an even share of
+    what is left, and once the cap is spent the remaining positions get a
+    quick move (search.quick_move) instead of a search.
+    """
+    data = request.get_json() or {}
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'invalid items'}), 400
+    if len(items) > MAX_BATCH_ITEMS:
+        return jsonify({'error': f'too many items (max {MAX_BATCH_ITEMS})'}), 400
+    with_stats = bool(data.get('stats'))
+
+    results = [None] * len(items)
+    parsed = []       # (index, params)
+    for i, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError('item')
+            parsed.append((i, _move_params(item)))
+        except LookupError as e:
+            results[i] = {'error': str(e)}
+        except ValueError as e:
+            results[i] = {'error': f'invalid {e}'}
+
+    # dedupe positions that don't belong to a session
+    unique = {}       # key -> [params, [indices]]
+    ordered = []      # session items and first occurrences, in request order
+    for i, p in parsed:
+        if p['session'] is not None:
+            ordered.append((None, p, [i]))
+            continue
+        try:
+            key = (tuple(p['board']), p['ai'], p['human'], p['size'], p['k'])
+            hash(key)
+        except TypeError:
+            key = ('unhashable', i)
+        entry = unique.get(key)
+        if entry is None:
+            entry = unique[key] = [p, [i]]
+            ordered.append((key, p, entry[1]))
+        else:
+            entry[1].append(i)
+
+    pending = sum(1 for _, p, _ in ordered if _needs_search(p))
+    deadline = time.perf_counter() + MAX_BATCH_BUDGET_MS / 1000.0
+    searchers = {}
+    for key, p, indices in ordered:
+        quick = False
+        if _needs_search(p):
+            # searches stop a little past their budget, so track the real time left
+            left_ms = (deadline - time.perf_counter()) * 1000
+            quick = left_ms <= 0
+            p['budget_ms'] = max(1, min(p['budget_ms'], int(left_ms / pending)))
+            pending -= 1
+        if p['session'] is not None:
+            move, stats = _play_in_session(p, with_stats, quick)
+        else:
+            # a shared table is only valid between boards with the same blocked cells
+            marks = (engine.EMPTY, p['ai'], p['human'])
+            blocked = tuple(j for j, v in enumerate(p['board']) if v not in marks)
+            skey = (p['size'], p['k'], blocked)
+            searcher = searchers.get(skey)
+            if searcher is None:
+                searcher = searchers[skey] = search.Searcher(search.get_game(p['size'], p['k']))
+            move, stats = _play(p, searcher, with_stats, quick)
+        for i in indices:
+            results[i] = _result(move, stats)
+    return jsonify({'results': results, 'unique': len(ordered)})
+
+@app.route('/api/session', methods=['POST'])
+def api_session_create():
+    data = request.get_json(silent=True) or {}
+    try:
+        size, k = _game_params(data)
+    except ValueError as e:
+        return jsonify({'error': f'invalid {e}'}), 400
+    session = sessions.create(size, k)
+    return jsonify({'session_id': session.id, 'size': size, 'k': k,
+                    'ttl_seconds': sessions.ttl})
+
+@app.route('/api/session/<session_id>', methods=['DELETE'])
+def api_session_delete(session_id):
+    return jsonify({'deleted': sessions.delete(session_id)})
+
+@app.route('/api/session_stats')
+def api_session_stats():
+    return jsonify(sessions.stats())
 
 @app.route('/')
 def index():
@@ -0,0 +1,88 @@
+# backend/sessions.py - server-side game sessions for /api/move and /api/moves
+"""
+A session pins one game (size, k) to its own search.Searcher. The
+transposition table, history and killer moves then carry over from one move
+to the next instead of being rebuilt per request. Search keys are taken from
+the side to move's point of view, so entries stored while thinking about
+earlier moves are valid for the later positions.
+
+Sessions expire `ttl` seconds after their last use and at most `max_size` are
+kept; when full, the least recently used one is evicted. Each session's TT is
+capped at `tt_limit` entries so many open games can't exhaust memory.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import search
+
+
+class GameSession:
+    __slots__ = ("id", "size", "k", "searcher", "lock", "moves", "last_used")
+
+    def __init__(self, size, k, tt_limit):
+        self.id = uuid.uuid4().hex
+        self.size, self.k = size, k
+        self.searcher = search.Searcher(search.get_game(size, k), tt_limit)
+        self.lock = threading.Lock()   # a Searcher is not thread-safe
+        self.moves = 0
+        self.last_used = time.monotonic()
+
+
+class GameSessions:
+    def __init__(self, ttl=900, max_size=1000, tt_limit=200_000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.tt_limit = tt_limit
+        self._items = OrderedDict()    # least recently used first
+        self._lock = threading.Lock()
+        self.created = self.expired = self.evicted = 0
+
+    def create(self, size, k):
+        session = GameSession(size, k, self.tt_limit)
+        with self._lock:
+            self._sweep(session.last_used)
+            while len(self._items) >= self.max_size:
+                self._items.popitem(last=False)
+                self.evicted += 1
+            self._items[session.id] = session
+            self.created += 1
+        return session
+
+    def get(self, session_id):
+        """The live session for session_id (refreshing its TTL), or None."""
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            session = self._items.get(session_id)
+            if session is not None:
+                session.last_used = now
+                self._items.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id):
+        with self._lock:
+            return self._items.pop(session_id, None) is not None
+
+    def _sweep(self, now):
+        # the front is always the least recently used entry, so stop at the first live one
+        while self._items:
+            session = next(iter(self._items.values()))
+            if now - session.last_used < self.ttl:
+                break
+            self._items.popitem(last=False)
+            self.expired += 1
+
+    def stats(self):
+        with self._lock:
+            self._sweep(time.monotonic())
+            return {
+                "active": len(self._items),
+                "created": self.created,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "ttl_seconds": self.ttl,
+                "max_size": self.max_size,
+                "tt_entries": sum(len(s.searcher.tt) for s in self._items.values()),
+            }
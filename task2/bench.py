@@ -0,0 +1,253 @@
+# bench.py - correctness sweep and speed benchmark for the tic-tac-toe AI
+"""
+Two parts:
+
+- sweep: every reachable 3x3 position with a move to make. The move picked
+  by the backend (table), the engine search and the N x N searcher is
+  checked against an independent reference solver. A move counts as optimal
+  when it keeps the game-theoretic result (win/draw/loss). Latency
+  percentiles are reported per path.
+- selfplay: AI-vs-AI games on larger boards through search.py, reporting
+  nodes/sec, cutoff rate (beta cutoffs per node), depth reached, TT hits and
+  per-move latency percentiles.
+
+Usage:
+    python bench.py                       # sweep + default self-play boards
+    python bench.py --boards 7x4 9x5 --budget-ms 100 --games 3
+    python bench.py --skip-sweep --json
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+import engine
+import search
+
+EMPTY = engine.EMPTY
+DEFAULT_BOARDS = ("5x4", "7x4", "9x5")
+
+
+# reference solver: plain list-board minimax, memoized, no bitboards
+
+_LINES = [(0,1,2),(3,4,5),(6,7,8),(0,3,6),(1,4,7),(2,5,8),(0,4,8),(2,4,6)]
+
+
+def _line_winner(board):
+    for a, b, c in _LINES:
+        if board[a] != EMPTY and board[a] == board[b] == board[c]:
+            return board[a]
+    return None
+
+
+# ("".join(board), me) -> reference_value; positions never change value
+_REFERENCE_MEMO = {}
+
+
+def reference_value(board, me, opp):
+    """+1 / 0 / -1: result for `me` (to move) under perfect play."""
+    key = ("".join(board), me)
+    if key in _REFERENCE_MEMO:
+        return _REFERENCE_MEMO[key]
+    best = -2
+    for i, v in enumerate(board):
+        if v != EMPTY:
+            continue
+        board[i] = me
+        if _line_winner(board) == me:
+            sc = 1
+        elif EMPTY not in board:
+            sc = 0
+        else:
+            sc = -reference_value(board, opp, me)
+        board[i] = EMPTY
+        if sc > best:
+            best = sc
+            if best == 1:
+                break
+    _REFERENCE_MEMO[key] = best
+    return best
+
+
+def reference_after(board, move, me, opp):
+    """Result for `me` after playing `move`."""
+    board = list(board)
+    board[move] = me
+    if _line_winner(board) == me:
+        return 1
+    if EMPTY not in board:
+        return 0
+    return -reference_value(board, opp, me)
+
+
+def positions():
+    """Every non-terminal 3x3 board with X to move (X has played as often as O, or once less)."""
+    for cells in itertools.product([EMPTY, "X", "O"], repeat=9):
+        nx, no = cells.count("X"), cells.count("O")
+        if nx not in (no, no - 1) or EMPTY not in cells:
+            continue
+        board = list(cells)
+        if _line_winner(board):
+            continue
+        yield board
+
+
+def percentiles(samples, ps=(50, 90, 99)):
+    """Nearest-rank percentiles of `samples` (same unit), plus max; None when empty."""
+    if not samples:
+        out = {f"p{p}": None for p in ps}
+        out["max"] = None
+        return out
+    s = sorted(samples)
+    out = {f"p{p}": s[min(len(s) - 1, max(0, -(-len(s) * p // 100) - 1))] for p in ps}
+    out["max"] = s[-1]
+    return out
+
+
+def _ms(stats):
+    return {k: (round(v * 1000, 4) if v is not None else None) for k, v in stats.items()}
+
+
+def sweep(limit=None, budget_ms=1000):
+    """Check the three 3x3 move paths against the reference solver."""
+    import app   # backend/app.py: the table-backed ai_move served by /api/move
+
+    game = search.get_game(3, 3)
+    paths = {
+        "backend": lambda b, me, opp: app.ai_move(b, "X", "O"),
+        "engine": lambda b, me, opp: engine.best_move(me, opp)[1],
+        "search": lambda b, me, opp: search.Searcher(game).search(me, opp, budget_ms=budget_ms)[0],
+    }
+    times = {name: [] for name in paths}
+    bad = {name: [] for name in paths}
+    n = 0
+    for board in positions():
+        if limit is not None and n >= limit:
+            break
+        n += 1
+        want = reference_value(list(board), "X", "O")
+        me, opp, _ = engine.from_list(board, "X", "O")
+        for name, pick in paths.items():
+            t0 = time.perf_counter()
+            move = pick(board, me, opp)
+            times[name].append(time.perf_counter() - t0)
+            if move is None or board[move] != EMPTY or reference_after(board, move, "X", "O") != want:
+                bad[name].append("".join(board).replace(EMPTY, "."))
+    return {
+        "positions": n,
+        "paths": {
+            name: {
+                "non_optimal": len(bad[name]),
+                "examples": bad[name][:5],
+                "latency_ms": _ms(percentiles(times[name])),
+                "total_seconds": round(sum(times[name]), 4),
+            }
+            for name in paths
+        },
+    }
+
+
+def selfplay(size, k, games=2, budget_ms=200, opening_moves=1):
+    """
+    Play `games` AI-vs-AI games; each side keeps its own Searcher (and TT) for
+    the whole game. Game i starts with i scripted moves next to the centre so
+    the games differ.
+    """
+    game = search.get_game(size, k)
+    moves = []
+    results = {"X": 0, "O": 0, "draw": 0}
+    c = game.center
+    openings = [c + d for d in (0, 1, size, size + 1, -1, -size)]
+    for g in range(games):
+        board = [EMPTY] * game.cells
+        searchers = {"X": search.Searcher(game), "O": search.Searcher(game)}
+        side, other = "X", "O"
+        for cell in (openings[:opening_moves + g]):
+            if 0 <= cell < game.cells and board[cell] == EMPTY:
+                board[cell] = side
+                side, other = other, side
+        while True:
+            mx, mo, _ = game.from_list(board, "X", "O")
+            if game.has_won(mx) or game.has_won(mo) or EMPTY not in board:
+                results["X" if game.has_won(mx) else "O" if game.has_won(mo) else "draw"] += 1
+                break
+            t0 = time.perf_counter()
+            move, stats = search.choose_move(board, side, other, size, k, budget_ms, searchers[side])
+            stats = dict(stats, wall_seconds=time.perf_counter() - t0)
+            moves.append(stats)
+            board[move] = side
+            side, other = other, side
+    return summarize(moves, size, k, budget_ms, results)
+
+
+def summarize(moves, size, k, budget_ms, results):
+    nodes = sum(m["nodes"] for m in moves)
+    seconds = sum(m["elapsed_ms"] for m in moves) / 1000.0
+    depths = [m["depth"] for m in moves]
+    return {
+        "board": f"{size}x{size} k={k}",
+        "budget_ms": budget_ms,
+        "results": results,
+        "moves": len(moves),
+        "nodes": nodes,
+        "nodes_per_second": round(nodes / seconds) if seconds else None,
+        "cutoff_rate": round(sum(m["cutoffs"] for m in moves) / nodes, 4) if nodes else None,
+        "tt_hits": sum(m["tt_hits"] for m in moves),
+        "depth": {"min": min(depths, default=None), "mean": round(sum(depths) / len(depths), 2) if depths else None,
+                  "max": max(depths, default=None)},
+        "latency_ms": _ms(percentiles([m["wall_seconds"] for m in moves])),
+    }
+
+
+def parse_board(spec):
+    size, _, k = spec.partition("x")
+    return int(size), int(k) if k else min(int(size), 4)
+
+
+def print_report(out):
+    sw = out.get("sweep")
+    if sw:
+        print(f"3x3 sweep: {sw['positions']} positions")
+        for name, st in sw["paths"].items():
+            lat = st["latency_ms"]
+            print(f"  {name:<8} non-optimal={st['non_optimal']:<4} total={st['total_seconds']:.3f}s "
+                  f"p50={lat['p50']}ms p99={lat['p99']}ms max={lat['max']}ms")
+            for ex in st["examples"]:
+                print(f"           e.g. {ex}")
+    for sp in out.get("selfplay", []):
+        lat = sp["latency_ms"]
+        print(f"{sp['board']} ({sp['budget_ms']}ms/move): {sp['moves']} moves, results {sp['results']}")
+        print(f"  nodes={sp['nodes']} nodes/s={sp['nodes_per_second']} cutoff_rate={sp['cutoff_rate']} "
+              f"tt_hits={sp['tt_hits']} depth={sp['depth']}")
+        print(f"  latency p50={lat['p50']}ms p90={lat['p90']}ms p99={lat['p99']}ms max={lat['max']}ms")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Correctness sweep and search benchmark.")
+    ap.add_argument("--boards", nargs="*", default=list(DEFAULT_BOARDS),
+                    help="self-play boards as SIZExK (default: %(default)s)")
+    ap.add_argument("--games", type=int, default=2, help="self-play games per board")
+    ap.add_argument("--budget-ms", type=int, default=200, help="search budget per move")
+    ap.add_argument("--skip-sweep", action="store_true", help="skip the exhaustive 3x3 sweep")
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = ap.parse_args(argv)
+
+    out = {}
+    if not args.skip_sweep:
+        out["sweep"] = sweep()
+    out["selfplay"] = [selfplay(*parse_board(b), games=args.games, budget_ms=args.budget_ms)
+                       for b in args.boards]
+    if args.json:
+        print(json.dumps(out, indent=2))
+    else:
+        print_report(out)
+    bad = out.get("sweep", {}).get("paths", {})
+    return 1 if any(st["non_optimal"] for st in bad.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
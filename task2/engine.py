@@ -0,0 +1,144 @@
+# engine.py - bitboard tic-tac-toe engine shared by the CLI, GUI, backend and solved_table
+"""
+A position is two 9-bit masks, one per player (bit i = cell i, row-major).
+
+- WINS[mask] is a 512-entry lookup: does this player's mask contain a line?
+- moves are the set bits of FULL & ~occupied, taken lowest-first without
+  building a list; "make" is `mask | bit`, so nothing has to be undone
+- negamax() is the alpha-beta search with the same depth-weighted scores as
+  the original minimax (win = 10 - depth, loss = depth - 10, draw = 0)
+
+from_list()/to_list() convert the 9-element string lists used by the front
+ends and the /api/move JSON payload.
+"""
+import math
+
+EMPTY = " "
+PLAYER_X = "X"
+PLAYER_O = "O"
+FULL = 0x1FF
+
+LINES = [(0,1,2),(3,4,5),(6,7,8),(0,3,6),(1,4,7),(2,5,8),(0,4,8),(2,4,6)]
+WIN_MASKS = tuple(sum(1 << i for i in line) for line in LINES)
+
+# WINS[m] is True when mask m contains a full line
+WINS = tuple(any(m & w == w for w in WIN_MASKS) for m in range(FULL + 1))
+
+
+def from_list(board, a, b):
+    """
+    Split a list board into (a_mask, b_mask, other_mask). Cells holding any
+    symbol other than EMPTY, a or b end up in other_mask (occupied by nobody).
+    """
+    ma = mb = mo = 0
+    for i, v in enumerate(board):
+        if v == EMPTY:
+            continue
+        if v == a:
+            ma |= 1 << i
+        elif v == b:
+            mb |= 1 << i
+        else:
+            mo |= 1 << i
+    return ma, mb, mo
+
+
+def to_list(ma, mb, a, b):
+    return [a if ma >> i & 1 else b if mb >> i & 1 else EMPTY for i in range(9)]
+
+
+def occupied(board):
+    """Mask of the non-empty cells of a list board."""
+    m = 0
+    for i, v in enumerate(board):
+        if v != EMPTY:
+            m |= 1 << i
+    return m
+
+
+def free_cells(occupied):
+    """Indices of the empty cells, lowest first."""
+    free = FULL & ~occupied
+    out = []
+    while free:
+        low = free & -free
+        out.append(low.bit_length() - 1)
+        free ^= low
+    return out
+
+
+def winner(board, symbols=(PLAYER_X, PLAYER_O)):
+    """
+    Symbol with three in a row on a list board, or None (adapter for the front
+    ends). `symbols` are the players' marks, for boards not played with X/O.
+    """
+    for sym in symbols:
+        m = 0
+        for i, v in enumerate(board):
+            if v == sym:
+                m |= 1 << i
+        if WINS[m]:
+            return sym
+    return None
+
+
+def negamax(me, opp, depth, alpha, beta, other=0):
+    """
+    Best depth-weighted score for the side owning `me`, which is to move.
+    Fail-soft alpha-beta; moves are tried in index order.
+    """
+    occ = me | opp | other
+    free = FULL & ~occ
+    best = -math.inf
+    while free:
+        bit = free & -free
+        free ^= bit
+        mine = me | bit
+        if WINS[mine]:
+            sc = 9 - depth
+        elif occ | bit == FULL:
+            sc = 0
+        else:
+            sc = -negamax(opp, mine, depth + 1, -beta, -alpha, other)
+        if sc > best:
+            best = sc
+            if sc > alpha:
+                alpha = sc
+                if alpha >= beta:
+                    break
+    return best
+
+
+def best_move(me, opp, other=0):
+    """
+    (score, cell) of the first move reaching the best score, or (score, None)
+    if the game is already over. Same choice as the original list minimax.
+    """
+    if WINS[me]:
+        return 10, None
+    if WINS[opp]:
+        return -10, None
+    if me | opp | other == FULL:
+        return 0, None
+    return _root(me, opp, other)
+
+
+def _root(me, opp, other):
+    occ = me | opp | other
+    free = FULL & ~occ
+    best, move = -math.inf, None
+    alpha, beta = -math.inf, math.inf
+    while free:
+        bit = free & -free
+        free ^= bit
+        mine = me | bit
+        if WINS[mine]:
+            sc = 9
+        elif occ | bit == FULL:
+            sc = 0
+        else:
+            sc = -negamax(opp, mine, 1, -beta, -alpha, other)
+        if sc > best:
+            best, move = sc, bit.bit_length() - 1
+        alpha = max(alpha, sc)
+    return best, move
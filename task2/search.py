@@ -0,0 +1,376 @@
+# search.py - time-bounded search for N x N, k-in-a-row boards
+"""
+engine.py (and solved_table.py) cover classic 3x3 exhaustively. Larger boards
+can't be searched to the end, so this module plays them with:
+
+- bitboards of size*size bits, with every k-long row/column/diagonal segment
+  precomputed, plus the segments through each cell for O(1)-ish win checks
+- iterative-deepening negamax alpha-beta under a millisecond budget; the best
+  move of the last completed depth is returned when time runs out (or, if
+  not even depth 1 finished, the best root move scored so far)
+- move ordering: transposition-table move, then killer moves for the ply,
+  then the history heuristic; above 5x5 only cells next to a stone are tried
+- a Zobrist-hashed transposition table that survives between search() calls
+- a heuristic evaluation of open segments for non-terminal cut-offs
+
+Scores are from the point of view of the side to move; a win is worth
+WIN - ply so quicker wins (and slower losses) are preferred.
+"""
+import random
+import time
+
+from engine import EMPTY
+
+WIN = 1_000_000
+WIN_BOUND = WIN - 10_000       # anything above this is a forced win
+EXACT, LOWER, UPPER = 0, 1, 2
+TT_LIMIT = 1_000_000           # table size cap; once full, only deeper results replace entries
+CHECK_EVERY = 64               # nodes between clock checks (leaf evaluation is slow on big boards)
+FULL_WIDTH_CELLS = 25          # boards up to 5x5 consider every empty cell
+
+try:
+    _popcount = int.bit_count
+except AttributeError:         # Python < 3.10
+    def _popcount(x):
+        return bin(x).count("1")
+
+
+class Timeout(Exception):
+    pass
+
+
+class Game:
+    """Precomputed geometry for one (size, k) combination."""
+
+    def __init__(self, size, k):
+        if size < 1 or not 1 <= k <= size:
+            raise ValueError("need 1 <= k <= size")
+        self.size, self.k = size, k
+        self.cells = size * size
+        self.full = (1 << self.cells) - 1
+        segs = []
+        for r in range(size):
+            for c in range(size):
+                for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    er, ec = r + dr * (k - 1), c + dc * (k - 1)
+                    if 0 <= er < size and 0 <= ec < size:
+                        segs.append(sum(1 << ((r + dr * i) * size + c + dc * i) for i in range(k)))
+        self.segments = tuple(segs)
+        self.through = tuple(tuple(s for s in segs if s >> i & 1) for i in range(self.cells))
+        # on small boards every empty cell is tried; larger ones only try cells
+        # within one step of a stone (distant moves are almost never best there)
+        self.restrict = self.cells > FULL_WIDTH_CELLS
+        self.near = []
+        for i in range(self.cells):
+            r, c = divmod(i, size)
+            m = 0
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    rr, cc = r + dr, c + dc
+                    if 0 <= rr < size and 0 <= cc < size:
+                        m |= 1 << (rr * size + cc)
+            self.near.append(m)
+        # static preference for central cells, used to break ordering ties
+        mid = (size - 1) / 2
+        self.centrality = [-(abs(i // size - mid) + abs(i % size - mid)) for i in range(self.cells)]
+        self.center = (size // 2) * size + size // 2
+        rng = random.Random(size * 1000 + k)
+        self.zobrist = [[rng.getrandbits(64) for _ in range(self.cells)] for _ in range(2)]
+        self.zobrist_side = rng.getrandbits(64)
+        # open-segment weights grow 4x per stone; on long lines they could add up
+        # past WIN_BOUND and read as forced wins, so they are scaled down to keep
+        # |evaluate| below WIN_BOUND / 2 (outside terminal positions a segment
+        # holds at most k - 1 stones of one side)
+        cap = max(1, (WIN_BOUND // 2) // len(segs))
+        top = 4 ** (k - 1)
+        self.weights = [0] + [4 ** i if top <= cap else max(i, 4 ** i * cap // top)
+                              for i in range(1, k + 1)]
+
+    def wins_with(self, mask, cell):
+        for s in self.through[cell]:
+            if mask & s == s:
+                return True
+        return False
+
+    def has_won(self, mask):
+        for s in self.segments:
+            if mask & s == s:
+                return True
+        return False
+
+    def evaluate(self, me, opp):
+        """Open-segment score: segments holding only one side's stones, weighted by count."""
+        w = self.weights
+        score = 0
+        for s in self.segments:
+            a = me & s
+            b = opp & s
+            if a:
+                if not b:
+                    score += w[_popcount(a)]
+            elif b:
+                score -= w[_popcount(b)]
+        return score
+
+    def candidates(self, me, opp):
+        occ = me | opp
+        if not self.restrict:
+            return self.full & ~occ
+        if not occ:
+            return 1 << self.center
+        near = 0
+        stones = occ
+        while stones:
+            bit = stones & -stones
+            stones ^= bit
+            near |= self.near[bit.bit_length() - 1]
+        return near & ~occ
+
+    def from_list(self, board, a, b):
+        ma = mb = mo = 0
+        for i, v in enumerate(board):
+            if v == EMPTY:
+                continue
+            if v == a:
+                ma |= 1 << i
+            elif v == b:
+                mb |= 1 << i
+            else:
+                mo |= 1 << i
+        return ma, mb, mo
+
+
+class Searcher:
+    """
+    Iterative-deepening alpha-beta for one Game. Keeps its transposition
+    table and history scores between calls, so consecutive moves of the same
+    game reuse earlier work.
+    """
+
+    def __init__(self, game, tt_limit=TT_LIMIT):
+        self.game = game
+        self.tt_limit = tt_limit
+        self.tt = {}
+        self.history = [0] * game.cells
+        self.killers = []
+        self.stats = {}
+
+    def search(self, me, opp, other=0, budget_ms=200, max_depth=None):
+        """
+        Best move for the side owning `me`. Returns (cell or None, score, stats);
+        stats has depth reached, nodes, tt_hits, cutoffs and elapsed_ms.
+        """
+        g = self.game
+        started = time.perf_counter()
+        self.deadline = started + budget_ms / 1000.0
+        self.nodes = self.tt_hits = self.cutoffs = 0
+        blocked = other
+        empties = _popcount(g.full & ~(me | opp | blocked))
+        if len(self.tt) >= self.tt_limit:
+            self.tt.clear()
+        # age the history so old games don't dominate the ordering
+        self.history = [h >> 1 for h in self.history]
+        limit = empties if max_depth is None else min(max_depth, empties)
+        self.killers = [[None, None] for _ in range(limit + 2)]
+        self._blocked = blocked
+        best_move, best_score, depth_done = None, 0, 0
+        if empties and not g.has_won(me) and not g.has_won(opp):
+            key = self._key(me, opp)
+            for depth in range(1, limit + 1):
+                try:
+                    score, move, complete = self._root(me, opp, key, depth)
+                except Timeout:
+                    break
+                best_move, best_score = move, score
+                if not complete:
+                    break   # depth 1 ran out of time part way through the root moves
+                depth_done = depth
+                if abs(score) >= WIN_BOUND:
+                    break   # forced result found; deeper search can't change it
+        self.stats = {
+            "depth": depth_done,
+            "nodes": self.nodes,
+            "tt_hits": self.tt_hits,
+            "cutoffs": self.cutoffs,
+            "tt_size": len(self.tt),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+        return best_move, best_score, self.stats
+
+    def _key(self, me, opp):
+        z = self.game.zobrist
+        h = 0
+        for color, mask in ((0, me), (1, opp)):
+            while mask:
+                bit = mask & -mask
+                mask ^= bit
+                h ^= z[color][bit.bit_length() - 1]
+        return h
+
+    def _ordered(self, me, opp, ply, tt_move):
+        g = self.game
+        cand = g.candidates(me, opp) & ~self._blocked
+        moves = []
+        while cand:
+            bit = cand & -cand
+            cand ^= bit
+            moves.append(bit.bit_length() - 1)
+        killers = self.killers[ply] if ply < len(self.killers) else (None, None)
+        hist, cent = self.history, g.centrality
+
+        def rank(m):
+            if m == tt_move:
+                return (3, 0)
+            if m in killers:
+                return (2, 0)
+            return (1, hist[m] + cent[m])
+
+        moves.sort(key=rank, reverse=True)
+        return moves
+
+    def _root(self, me, opp, key, depth):
+        """
+        (score, move, complete) for one iteration. Deeper iterations raise
+        Timeout and the previous depth's move is used. Depth 1 has nothing to
+        fall back on, so its first move is always scored; after that it stops
+        at the deadline with complete=False and the best move scored so far.
+        """
+        self._enforce = depth > 1
+        entry = self.tt.get(key)
+        tt_move = entry[3] if entry else None
+        alpha, beta = -WIN - 1, WIN + 1
+        best, best_move = -WIN - 1, None
+        for m in self._ordered(me, opp, 0, tt_move):
+            try:
+                if self._enforce and time.perf_counter() > self.deadline:
+                    raise Timeout()
+                sc = self._child(me, opp, key, m, depth, 0, -beta, -alpha)
+            except Timeout:
+                if depth > 1:
+                    raise
+                return best, best_move, False
+            if sc > best:
+                best, best_move = sc, m
+            if sc > alpha:
+                alpha = sc
+            self._enforce = True
+        self._store(key, (depth, best, EXACT, best_move))
+        return best, best_move, True
+
+    def _store(self, key, entry):
+        tt = self.tt
+        if len(tt) >= self.tt_limit:
+            # full: no new positions, but a deeper result still replaces a shallower one
+            old = tt.get(key)
+            if old is None or old[0] > entry[0]:
+                return
+        tt[key] = entry
+
+    def _child(self, me, opp, key, m, depth, ply, alpha, beta):
+        """Score (for the mover) of playing m: immediate result or -negamax of the reply."""
+        g = self.game
+        bit = 1 << m
+        mine = me | bit
+        if g.wins_with(mine, m):
+            return WIN - ply - 1
+        if (mine | opp | self._blocked) == g.full:
+            return 0
+        # the root mover's stones use zobrist[0], the opponent's zobrist[1]; keys
+        # therefore stay valid for later searches from the same side's point of view
+        child_key = key ^ g.zobrist[ply & 1][m] ^ g.zobrist_side
+        return -self._negamax(opp, mine, child_key, depth - 1, ply + 1, alpha, beta)
+
+    def _negamax(self, me, opp, key, depth, ply, alpha, beta):
+        self.nodes += 1
+        if self._enforce and self.nodes % CHECK_EVERY == 0 and time.perf_counter() > self.deadline:
+            raise Timeout()
+        if depth <= 0:
+            return self.game.evaluate(me, opp)
+
+        alpha0 = alpha
+        entry = self.tt.get(key)
+        tt_move = None
+        if entry is not None:
+            e_depth, e_val, e_flag, tt_move = entry
+            if e_depth >= depth:
+                # mate scores are stored relative to this node
+                v = e_val - ply if e_val >= WIN_BOUND else e_val + ply if e_val <= -WIN_BOUND else e_val
+                if e_flag == EXACT or (e_flag == LOWER and v >= beta) or (e_flag == UPPER and v <= alpha):
+                    self.tt_hits += 1
+                    return v
+
+        best, best_move = -WIN - 1, None
+        for m in self._ordered(me, opp, ply, tt_move):
+            sc = self._child(me, opp, key, m, depth, ply, -beta, -alpha)
+            if sc > best:
+                best, best_move = sc, m
+                if sc > alpha:
+                    alpha = sc
+                    if alpha >= beta:
+                        self.cutoffs += 1
+                        killers = self.killers[ply] if ply < len(self.killers) else None
+                        if killers is not None and m not in killers:
+                            killers[1], killers[0] = killers[0], m
+                        self.history[m] += depth * depth
+                        break
+        if best_move is None:
+            return 0    # no candidate cells left (only blocked cells remain)
+
+        flag = EXACT
+        if best <= alpha0:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        stored = best + ply if best >= WIN_BOUND else best - ply if best <= -WIN_BOUND else best
+        self._store(key, (depth, stored, flag, best_move))
+        return best
+
+
+_games = {}
+
+
+def get_game(size, k):
+    """Shared Game geometry per (size, k); it's immutable, so callers can share it."""
+    game = _games.get((size, k))
+    if game is None:
+        game = _games[(size, k)] = Game(size, k)
+    return game
+
+
+def choose_move(board, ai, human, size, k, budget_ms=200, searcher=None):
+    """List-board front door used by /api/move and the CLI. Returns (move, stats)."""
+    game = get_game(size, k)
+    if searcher is None:
+        searcher = Searcher(game)
+    me, opp, other = game.from_list(board, ai, human)
+    move, score, stats = searcher.search(me, opp, other, budget_ms)
+    if move is None:
+        free = game.full & ~(me | opp | other)
+        if free and not game.has_won(me) and not game.has_won(opp):
+            move = (free & -free).bit_length() - 1
+    return move, stats
+
+
+def quick_move(board, ai, human, size, k):
+    """
+    Move without searching, for callers that are out of time: win now, else
+    block the opponent's immediate win, else the most central candidate.
+    Returns (move, stats) like choose_move.
+    """
+    game = get_game(size, k)
+    me, opp, other = game.from_list(board, ai, human)
+    move = None
+    if not game.has_won(me) and not game.has_won(opp):
+        free = game.full & ~(me | opp | other)
+        cand = (game.candidates(me, opp) & free) or free
+        moves = []
+        while cand:
+            bit = cand & -cand
+            cand ^= bit
+            moves.append(bit.bit_length() - 1)
+        move = next((m for m in moves if game.wins_with(me | 1 << m, m)), None)
+        if move is None:
+            move = next((m for m in moves if game.wins_with(opp | 1 << m, m)), None)
+        if move is None and moves:
+            move = max(moves, key=game.centrality.__getitem__)
+    return move, {"depth": 0, "nodes": 0, "tt_hits": 0, "cutoffs": 0, "elapsed_ms": 0.0}
@@ -0,0 +1,168 @@
+# solved_table.py - precomputed optimal moves for 3x3 tic-tac-toe
+"""
+Transposition table for the whole game, shared by backend/app.py and
+tic_tac_toe_ai.py.
+
+Positions are bitboards (engine.py) taken relative to the side to move and
+folded under the 8 board symmetries, so the table has one entry per
+canonical position. Each entry is a 9-bit mask of the optimal moves
+under the same depth-weighted scoring the minimax search uses (win = 10 - depth,
+loss = depth - 10, draw = 0). A lookup maps the mask back to the real board and
+returns the lowest optimal index, which is exactly the move the alpha-beta
+search picks (the first move that reaches the best score).
+
+The table is a flat array indexed by the base-3 code of the canonical board
+(3^9 entries of 2 bytes). It is built at import time in well under a second,
+or loaded from TABLE_FILE if one was written with `python solved_table.py`.
+"""
+import os
+import sys
+from array import array
+
+from engine import FULL, WINS, from_list
+
+SIZE = 3 ** 9
+NO_ENTRY = 0   # masks are never 0 for a position that has a move
+
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solved_table.bin")
+
+# sym[i] = which original cell lands on cell i
+SYMMETRIES = [
+    (0,1,2,3,4,5,6,7,8),   # identity
+    (6,3,0,7,4,1,8,5,2),   # rotate 90
+    (8,7,6,5,4,3,2,1,0),   # rotate 180
+    (2,5,8,1,4,7,0,3,6),   # rotate 270
+    (2,1,0,5,4,3,8,7,6),   # mirror left/right
+    (6,7,8,3,4,5,0,1,2),   # mirror top/bottom
+    (0,3,6,1,4,7,2,5,8),   # main diagonal
+    (8,5,2,7,4,1,6,3,0),   # anti diagonal
+]
+
+# PERMUTE[s][mask]: the mask seen through symmetry s; BASE3[mask]: sum of 3**i over its bits
+PERMUTE = [tuple(sum(1 << i for i in range(9) if m >> sym[i] & 1) for m in range(FULL + 1))
+           for sym in SYMMETRIES]
+BASE3 = tuple(sum(3 ** i for i in range(9) if m >> i & 1) for m in range(FULL + 1))
+
+
+def canonical(me, opp):
+    """Return (code, sym) of the smallest base-3 encoding among the 8 symmetric boards."""
+    best = None
+    for perm, sym in zip(PERMUTE, SYMMETRIES):
+        code = BASE3[perm[me]] + 2 * BASE3[perm[opp]]
+        if best is None or code < best[0]:
+            best = (code, sym)
+    return best
+
+
+def _is_valid_to_move(me, opp):
+    """Side to move has played as often as, or once less than, the opponent; game not over."""
+    n_me, n_opp = bin(me).count("1"), bin(opp).count("1")
+    return ((n_me == n_opp or n_me == n_opp - 1) and me | opp != FULL
+            and not WINS[me] and not WINS[opp])
+
+
+def build_table():
+    """Solve every position with the side to move to play; return the mask array."""
+    table = array("H", [NO_ENTRY]) * SIZE
+    values = {}
+
+    def value(me, opp):
+        # best depth-weighted score for the side to move, from its own point of view
+        key = (me, opp)
+        if key in values:
+            return values[key]
+        occ = me | opp
+        best = None
+        mask = 0
+        free = FULL & ~occ
+        while free:
+            bit = free & -free
+            free ^= bit
+            if WINS[me | bit]:
+                sc = 9
+            elif occ | bit == FULL:
+                sc = 0
+            else:
+                v = value(opp, me | bit)
+                # one ply further from the root: wins get 1 smaller, losses 1 less negative
+                sc = 1 - v if v > 0 else (-1 - v if v < 0 else 0)
+            if best is None or sc > best:
+                best, mask = sc, bit
+            elif sc == best:
+                mask |= bit
+        values[key] = best
+        code, sym = canonical(me, opp)
+        if table[code] == NO_ENTRY:
+            # store the mask in canonical orientation: bit i <-> original cell sym[i]
+            table[code] = sum(1 << i for i in range(9) if mask >> sym[i] & 1)
+        return best
+
+    for me in range(FULL + 1):
+        # opp ranges over the subsets of the cells `me` leaves free
+        rest = FULL & ~me
+        opp = rest
+        while True:
+            if _is_valid_to_move(me, opp):
+                value(me, opp)
+            if not opp:
+                break
+            opp = (opp - 1) & rest
+    return table
+
+
+def save_table(table, path=TABLE_FILE):
+    with open(path, "wb") as f:
+        table.tofile(f)
+
+
+def load_table(path=TABLE_FILE):
+    """Load TABLE_FILE if present and well-formed, otherwise solve the game now."""
+    if os.path.isfile(path) and os.path.getsize(path) == SIZE * array("H").itemsize:
+        table = array("H")
+        with open(path, "rb") as f:
+            table.fromfile(f, SIZE)
+        return table
+    return build_table()
+
+
+TABLE = load_table()
+
+
+def lookup(board, ai, human, table=TABLE):
+    """
+    Optimal move for `ai` on a list board, or None if the position is not in
+    the table (terminal, unreachable, or containing unknown symbols).
+    """
+    me, opp, other = from_list(board, ai, human)
+    if other or me & opp:
+        return None
+    return lookup_masks(me, opp, table)
+
+
+def lookup_masks(me, opp, table=TABLE):
+    """Same as lookup() for a bitboard position with `me` to move."""
+    moves = optimal_masks(me, opp, table)
+    return moves[0] if moves else None
+
+
+def optimal_moves(board, ai, human, table=TABLE):
+    """All optimal moves for `ai` on a list board, lowest first; None if not in the table."""
+    me, opp, other = from_list(board, ai, human)
+    if other or me & opp:
+        return None
+    return optimal_masks(me, opp, table)
+
+
+def optimal_masks(me, opp, table=TABLE):
+    code, sym = canonical(me, opp)
+    mask = table[code]
+    if mask == NO_ENTRY:
+        return None
+    return sorted(sym[i] for i in range(9) if mask >> i & 1)
+
+
+if __name__ == "__main__":
+    out = sys.argv[1] if len(sys.argv) > 1 else TABLE_FILE
+    t = build_table()
+    save_table(t, out)
+    print(f"wrote {sum(1 for m in t if m)} canonical positions to {out}")
@@ -1 +1,84 @@
-def test_true(): assert True
\ No newline at end of file
+import os, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+import app
+import bench
+import engine
+import tic_tac_toe_ai
+
+EMPTY = " "
+
+
+def test_every_3x3_path_is_optimal():
+    out = bench.sweep()
+    assert out["positions"] == 4520
+    for name, st in out["paths"].items():
+        assert st["non_optimal"] == 0, (name, st["examples"])
+
+
+def _play(x_move, o_move):
+    board = [EMPTY] * 9
+    side = "X"
+    while not engine.winner(board) and EMPTY in board:
+        pick = x_move if side == "X" else o_move
+        move = pick(board, side, "O" if side == "X" else "X")
+        assert board[move] == EMPTY
+        board[move] = side
+        side = "O" if side == "X" else "X"
+    return engine.winner(board)
+
+
+def test_selfplay_3x3_is_always_a_draw():
+    assert _play(app.ai_move, app.ai_move) is None
+    assert _play(app.ai_move, tic_tac_toe_ai.ai_move) is None
+    assert _play(tic_tac_toe_ai.ai_move, app.ai_move) is None
+
+
+def test_backend_opens_in_the_center():
+    assert app.ai_move([EMPTY] * 9, "X", "O") == 4
+
+
+def test_selfplay_benchmark_reports_search_cost():
+    out = bench.selfplay(5, 4, games=1, budget_ms=20)
+    assert out["moves"] > 0 and sum(out["results"].values()) == 1
+    assert out["nodes"] > 0 and out["nodes_per_second"] > 0
+    assert 0 < out["cutoff_rate"] <= 1
+    assert out["depth"]["min"] >= 1
+    assert out["latency_ms"]["p50"] <= out["latency_ms"]["p99"] <= out["latency_ms"]["max"] < 1000
+
+
+def test_percentiles():
+    assert bench.percentiles(list(range(1, 101))) == {"p50": 50, "p90": 90, "p99": 99, "max": 100}
+    assert bench.percentiles([]) == {"p50": None, "p90": None, "p99": None, "max": None}
+
+
+def test_api_move_stats_are_opt_in():
+    client = app.app.test_client()
+    board = ["X"] + [EMPTY] * 8
+    r = client.post("/api/move", json={"board": board, "ai": "O", "human": "X"})
+    assert r.get_json() == {"move": 4}
+
+    r = client.post("/api/move", json={"board": board, "ai": "O", "human": "X", "stats": True})
+    stats = r.get_json()["stats"]
+    assert stats["source"] == "table" and stats["elapsed_ms"] >= 0
+
+    big = [EMPTY] * 49
+    big[24] = "X"
+    r = client.post("/api/move", json={"board": big, "ai": "O", "human": "X",
+                                       "size": 7, "budget_ms": 20, "stats": True})
+    body = r.get_json()
+    assert big[body["move"]] == EMPTY
+    stats = body["stats"]
+    assert stats["source"] == "search"
+    assert stats["depth"] >= 1 and stats["nodes"] > 0 and stats["tt_hits"] >= 0
+    assert stats["elapsed_ms"] > 0
+
+
+def test_winner_with_custom_symbols():
+    board = ["A", "A", "A", "B", "B", EMPTY, EMPTY, EMPTY, EMPTY]
+    assert engine.winner(board) is None
+    assert engine.winner(board, ("A", "B")) == "A"
+    assert engine.winner(["X", "O", "X"] * 3) == "X"
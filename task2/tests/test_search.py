@@ -0,0 +1,142 @@
+import itertools, os, random, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+import search
+
+EMPTY = " "
+
+
+def sign(v):
+    return (v > 0) - (v < 0)
+
+
+def outcome_after(me, opp, move):
+    """Game-theoretic value (sign only) for `me` after playing `move` on 3x3."""
+    mine = me | (1 << move)
+    if engine.WINS[mine]:
+        return 1
+    if mine | opp == engine.FULL:
+        return 0
+    return sign(-engine.negamax(opp, mine, 1, -99, 99))
+
+
+def test_3x3_search_never_gives_away_the_result():
+    game = search.get_game(3, 3)
+    for cells in itertools.product([EMPTY, "X", "O"], repeat=9):
+        b = list(cells)
+        nx, no = b.count("X"), b.count("O")
+        if EMPTY not in b or engine.winner(b) or nx not in (no, no - 1):
+            continue
+        me, opp, _ = engine.from_list(b, "X", "O")
+        best, _ = engine.best_move(me, opp)
+        move, _, stats = search.Searcher(game).search(me, opp, budget_ms=10000)
+        assert outcome_after(me, opp, move) == sign(best), b
+        assert stats["depth"] >= 1
+
+
+def _board(size, xs=(), os_=()):
+    b = [EMPTY] * (size * size)
+    for r, c in xs:
+        b[r * size + c] = "X"
+    for r, c in os_:
+        b[r * size + c] = "O"
+    return b
+
+
+def test_takes_the_win_and_blocks_on_7x7():
+    # O has three in a row with an open end: complete it
+    b = _board(7, xs=[(0, 0), (1, 0), (6, 6)], os_=[(3, 1), (3, 2), (3, 3)])
+    move, _ = search.choose_move(b, "O", "X", 7, 4, budget_ms=200)
+    assert move in (3 * 7 + 0, 3 * 7 + 4)
+    # X threatens four on the diagonal; O must block it
+    b = _board(7, xs=[(1, 1), (2, 2), (3, 3)], os_=[(0, 0), (6, 0)])
+    move, _ = search.choose_move(b, "O", "X", 7, 4, budget_ms=200)
+    assert move == 4 * 7 + 4
+
+
+def test_respects_the_time_budget():
+    b = _board(15, xs=[(7, 7), (7, 8)], os_=[(8, 7)])
+    started = time.perf_counter()
+    move, stats = search.choose_move(b, "O", "X", 15, 5, budget_ms=100)
+    elapsed = time.perf_counter() - started
+    assert move is not None and b[move] == EMPTY
+    assert stats["depth"] >= 1
+    assert elapsed < 1.0
+
+
+def test_budget_holds_on_19x19():
+    rng = random.Random(7)
+    search.get_game(19, 5)      # geometry is built once per (size, k), outside the budget
+    for stones, budget_ms in ((3, 100), (40, 50), (120, 20)):
+        b = [EMPTY] * (19 * 19)
+        for i, cell in enumerate(rng.sample(range(19 * 19), stones)):
+            b[cell] = "X" if i % 2 else "O"
+        started = time.perf_counter()
+        move, stats = search.choose_move(b, "O", "X", 19, 5, budget_ms=budget_ms)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        assert move is not None and b[move] == EMPTY
+        assert elapsed_ms <= budget_ms + 30, (stones, budget_ms, elapsed_ms, stats)
+
+
+def test_depth_one_stops_at_the_deadline_with_a_scored_move():
+    b = [EMPTY] * (19 * 19)
+    for i, cell in enumerate(random.Random(3).sample(range(19 * 19), 150)):
+        b[cell] = "X" if i % 2 else "O"
+    game = search.get_game(19, 5)
+    me, opp, other = game.from_list(b, "O", "X")
+    move, score, stats = search.Searcher(game).search(me, opp, other, budget_ms=1)
+    # depth 1 did not finish, but the moves it did score were used
+    assert stats["depth"] == 0
+    assert move is not None and b[move] == EMPTY and score > -search.WIN
+
+
+def test_transposition_table_stays_within_its_limit():
+    game = search.get_game(7, 4)
+    s = search.Searcher(game, tt_limit=500)
+    b = _board(7, xs=[(3, 3)], os_=[(3, 4)])
+    me, opp, other = game.from_list(b, "X", "O")
+    _, _, stats = s.search(me, opp, other, budget_ms=200)
+    assert stats["nodes"] > 500
+    assert len(s.tt) <= 500
+
+
+def test_quick_move_wins_then_blocks():
+    b = _board(7, xs=[(0, 0), (1, 0), (2, 0)], os_=[(3, 1), (3, 2), (3, 3)])
+    assert search.quick_move(b, "O", "X", 7, 4)[0] in (3 * 7 + 0, 3 * 7 + 4)
+    b = _board(7, xs=[(0, 0), (1, 0), (2, 0)], os_=[(5, 5)])
+    assert search.quick_move(b, "O", "X", 7, 4)[0] == 3 * 7 + 0
+
+
+def test_long_lines_are_not_mistaken_for_forced_wins():
+    for size, k in ((12, 12), (19, 11), (19, 19), (19, 5)):
+        game = search.get_game(size, k)
+        # no non-terminal position can score anywhere near a win
+        assert len(game.segments) * game.weights[k - 1] < search.WIN_BOUND
+    game = search.get_game(12, 12)
+    b = _board(12, xs=[(5, 5), (6, 5)], os_=[(5, 6), (6, 6)])
+    me, opp, other = game.from_list(b, "X", "O")
+    move, score, stats = search.Searcher(game).search(me, opp, other, budget_ms=300)
+    assert b[move] == EMPTY
+    assert stats["depth"] > 1
+    assert abs(score) < search.WIN_BOUND
+
+
+def test_transposition_table_is_reused_between_moves():
+    game = search.get_game(5, 4)
+    s = search.Searcher(game)
+    b = _board(5, xs=[(2, 2)])
+    search.choose_move(b, "O", "X", 5, 4, budget_ms=50, searcher=s)
+    assert len(s.tt) > 0
+    b[12 - 5] = "O"
+    b[12 + 1] = "X"
+    _, stats = search.choose_move(b, "O", "X", 5, 4, budget_ms=50, searcher=s)
+    assert stats["tt_hits"] > 0
+
+
+def test_game_over_or_full_board_returns_none():
+    b = _board(4, xs=[(0, 0), (0, 1), (0, 2), (0, 3)], os_=[(1, 0), (1, 1), (1, 2)])
+    assert search.choose_move(b, "O", "X", 4, 4)[0] is None
+    full = ["X", "O", "X", "O"] * 4
+    assert search.choose_move(full, "O", "X", 4, 4)[0] is None
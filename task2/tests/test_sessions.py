@@ -0,0 +1,100 @@
+import os, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+import app
+import search
+from sessions import GameSessions
+
+EMPTY = " "
+
+
+def _board(size, xs=(), os_=()):
+    b = [EMPTY] * (size * size)
+    for i in xs:
+        b[i] = "X"
+    for i in os_:
+        b[i] = "O"
+    return b
+
+
+def test_session_keeps_the_search_table_between_moves():
+    client = app.app.test_client()
+    r = client.post("/api/session", json={"size": 5, "k": 4})
+    sid = r.get_json()["session_id"]
+    assert r.get_json()["k"] == 4
+
+    board = _board(5, xs=[12])
+    req = {"board": board, "ai": "O", "human": "X", "session_id": sid, "budget_ms": 200, "stats": True}
+    first = client.post("/api/move", json=req).get_json()
+    board[first["move"]] = "O"
+    board[next(i for i, v in enumerate(board) if v == EMPTY and i != 12)] = "X"
+    second = client.post("/api/move", json=dict(req, board=board)).get_json()
+    assert board[second["move"]] == EMPTY
+    assert second["stats"]["tt_hits"] > 0
+
+    # size/k come from the session; a conflicting size is rejected
+    assert client.post("/api/move", json=dict(req, size=7)).status_code == 400
+    assert client.delete(f"/api/session/{sid}").get_json() == {"deleted": True}
+    assert client.post("/api/move", json=req).status_code == 404
+
+
+def test_sessions_expire_and_evict():
+    store = GameSessions(ttl=0, max_size=10)
+    s = store.create(3, 3)
+    assert store.get(s.id) is None
+    assert store.stats()["expired"] == 1
+
+    store = GameSessions(ttl=60, max_size=2)
+    a, b = store.create(4, 3), store.create(4, 3)
+    store.get(a.id)                # a is now more recently used than b
+    c = store.create(4, 3)
+    assert store.get(b.id) is None
+    assert store.get(a.id) is a and store.get(c.id) is c
+    assert store.stats()["evicted"] == 1
+
+
+def test_batch_dedupes_and_matches_single_moves():
+    client = app.app.test_client()
+    small = {"board": _board(3, xs=[0]), "ai": "O", "human": "X"}
+    big = {"board": _board(7, xs=[24], os_=[25]), "ai": "X", "human": "O", "size": 7, "budget_ms": 20}
+    items = [small, big, small, {"board": [EMPTY] * 5}, big, "nope"]
+    r = client.post("/api/moves", json={"items": items, "stats": True})
+    assert r.status_code == 200
+    body = r.get_json()
+    res = body["results"]
+    assert body["unique"] == 2
+    assert res[0] == res[2] and res[1] == res[4]
+    assert res[0]["move"] == client.post("/api/move", json=small).get_json()["move"]
+    assert res[1]["stats"]["source"] == "search"
+    assert "error" in res[3] and "error" in res[5]
+
+    assert client.post("/api/moves", json={"items": []}).status_code == 400
+    too_many = [small] * (app.MAX_BATCH_ITEMS + 1)
+    assert client.post("/api/moves", json={"items": too_many}).status_code == 400
+
+
+def test_batch_stops_searching_once_its_time_cap_is_spent(monkeypatch):
+    monkeypatch.setattr(app, "MAX_BATCH_BUDGET_MS", 100)
+    client = app.app.test_client()
+    items = []
+    for i in range(15):
+        b = _board(15, xs=[7 * 15 + 7, i * 15 + 3], os_=[8 * 15 + 7])
+        items.append({"board": b, "ai": "O", "human": "X", "size": 15, "k": 5, "budget_ms": 1000})
+    search.get_game(15, 5)
+    started = time.perf_counter()
+    res = client.post("/api/moves", json={"items": items, "stats": True}).get_json()["results"]
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    assert elapsed_ms <= 100 + 50
+    for item, r in zip(items, res):
+        assert item["board"][r["move"]] == EMPTY
+
+    # the first search uses up a 1ms cap; everything after it gets a quick move
+    monkeypatch.setattr(app, "MAX_BATCH_BUDGET_MS", 1)
+    res = client.post("/api/moves", json={"items": items, "stats": True}).get_json()["results"]
+    sources = [r["stats"]["source"] for r in res]
+    assert sources[0] == "search" and set(sources[1:]) == {"quick"}
+    for item, r in zip(items, res):
+        assert item["board"][r["move"]] == EMPTY
@@ -0,0 +1,71 @@
+import itertools, math, os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import solved_table
+
+EMPTY = " "
+LINES = [(0,1,2),(3,4,5),(6,7,8),(0,3,6),(1,4,7),(2,5,8),(0,4,8),(2,4,6)]
+
+
+# independent list-based reference: the original CLI minimax
+def check(b):
+    for a, b_, c in LINES:
+        if b[a] != EMPTY and b[a] == b[b_] == b[c]: return b[a]
+    return None
+
+
+def minimax(board, d, maxi, ai, h, alpha, beta):
+    w = check(board)
+    if w or all(x != EMPTY for x in board):
+        if w == ai: return 10 - d
+        if w == h: return d - 10
+        return 0
+    val = -math.inf if maxi else math.inf
+    for i, v in enumerate(board):
+        if v != EMPTY: continue
+        board[i] = ai if maxi else h
+        sc = minimax(board, d + 1, not maxi, ai, h, alpha, beta)
+        board[i] = EMPTY
+        if maxi:
+            val = max(val, sc); alpha = max(alpha, val)
+        else:
+            val = min(val, sc); beta = min(beta, val)
+        if beta <= alpha: break
+    return val
+
+
+def search_move(board, ai, human):
+    # the original exhaustive search: first move with the best score
+    best = -math.inf; move = None
+    for i, v in enumerate(board):
+        if v == EMPTY:
+            board[i] = ai
+            val = minimax(board, 0, False, ai, human, -math.inf, math.inf)
+            board[i] = EMPTY
+            if val > best: best, move = val, i
+    return move
+
+
+def test_table_matches_search_everywhere():
+    checked = 0
+    for cells in itertools.product([EMPTY, "X", "O"], repeat=9):
+        board = list(cells)
+        if check(board) or EMPTY not in board: continue
+        for ai, human in (("X", "O"), ("O", "X")):
+            if board.count(ai) not in (board.count(human), board.count(human) - 1): continue
+            assert solved_table.lookup(board, ai, human) == search_move(board, ai, human), board
+            checked += 1
+    assert checked > 4000
+
+
+def test_unknown_positions_are_not_in_table():
+    assert solved_table.lookup(["X"] * 3 + [EMPTY] * 6, "O", "X") is None   # X already won
+    assert solved_table.lookup(["X", "X", EMPTY] + [EMPTY] * 6, "X", "O") is None  # impossible counts
+    assert solved_table.lookup(["?"] + [EMPTY] * 8, "X", "O") is None
+
+
+def test_table_file_roundtrip(tmp_path):
+    path = str(tmp_path / "table.bin")
+    solved_table.save_table(solved_table.TABLE, path)
+    assert solved_table.load_table(path) == solved_table.TABLE
@@ -1,68 +1,56 @@
 # tic_tac_toe_ai.py - CLI version
-import math, random
+import argparse
+import random
+import engine, search, solved_table
 
-EMPTY=" "
+EMPTY=engine.EMPTY
 PLAYER_X="X"
 PLAYER_O="O"
 
-def print_board(board):
-    for r in range(3): print(" | ".join(board[r*3:(r+1)*3]))
+def print_board(board,size=3):
+    for r in range(size): print(" | ".join(board[r*size:(r+1)*size]))
     print()
 
 def check(b):
-    lines=[(0,1,2),(3,4,5),(6,7,8),(0,3,6),(1,4,7),(2,5,8),(0,4,8),(2,4,6)]
-    for a,b_,c in lines:
-        if b[a]!=EMPTY and b[a]==b[b_]==b[c]: return b[a]
-    return None
-
-def minimax(board,d,maxi,ai,h,alpha,beta):
-    w=check(board)
-    if w or all(x!=EMPTY for x in board):
-        if w==ai: return 10-d
-        if w==h: return d-10
-        return 0
-    if maxi:
-        val=-math.inf
-        for i,v in enumerate(board):
-            if v==EMPTY:
-                board[i]=ai
-                val=max(val,minimax(board,d+1,False,ai,h,alpha,beta))
-                board[i]=EMPTY
-                alpha=max(alpha,val)
-                if beta<=alpha: break
-        return val
-    else:
-        val=math.inf
-        for i,v in enumerate(board):
-            if v==EMPTY:
-                board[i]=h
-                val=min(val,minimax(board,d+1,True,ai,h,alpha,beta))
-                board[i]=EMPTY
-                beta=min(beta,val)
-                if beta<=alpha: break
-        return val
+    return engine.winner(b)
 
 def ai_move(board,ai,h):
-    best=-math.inf; move=None
-    for i,v in enumerate(board):
-        if v==EMPTY:
-            board[i]=ai
-            val=minimax(board,0,False,ai,h,-math.inf,math.inf)
-            board[i]=EMPTY
-            if val>best: best,move=val,i
-    return move
+    # precomputed optimal move (shared with backend/app.py); search only if not covered
+    m=solved_table.lookup(board,ai,h)
+    if m is not None: return m
+    me,opp,other=engine.from_list(board,ai,h)
+    return engine.best_move(me,opp,other)[1]
 
-def main():
-    board=[EMPTY]*9; human=PLAYER_X; ai=PLAYER_O; current=PLAYER_X
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Play tic-tac-toe (or size x size, k in a row) against the AI.")
+    ap.add_argument("--size",type=int,default=3,help="board side (default: 3)")
+    ap.add_argument("--k",type=int,default=None,help="stones in a row to win (default: min(size, 4))")
+    ap.add_argument("--budget-ms",type=int,default=500,help="AI thinking time on boards other than 3x3")
+    args=ap.parse_args(argv)
+    size=args.size; k=args.k or min(size,4)
+    if size==3 and k==3:
+        game=None
+    else:
+        game=search.get_game(size,k); searcher=search.Searcher(game)
+    n=size*size
+    board=[EMPTY]*n; human=PLAYER_X; ai=PLAYER_O; current=PLAYER_X
     while True:
-        print_board(board)
-        if check(board) or all(x!=EMPTY for x in board):
+        print_board(board,size)
+        if game is None:
+            over=check(board)
+        else:
+            mx,mo,_=game.from_list(board,PLAYER_X,PLAYER_O)
+            over=game.has_won(mx) or game.has_won(mo)
+        if over or all(x!=EMPTY for x in board):
             print("Game Over"); break
         if current==human:
-            m=int(input("Move 1-9: "))-1
-            if board[m]!=EMPTY: continue
+            try: m=int(input(f"Move 1-{n}: "))-1
+            except ValueError: continue
+            if not 0<=m<n or board[m]!=EMPTY: continue
             board[m]=human; current=ai
         else:
-            m=ai_move(board,ai,human); board[m]=ai; current=human
+            if game is None: m=ai_move(board,ai,human)
+            else: m,_=search.choose_move(board,ai,human,size,k,args.budget_ms,searcher)
+            board[m]=ai; current=human
 
 if __name__=="__main__": main()
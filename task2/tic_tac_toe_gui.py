@@ -1,18 +1,16 @@
 # tic_tac_toe_gui.py - Tkinter GUI
 import tkinter as tk, random
+import engine
 
-EMPTY=" "
+EMPTY=engine.EMPTY
 PLAYER_X="X"
 PLAYER_O="O"
 
 def check(b):
-    lines=[(0,1,2),(3,4,5),(6,7,8),(0,3,6),(1,4,7),(2,5,8),(0,4,8),(2,4,6)]
-    for a,b_,c in lines:
-        if b[a]!=EMPTY and b[a]==b[b_]==b[c]: return b[a]
-    return None
+    return engine.winner(b)
 
 def ai_move(board):
-    avail=[i for i,v in enumerate(board) if v==EMPTY]
+    avail=engine.free_cells(engine.occupied(board))
     return random.choice(avail) if avail else None
 
 class App: